@@ -17,6 +17,18 @@ class Settings(BaseSettings):
     ytdlp_cookies_file: str = ""  # path to cookies.txt for yt-dlp (used on VPS)
     ytdlp_cookies_browser: str = "firefox"  # browser to read cookies from (local dev)
     parking_cnn_model: str = ""  # path to .pt classifier, e.g. "models/parking_classifier.pt"
+    space_detect_width: int = 1280  # frame width for the space monitor's background/texture layers
+    slot_cnn_backend: str = "torch"  # "onnxruntime" → INT8-quantised ONNX on ONNX Runtime (CPU)
+    slot_cache_size: int = 1024  # slot CNN results kept per perceptual crop key (LRU)
+    slot_cache_ttl: float = 30.0  # seconds before a cached slot result is re-scored
+    detector_backend: str = "ultralytics"  # "opencv" → cv2.dnn on ONNX, "tensorrt" → FP16 engine, "onnxruntime" → INT8 ONNX (CPU)
+    ffmpeg_nvdec: bool = False  # decode ffmpeg-piped streams on the GPU (NVDEC, needs CUDA-enabled ffmpeg)
+    detector_batch_size: int = 8  # max frames per batched forward pass across live/parking cameras
+    detector_batch_wait_ms: float = 8.0  # how long the batch worker waits for more frames after the first
+    monitor_workers: int = 32  # threads per bus / space monitor pool; each active stream holds one at a time
+    mjpeg_target_fps: float = 10.0  # annotated MJPEG frames per second rendered for space monitor viewers
+    nvjpeg_encode: bool = False  # encode MJPEG frames on the GPU (nvJPEG via torchvision)
+    detector_cuda_graph: bool = False  # replay live-camera YOLO forwards as CUDA graphs (PyTorch FP16 only)
 
     @computed_field
     @property
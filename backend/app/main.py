@@ -92,11 +92,10 @@ async def websocket_live(ws: WebSocket):
     ws_clients.append(ws)
     try:
         while True:
-            # Push queued messages from live monitors
+            # Push the latest message from each live monitor (pop is atomic vs. the loop's write)
             for cam_id, monitor in list(active_monitors.items()):
-                queue = monitor.get("_ws_queue", [])
-                while queue:
-                    msg = queue.pop(0)
+                msg = monitor.pop("_ws_latest", None)
+                if msg:
                     txt = json.dumps(msg)
                     for client in list(ws_clients):
                         try:
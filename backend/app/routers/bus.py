@@ -9,7 +9,7 @@ from uuid import uuid4
 
 import cv2
 import numpy as np
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
 from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
@@ -29,8 +29,10 @@ from ..schemas.bus import (
 )
 from ..config import settings
 from ..services.bus_monitor import (
+    add_preview_viewer,
     bus_monitors,
     get_bus_monitor_status,
+    remove_preview_viewer,
     start_bus_monitor,
     stop_bus_monitor,
 )
@@ -323,11 +325,14 @@ def monitor_status(bus_id: int):
     return status
 
 
-async def _bus_mjpeg_generator(bus_id: int):
+async def _bus_mjpeg_generator(bus_id: int, height: int | None = None):
     monitor = bus_monitors.get(bus_id)
     if not monitor:
         return
     monitor["_viewers"] = monitor.get("_viewers", 0) + 1
+    # This viewer's preview height counts only while it is connected
+    viewed = monitor
+    add_preview_viewer(viewed, height)
     last_seq = -1
     loop = asyncio.get_event_loop()
     try:
@@ -346,27 +351,38 @@ async def _bus_mjpeg_generator(bus_id: int):
                 await asyncio.sleep(0.03)
                 continue
             last_seq = seq
-            frame_bytes = monitor.get("_annotated_frame")
-            if frame_bytes:
-                yield (
+            slot = monitor.get("_jpeg_slot")
+            if not slot:
+                continue
+            idx, n = slot
+            # Read straight from the monitor's JPEG buffer (no intermediate bytes copy)
+            with memoryview(monitor["_jpeg_bufs"][idx]) as view:
+                chunk = (
                     b"--frame\r\n"
                     b"Content-Type: image/jpeg\r\n\r\n"
-                    + frame_bytes
+                    + view[:n]
                     + b"\r\n"
                 )
+            # Slot gets rewritten two frames later — drop the read if it was overtaken
+            if monitor.get("_frame_seq", 0) - seq >= 2:
+                continue
+            yield chunk
     finally:
+        remove_preview_viewer(viewed, height)
         monitor = bus_monitors.get(bus_id)
         if monitor:
             monitor["_viewers"] = max(0, monitor.get("_viewers", 1) - 1)
 
 
 @router.get("/monitor/feed/{bus_id}")
-async def monitor_feed(bus_id: int):
+async def monitor_feed(bus_id: int, height: int | None = Query(None, ge=0)):
+    """MJPEG feed; `height` requests a preview height (0 = native resolution).
+    The feed renders at the largest height any connected viewer requested."""
     monitor = bus_monitors.get(bus_id)
     if not monitor or monitor["status"] not in ("running", "starting"):
         raise HTTPException(status_code=404, detail="No active passenger monitor")
     return StreamingResponse(
-        _bus_mjpeg_generator(bus_id),
+        _bus_mjpeg_generator(bus_id, height),
         media_type="multipart/x-mixed-replace; boundary=frame",
     )
 
@@ -526,15 +542,20 @@ def seat_monitor_frame(bus_id: int, db: Session = Depends(get_db)):
 
     monitor = bus_seat_monitors.get(bus_id)
     if monitor and monitor.get("status") in ("running", "starting"):
-        deadline = time.time() + 5.0
-        while time.time() < deadline:
-            if monitor.get("_raw_frame"):
-                return Response(
-                    content=monitor["_raw_frame"],
-                    media_type="image/jpeg",
-                    headers={"Cache-Control": "no-store, no-cache"},
-                )
-            time.sleep(0.1)
+        # Ask the monitor to encode raw frames every frame while we wait
+        monitor["_raw_viewers"] = monitor.get("_raw_viewers", 0) + 1
+        try:
+            deadline = time.time() + 5.0
+            while time.time() < deadline:
+                if monitor.get("_raw_frame"):
+                    return Response(
+                        content=monitor["_raw_frame"],
+                        media_type="image/jpeg",
+                        headers={"Cache-Control": "no-store, no-cache"},
+                    )
+                time.sleep(0.1)
+        finally:
+            monitor["_raw_viewers"] = max(0, monitor.get("_raw_viewers", 1) - 1)
         raise HTTPException(status_code=503, detail="Monitor sedang starting, coba lagi.")
 
     try:
@@ -620,36 +641,45 @@ def video_test_status(job_id: str):
 
 
 async def _video_test_mjpeg_generator(job_id: str):
+    test = bus_video_tests.get(job_id)
+    if not test:
+        return
+    test["_viewers"] = test.get("_viewers", 0) + 1
     last_seq = -1
     loop = asyncio.get_event_loop()
-    while True:
-        test = bus_video_tests.get(job_id)
-        if not test:
-            break
-        # Stop streaming if completed and we've already sent the last frame
-        if test["status"] not in ("processing",) and test.get("_annotated_frame") is None:
-            break
-        event = test.get("_frame_event")
-        if event:
-            await loop.run_in_executor(None, event.wait, 0.5)
-            event.clear()
-        seq = test.get("_frame_seq", 0)
-        if seq == last_seq:
+    try:
+        while True:
+            test = bus_video_tests.get(job_id)
+            if not test:
+                break
+            # Stop streaming if completed and we've already sent the last frame
+            if test["status"] not in ("processing",) and test.get("_annotated_frame") is None:
+                break
+            event = test.get("_frame_event")
+            if event:
+                await loop.run_in_executor(None, event.wait, 0.5)
+                event.clear()
+            seq = test.get("_frame_seq", 0)
+            if seq == last_seq:
+                if test["status"] == "completed":
+                    break
+                await asyncio.sleep(0.03)
+                continue
+            last_seq = seq
+            frame_bytes = test.get("_annotated_frame")
+            if frame_bytes:
+                yield (
+                    b"--frame\r\n"
+                    b"Content-Type: image/jpeg\r\n\r\n"
+                    + frame_bytes
+                    + b"\r\n"
+                )
             if test["status"] == "completed":
                 break
-            await asyncio.sleep(0.03)
-            continue
-        last_seq = seq
-        frame_bytes = test.get("_annotated_frame")
-        if frame_bytes:
-            yield (
-                b"--frame\r\n"
-                b"Content-Type: image/jpeg\r\n\r\n"
-                + frame_bytes
-                + b"\r\n"
-            )
-        if test["status"] == "completed":
-            break
+    finally:
+        test = bus_video_tests.get(job_id)
+        if test:
+            test["_viewers"] = max(0, test.get("_viewers", 1) - 1)
 
 
 @router.get("/video-test/feed/{job_id}")
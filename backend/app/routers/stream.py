@@ -149,8 +149,11 @@ async def _mjpeg_generator(camera_id: int, frame_key: str):
     if not monitor:
         return
 
-    # Track viewer count
+    # Track viewer count — per feed too, so the monitor only encodes what is watched
+    viewers_key = "_raw_viewers" if frame_key == "_raw_frame" else "_annotated_viewers"
+    seq_key = "_raw_seq" if frame_key == "_raw_frame" else "_frame_seq"
     monitor["_viewers"] = monitor.get("_viewers", 0) + 1
+    monitor[viewers_key] = monitor.get(viewers_key, 0) + 1
     last_seq = -1
     loop = asyncio.get_event_loop()
     try:
@@ -168,7 +171,7 @@ async def _mjpeg_generator(camera_id: int, frame_key: str):
                 await asyncio.sleep(0.05)
 
             # Skip if frame hasn't changed (stale)
-            seq = monitor.get("_frame_seq", 0)
+            seq = monitor.get(seq_key, 0)
             if seq == last_seq:
                 await asyncio.sleep(0.03)
                 continue
@@ -186,8 +189,7 @@ async def _mjpeg_generator(camera_id: int, frame_key: str):
         monitor = active_monitors.get(camera_id)
         if monitor:
             monitor["_viewers"] = max(0, monitor.get("_viewers", 1) - 1)
-            if frame_key == "_raw_frame":
-                monitor["_raw_requested"] = False
+            monitor[viewers_key] = max(0, monitor.get(viewers_key, 1) - 1)
 
 
 @router.get("/live/snapshot/{camera_id}")
@@ -224,8 +226,6 @@ async def live_feed_raw(camera_id: int):
     monitor = active_monitors.get(camera_id)
     if not monitor or monitor["status"] not in ("running", "starting"):
         raise HTTPException(status_code=404, detail="No active monitor for this camera")
-    # Signal monitor to encode raw frames
-    monitor["_raw_requested"] = True
     return StreamingResponse(
         _mjpeg_generator(camera_id, "_raw_frame"),
         media_type="multipart/x-mixed-replace; boundary=frame",
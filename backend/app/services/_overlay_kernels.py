@@ -0,0 +1,94 @@
+"""
+Numba kernels for the live overlay: every detection box outline, and every
+pre-rendered label tag, written straight into the BGR frame in one pass
+each — no per-box OpenCV call or numpy slice assignment.
+
+Optional: if numba isn't installed HAVE_NUMBA is False and callers keep
+their cv2.polylines path (pip install numba to enable).
+"""
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+
+if HAVE_NUMBA:
+    @njit(cache=True, fastmath=True)
+    def _fill(frame, y0, y1, x0, x1, b, g, r):
+        # Half-open [y0, y1) x [x0, x1), clipped to the frame
+        h, w = frame.shape[0], frame.shape[1]
+        y0, y1 = max(y0, 0), min(y1, h)
+        x0, x1 = max(x0, 0), min(x1, w)
+        for y in range(y0, y1):
+            for x in range(x0, x1):
+                frame[y, x, 0] = b
+                frame[y, x, 1] = g
+                frame[y, x, 2] = r
+
+    @njit(cache=True, fastmath=True)
+    def _rects_kernel(frame, boxes, colors, thickness):
+        # Edge bands centred on the box lines, like cv2.rectangle's thick lines
+        lo = thickness // 2
+        hi = thickness - lo
+        for i in range(boxes.shape[0]):
+            x1, y1, x2, y2 = boxes[i, 0], boxes[i, 1], boxes[i, 2], boxes[i, 3]
+            b, g, r = colors[i, 0], colors[i, 1], colors[i, 2]
+            _fill(frame, y1 - lo, y1 + hi, x1 - lo, x2 + hi, b, g, r)  # top
+            _fill(frame, y2 - lo, y2 + hi, x1 - lo, x2 + hi, b, g, r)  # bottom
+            _fill(frame, y1 + hi, y2 - lo, x1 - lo, x1 + hi, b, g, r)  # left
+            _fill(frame, y1 + hi, y2 - lo, x2 - lo, x2 + hi, b, g, r)  # right
+
+    @njit(cache=True, fastmath=True)
+    def _blit_kernel(frame, atlas, offsets, sizes, pos):
+        # Serial on purpose: labels of nearby boxes overlap, later ones win
+        h, w = frame.shape[0], frame.shape[1]
+        for i in range(offsets.shape[0]):
+            sh, sw = sizes[i, 0], sizes[i, 1]
+            x, y = pos[i, 0], pos[i, 1]
+            x0, y0 = max(x, 0), max(y, 0)
+            x1, y1 = min(x + sw, w), min(y + sh, h)
+            base = offsets[i]
+            for yy in range(y0, y1):
+                row = base + ((yy - y) * sw - x) * 3
+                for xx in range(x0, x1):
+                    src = row + xx * 3
+                    frame[yy, xx, 0] = atlas[src]
+                    frame[yy, xx, 1] = atlas[src + 1]
+                    frame[yy, xx, 2] = atlas[src + 2]
+
+
+def draw_rects(frame: np.ndarray, boxes: np.ndarray, colors: np.ndarray, thickness: int = 2) -> None:
+    """
+    Outline boxes (N, 4) int32 x1, y1, x2, y2 on a BGR uint8 frame in place;
+    colors is (N, 3) uint8 BGR, one row per box. Needs HAVE_NUMBA.
+    """
+    _rects_kernel(frame, boxes, colors, thickness)
+
+
+def blit_sprites(frame: np.ndarray, atlas: np.ndarray, offsets: np.ndarray,
+                 sizes: np.ndarray, pos: np.ndarray) -> None:
+    """
+    Copy N BGR sprites into the frame, clipped to it. Sprite i is stored
+    row-major in the flat uint8 `atlas` from offsets[i], sizes[i] is its
+    (h, w) and pos[i] its top-left (x, y) — int64 (N,) / (N, 2) arrays.
+    Needs HAVE_NUMBA.
+    """
+    _blit_kernel(frame, atlas, offsets, sizes, pos)
+
+
+def warmup() -> None:
+    """Trigger JIT compilation (or load the on-disk cache) before the monitor runs."""
+    if not HAVE_NUMBA:
+        return
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    draw_rects(frame, np.array([[1, 1, 6, 6]], dtype=np.int32), np.zeros((1, 3), dtype=np.uint8))
+    blit_sprites(frame, np.zeros(12, dtype=np.uint8), np.zeros(1, dtype=np.int64),
+                 np.array([[2, 2]], dtype=np.int64), np.array([[-1, 7]], dtype=np.int64))
+    logger.info("Overlay kernels compiled")
@@ -0,0 +1,70 @@
+"""
+Numba kernel that letterboxes a full-size BGR uint8 frame straight into the
+detector's CHW RGB float input: bilinear resize, channel swap, /255 and the
+HWC → CHW transpose in one parallel pass over the output rows — instead of
+cv2.resize plus Ultralytics' own letterbox / colour / normalise / transpose
+passes, each walking the whole image.
+
+Optional: if numba isn't installed HAVE_NUMBA is False and callers keep
+their cv2.resize + predictor preprocessing path (pip install numba to enable).
+"""
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+
+if HAVE_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _letterbox_kernel(src, dst, nh, nw, top, left):
+        h, w = src.shape[0], src.shape[1]
+        sy = h / nh
+        sx = w / nw
+        # Source columns + weights are the same for every row: compute once
+        xs0 = np.empty(nw, dtype=np.int64)
+        xs1 = np.empty(nw, dtype=np.int64)
+        wx = np.empty(nw, dtype=np.float32)
+        for dx in range(nw):
+            fx = max((dx + 0.5) * sx - 0.5, 0.0)  # half-pixel centres, like cv2 / F.interpolate
+            x0 = min(int(fx), w - 1)
+            xs0[dx] = x0
+            xs1[dx] = min(x0 + 1, w - 1)
+            wx[dx] = fx - x0
+        inv = np.float32(1.0 / 255.0)
+        for dy in prange(nh):
+            fy = max((dy + 0.5) * sy - 0.5, 0.0)
+            y0 = min(int(fy), h - 1)
+            y1 = min(y0 + 1, h - 1)
+            wy = np.float32(fy - y0)
+            for dx in range(nw):
+                x0, x1, a = xs0[dx], xs1[dx], wx[dx]
+                for c in range(3):
+                    upper = src[y0, x0, c] * (1 - a) + src[y0, x1, c] * a
+                    lower = src[y1, x0, c] * (1 - a) + src[y1, x1, c] * a
+                    # BGR channel c → RGB plane 2 - c
+                    dst[2 - c, top + dy, left + dx] = (upper * (1 - wy) + lower * wy) * inv
+
+
+def letterbox_chw(frame: np.ndarray, dst: np.ndarray, nh: int, nw: int, top: int, left: int) -> None:
+    """
+    Resize BGR uint8 `frame` to (nh, nw) and write it as RGB in [0, 1] into
+    dst[:, top:top + nh, left:left + nw] of a (3, H, W) float32 buffer. The
+    padding around it is left alone — the caller fills it. Needs HAVE_NUMBA.
+    """
+    _letterbox_kernel(frame, dst, nh, nw, top, left)
+
+
+def warmup() -> None:
+    """Trigger JIT compilation (or load the on-disk cache) before the detector runs."""
+    if not HAVE_NUMBA:
+        return
+    letterbox_chw(np.zeros((8, 8, 3), dtype=np.uint8), np.zeros((3, 8, 8), dtype=np.float32),
+                  4, 8, 2, 0)
+    logger.info("Letterbox kernel compiled")
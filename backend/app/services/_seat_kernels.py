@@ -0,0 +1,88 @@
+"""
+Numba kernel that scores every seat/slot tile in one parallel sweep:
+masked mean abs-diff vs. the reference, hot-pixel ratio, and mean squared
+Laplacian — one pass over each tile instead of several OpenCV calls with
+Python glue in between.
+
+Optional: if numba isn't installed HAVE_NUMBA is False and callers keep
+their per-seat OpenCV path (pip install numba to enable).
+"""
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+
+if HAVE_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _score_kernel(gray, ref, lap_sq, use_ref, use_lap, hot_thr,
+                      boxes, masks, offsets, pixel_counts, todo):
+        n = boxes.shape[0]
+        mean_diff = np.zeros(n, dtype=np.float32)
+        hot_ratio = np.zeros(n, dtype=np.float32)
+        texture = np.zeros(n, dtype=np.float32)
+        for i in prange(n):
+            pc = pixel_counts[i]
+            if not todo[i] or pc == 0:
+                continue
+            x0, y0, x1, y1 = boxes[i, 0], boxes[i, 1], boxes[i, 2], boxes[i, 3]
+            w = x1 - x0
+            base = offsets[i]
+            s_diff = 0.0
+            hot = 0
+            s_lap = 0.0
+            for y in range(y0, y1):
+                row = base + (y - y0) * w - x0
+                for x in range(x0, x1):
+                    if masks[row + x] == 0:
+                        continue
+                    if use_ref:
+                        d = abs(np.int32(gray[y, x]) - np.int32(ref[y, x]))
+                        s_diff += d
+                        if d > hot_thr:
+                            hot += 1
+                    if use_lap:
+                        s_lap += lap_sq[y, x]
+            mean_diff[i] = s_diff / pc
+            hot_ratio[i] = hot / pc
+            texture[i] = s_lap / pc
+        return mean_diff, hot_ratio, texture
+
+
+def score_seats(gray: np.ndarray, ref: np.ndarray | None, lap_sq: np.ndarray | None,
+                bboxes: np.ndarray, masks: np.ndarray, offsets: np.ndarray,
+                pixel_counts: np.ndarray, hot_thr: int,
+                todo: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return (mean_diff, hot_ratio, texture) per seat; seats with todo[i] False
+    are skipped (0). ref / lap_sq may be None — their outputs stay 0.
+    bboxes is (N, 4) int32 x0, y0, x1, y1; masks holds every seat's bbox-sized
+    mask back to back, seat i starting at offsets[i].
+    """
+    use_ref = ref is not None
+    use_lap = lap_sq is not None
+    return _score_kernel(
+        gray, ref if use_ref else gray,
+        lap_sq if use_lap else np.zeros((1, 1), dtype=np.float32),
+        use_ref, use_lap, hot_thr,
+        bboxes, masks, offsets, pixel_counts, todo,
+    )
+
+
+def warmup() -> None:
+    """Trigger JIT compilation (or load the on-disk cache) before the monitor runs."""
+    if not HAVE_NUMBA:
+        return
+    gray = np.zeros((4, 4), dtype=np.uint8)
+    score_seats(gray, gray, np.zeros((4, 4), dtype=np.float32),
+                np.array([[0, 0, 2, 2]], dtype=np.int32), np.full(4, 255, np.uint8),
+                np.zeros(1, dtype=np.int64), np.array([4], dtype=np.int64), 17,
+                np.ones(1, dtype=np.bool_))
+    logger.info("Seat scoring kernel compiled")
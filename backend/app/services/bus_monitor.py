@@ -8,6 +8,7 @@ import logging
 import math
 import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
@@ -28,9 +29,10 @@ from .live_monitor import (
     STREAM_DEAD_TIMEOUT,
     FFmpegReader,
     FrameReader,
+    _encode_jpeg,
     _ffprobe_stream,
-    _get_stream_url,
     _open_capture,
+    _resolve_url,
 )
 from .tracker import VehicleTracker
 
@@ -39,6 +41,22 @@ logger = logging.getLogger(__name__)
 bus_monitors: dict[int, dict] = {}
 
 SNAPSHOT_INTERVAL = 300  # Save PassengerSnapshot every 5 minutes
+JPEG_BUF_SIZE = 256 * 1024  # Preallocated per-slot JPEG buffer (grown if a frame is larger)
+
+# MJPEG preview: downscale before encode (viewers render <=540p); height 0 = native
+PREVIEW_HEIGHT = 540
+JPEG_QUALITY = 55
+JPEG_QUALITY_LOW = 40        # used while encoding is consistently slow
+ENCODE_SLOW_MS = 10.0        # mean encode time above this → drop to JPEG_QUALITY_LOW
+ENCODE_PROBE_WINDOW = 2.0    # seconds per encode-latency measurement window
+
+_TZ = ZoneInfo(settings.timezone)
+
+# Monitors run as asyncio tasks on the server loop; their blocking work (frame
+# reads, detection, DB writes, yt-dlp) goes through this shared pool, so a bus
+# waiting out a reconnect backoff holds no OS thread. Each running bus keeps
+# one worker busy, so MONITOR_WORKERS caps the buses served without queueing.
+_monitor_pool = ThreadPoolExecutor(max_workers=settings.monitor_workers, thread_name_prefix="bus-monitor")
 
 
 def _draw_bus_frame(frame, tracked: list[dict],
@@ -85,22 +103,64 @@ def _draw_bus_frame(frame, tracked: list[dict],
     )
 
 
-def _resolve_url(url: str) -> str:
-    """Use yt-dlp for YouTube URLs; return RTSP/HTTP URLs as-is."""
-    if "youtube" in url or "youtu.be" in url:
-        return _get_stream_url(url)
-    return url
-
-
-def _monitor_loop(bus_id: int, capacity: int,
-                  stream_origin: str, stream_url: str, model_name: str | None,
-                  line_x1: float, line_y1: float, line_x2: float, line_y2: float):
+def _publish_frame(monitor: dict, jpeg) -> None:
+    """
+    Copy an encoded JPEG (_encode_jpeg bytes or a cv2.imencode array — any
+    buffer) into the monitor's preallocated double buffer and bump _frame_seq.
+    The viewer reads slot _jpeg_slot while the next frame is written into the
+    other one, so no per-frame bytes are allocated.
+    """
+    seq = monitor["_frame_seq"] + 1
+    idx = seq & 1
+    # Flat byte view: bytearray slice assignment rejects an (N, 1) ndarray
+    data = memoryview(jpeg).cast("B")
+    n = data.nbytes
+    bufs = monitor["_jpeg_bufs"]
+    if n > len(bufs[idx]):
+        # Swap in a larger buffer instead of resizing (a viewer may hold a view)
+        bufs[idx] = bytearray(max(n, 2 * len(bufs[idx])))
+    bufs[idx][:n] = data
+    monitor["_jpeg_slot"] = (idx, n)
+    monitor["_frame_seq"] = seq
+    event = monitor.get("_frame_event")
+    if event:
+        event.set()
+
+
+def _update_preview_height(monitor: dict) -> None:
+    # Largest request wins (0 = native beats any height); default with no viewers
+    heights = monitor["_viewer_heights"]
+    monitor["_viewer_hint_height"] = 0 if 0 in heights else max(heights, default=PREVIEW_HEIGHT)
+
+
+def add_preview_viewer(monitor: dict, height: int | None) -> None:
+    """Register a feed viewer's preview height (None = PREVIEW_HEIGHT, 0 = native).
+    The preview is rendered at the largest height any connected viewer asked for,
+    so a small client never downgrades the others. Call from the event loop."""
+    monitor["_viewer_heights"].append(PREVIEW_HEIGHT if height is None else height)
+    _update_preview_height(monitor)
+
+
+def remove_preview_viewer(monitor: dict, height: int | None) -> None:
+    """Undo add_preview_viewer() when the viewer disconnects."""
+    heights = monitor["_viewer_heights"]
+    h = PREVIEW_HEIGHT if height is None else height
+    if h in heights:
+        heights.remove(h)
+    _update_preview_height(monitor)
+
+
+async def _monitor_loop(bus_id: int, capacity: int,
+                        stream_origin: str, stream_url: str, model_name: str | None,
+                        line_x1: float, line_y1: float, line_x2: float, line_y2: float):
     monitor = bus_monitors.get(bus_id)
     if not monitor:
         return
     try:
-        _monitor_loop_inner(bus_id, capacity, stream_origin, stream_url, model_name, monitor,
-                            line_x1, line_y1, line_x2, line_y2)
+        await _monitor_loop_inner(bus_id, capacity, stream_origin, stream_url, model_name, monitor,
+                                  line_x1, line_y1, line_x2, line_y2)
+    except asyncio.CancelledError:
+        logger.info(f"Bus {bus_id}: Monitor task cancelled")
     except Exception as e:
         logger.error(f"Bus {bus_id}: UNHANDLED ERROR in monitor loop: {e}", exc_info=True)
         if monitor:
@@ -108,24 +168,19 @@ def _monitor_loop(bus_id: int, capacity: int,
             monitor["error"] = str(e)
 
 
-def _make_reader(stream_url: str, bus_id: int) -> tuple["FrameReader | FFmpegReader", int]:
+def _make_reader(stream_url: str, bus_id: int) -> "FrameReader | FFmpegReader | None":
     """
-    Return (reader, frame_height).
+    Return a frame reader, or None if the stream can't be opened.
     - RTSP → cv2.VideoCapture + FrameReader (low-latency, buffered live stream)
     - HTTP/YouTube CDN → FFmpegReader (ffmpeg subprocess pipe, handles reconnect)
     """
     is_rtsp = stream_url.startswith("rtsp://")
     if is_rtsp:
+        # No FRAME_HEIGHT probe: the line zone is built from the first real frame.
         cap = _open_capture(stream_url)
         if not cap.isOpened():
-            return None, 0
-        frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        if frame_height == 0:
-            ret, tmp = cap.read()
-            if ret:
-                frame_height = tmp.shape[0]
-                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-        return FrameReader(cap), frame_height
+            return None
+        return FrameReader(cap)
     else:
         # Use ffprobe to get dimensions, then start ffmpeg pipe reader.
         w, h, fps = _ffprobe_stream(stream_url)
@@ -139,15 +194,148 @@ def _make_reader(stream_url: str, bus_id: int) -> tuple["FrameReader | FFmpegRea
                 fps = 25.0
             else:
                 logger.error(f"Bus {bus_id}: Cannot probe stream dimensions")
-                return None, 0
-        reader = FFmpegReader(stream_url, width=w, height=h, fps=fps)
-        return reader, h
+                return None
+        return FFmpegReader(stream_url, width=w, height=h, fps=fps)
 
 
-def _monitor_loop_inner(bus_id: int, capacity: int,
-                        stream_origin: str, stream_url: str, model_name: str | None, monitor: dict,
-                        line_x1: float, line_y1: float, line_x2: float, line_y2: float):
-    reader, frame_height = _make_reader(stream_url, bus_id)
+class _PassengerCounter:
+    """
+    Per-bus detection state. process() handles one frame (detect → track →
+    count → snapshot → render) and is blocking, so the monitor task runs it
+    on _monitor_pool rather than on the event loop.
+    """
+
+    CONFIDENCE = 0.15
+
+    def __init__(self, bus_id: int, capacity: int, model_name: str | None, monitor: dict,
+                 line_x1: float, line_y1: float, line_x2: float, line_y2: float):
+        self.bus_id = bus_id
+        self.capacity = capacity
+        self.model_name = model_name
+        self.monitor = monitor
+        self.line_norm = (line_x1, line_y1, line_x2, line_y2)
+
+        self.detector = PersonDetector(model_name, confidence=self.CONFIDENCE)
+        # Warm up before "running" so the first viewer doesn't pay model/CUDA init latency
+        self.detector.warmup()
+        # Placeholder line; the real line zone is built on the first frame
+        self.tracker = VehicleTracker(
+            0,
+            lost_track_buffer=90,
+            minimum_matching_threshold=0.7,
+        )
+        self.line_pts: tuple[int, int, int, int] | None = None
+
+        self.frame_idx = 0
+        self.db = SessionLocal()
+        self.last_snapshot = datetime.now(_TZ)
+        self.jpeg_quality = JPEG_QUALITY
+        self.encode_ms, self.encode_n = 0.0, 0
+        self.encode_window_start = time.monotonic()
+
+    def _build_line_zone(self, frame) -> None:
+        """Build the line zone from the first frame's actual pixel dimensions."""
+        line_x1, line_y1, line_x2, line_y2 = self.line_norm
+        fh, fw = frame.shape[:2]
+        x1_px = int(fw * line_x1)
+        y1_px = max(int(fh * line_y1), 1)
+        x2_px = int(fw * line_x2)
+        y2_px = max(int(fh * line_y2), 1)
+        self.line_pts = (x1_px, y1_px, x2_px, y2_px)
+        self.monitor["_line_pts"] = self.line_pts
+        self.tracker.line_zone = sv.LineZone(
+            start=sv.Point(x1_px, y1_px),
+            end=sv.Point(x2_px, y2_px),
+            triggering_anchors=[sv.Position.BOTTOM_CENTER],
+        )
+        logger.warning(
+            f"Bus {self.bus_id}: Passenger monitor started (model={self.model_name or settings.yolo_model}, "
+            f"conf={self.CONFIDENCE}, frame={fh}x{fw}, "
+            f"line=({x1_px},{y1_px})→({x2_px},{y2_px}), anchor=BOTTOM_CENTER)"
+        )
+
+    def process(self, frame) -> None:
+        monitor = self.monitor
+        bus_id = self.bus_id
+        self.frame_idx += 1
+        frame_idx = self.frame_idx
+
+        if self.line_pts is None:
+            self._build_line_zone(frame)
+
+        # Cache raw JPEG every ~30 frames for /monitor/frame endpoint
+        if frame_idx % 30 == 1:
+            monitor["_raw_frame"] = _encode_jpeg(frame, 70)
+
+        orig_w = frame.shape[1]
+        scale = 640 / orig_w
+        small = cv2.resize(frame, None, fx=scale, fy=scale)
+        raw_dets = self.detector.detect(small, scale=scale)
+
+        tracked = self.tracker.update(raw_dets)
+        now = datetime.now(_TZ)
+        line_in, line_out = self.tracker.get_line_counts()
+        passenger_count = max(0, line_in - line_out)
+
+        prev_in = monitor.get("line_in", 0)
+        prev_out = monitor.get("line_out", 0)
+        if line_in != prev_in or line_out != prev_out:
+            logger.info(f"Bus {bus_id}: Crossing — in={line_in} out={line_out} (frame {frame_idx})")
+
+        monitor["frame_count"] = frame_idx
+        monitor["line_in"] = line_in
+        monitor["line_out"] = line_out
+        monitor["passenger_count"] = passenger_count
+        monitor["last_update"] = now.isoformat()
+
+        if (now - self.last_snapshot).total_seconds() >= SNAPSHOT_INTERVAL:
+            self.db.add(PassengerSnapshot(
+                bus_id=bus_id,
+                passenger_count=passenger_count,
+                timestamp=now,
+            ))
+            self.db.commit()
+            self.last_snapshot = now
+            logger.info(f"Bus {bus_id}: Snapshot saved — onboard={passenger_count}")
+
+        has_viewers = monitor.get("_viewers", 0) > 0
+        if not has_viewers:
+            return
+
+        _draw_bus_frame(frame, tracked, *self.line_pts,
+                        line_in, line_out, passenger_count, self.capacity)
+
+        preview = frame
+        preview_h = monitor.get("_viewer_hint_height", PREVIEW_HEIGHT)
+        if preview_h and frame.shape[0] > preview_h:
+            ps = preview_h / frame.shape[0]
+            preview = cv2.resize(frame, None, fx=ps, fy=ps, interpolation=cv2.INTER_AREA)
+
+        t0 = time.perf_counter()
+        buf = _encode_jpeg(preview, self.jpeg_quality)
+        self.encode_ms += (time.perf_counter() - t0) * 1000.0
+        self.encode_n += 1
+        _publish_frame(monitor, buf)
+
+        # Adapt quality to measured encode latency (with hysteresis)
+        if time.monotonic() - self.encode_window_start >= ENCODE_PROBE_WINDOW:
+            mean_ms = self.encode_ms / self.encode_n
+            if mean_ms > ENCODE_SLOW_MS:
+                self.jpeg_quality = JPEG_QUALITY_LOW
+            elif mean_ms < ENCODE_SLOW_MS / 2:
+                self.jpeg_quality = JPEG_QUALITY
+            self.encode_ms, self.encode_n = 0.0, 0
+            self.encode_window_start = time.monotonic()
+
+    def close(self) -> None:
+        self.db.close()
+
+
+async def _monitor_loop_inner(bus_id: int, capacity: int,
+                              stream_origin: str, stream_url: str, model_name: str | None, monitor: dict,
+                              line_x1: float, line_y1: float, line_x2: float, line_y2: float):
+    loop = asyncio.get_running_loop()
+    reader = await loop.run_in_executor(_monitor_pool, _make_reader, stream_url, bus_id)
     if reader is None:
         monitor["status"] = "error"
         monitor["error"] = "Cannot open stream"
@@ -157,40 +345,39 @@ def _monitor_loop_inner(bus_id: int, capacity: int,
     if model_name and not os.path.exists(model_name):
         logger.warning(f"Bus {bus_id}: Model '{model_name}' not found, using default ({settings.yolo_model})")
         model_name = None
-    BUS_CONFIDENCE = 0.15
-    detector = PersonDetector(model_name, confidence=BUS_CONFIDENCE)
-    tracker = VehicleTracker(
-        frame_height,
-        lost_track_buffer=90,
-        minimum_matching_threshold=0.7,
-    )
+    try:
+        counter = await loop.run_in_executor(
+            _monitor_pool, _PassengerCounter, bus_id, capacity, model_name, monitor,
+            line_x1, line_y1, line_x2, line_y2,
+        )
+    except BaseException:
+        reader.stop()
+        raise
 
     if monitor.get("status") == "stopping":
         logger.info(f"Bus {bus_id}: Stop requested before monitor started")
         reader.stop()
+        counter.close()
         return
     monitor["status"] = "running"
 
-    # Line zone is built on the first frame (need actual frame_width for pixel coords).
-    line_zone_ready = False
-    x1_px = y1_px = x2_px = y2_px = 0
-
-    frame_idx = 0
     last_frame_time = time.time()
     reconnect_attempts = 0
-    tz = ZoneInfo(settings.timezone)
-    db = SessionLocal()
-    last_snapshot = datetime.now(tz)
+    # The pool's own Future, not the asyncio wrapper: cancelling the task
+    # cancels the wrapper at once, but the worker call keeps running
+    pending: Future | None = None
 
     try:
         while monitor.get("status") == "running":
-            frame = reader.read(timeout=FRAME_QUEUE_TIMEOUT)
+            # Tracked in `pending` too: stop() must not release the capture under a read
+            pending = _monitor_pool.submit(reader.read, FRAME_QUEUE_TIMEOUT)
+            frame = await asyncio.wrap_future(pending)
 
             if frame is None:
                 if time.time() - last_frame_time < STREAM_DEAD_TIMEOUT:
                     continue
 
-                reader.stop()
+                await loop.run_in_executor(_monitor_pool, reader.stop)
                 reconnect_attempts += 1
                 if reconnect_attempts > MAX_RECONNECT_ATTEMPTS:
                     monitor["status"] = "error"
@@ -199,106 +386,46 @@ def _monitor_loop_inner(bus_id: int, capacity: int,
 
                 delay = min(RECONNECT_DELAY_BASE * (2 ** (reconnect_attempts - 1)), RECONNECT_DELAY_MAX)
                 logger.warning(f"Bus {bus_id}: Reconnecting ({reconnect_attempts}/{MAX_RECONNECT_ATTEMPTS}), waiting {delay}s...")
-                time.sleep(delay)
+                # Backoff holds no thread; stop_bus_monitor cancels the task mid-sleep
+                await asyncio.sleep(delay)
 
                 if monitor.get("status") != "running":
                     break
 
                 try:
-                    stream_url = _resolve_url(stream_origin)
+                    # Reuse the cached URL first; re-run yt-dlp only once it has failed twice
+                    stream_url = await loop.run_in_executor(
+                        _monitor_pool, _resolve_url, stream_origin, reconnect_attempts > 2,
+                    )
                 except Exception as e:
                     logger.error(f"Bus {bus_id}: URL resolve failed: {e}")
                     continue
 
-                reader, _ = _make_reader(stream_url, bus_id)
-                if reader is None:
+                new_reader = await loop.run_in_executor(_monitor_pool, _make_reader, stream_url, bus_id)
+                if new_reader is None:
                     continue
+                reader = new_reader
                 last_frame_time = time.time()
                 continue
 
             last_frame_time = time.time()
             reconnect_attempts = 0
-            frame_idx += 1
-
-            # Build line zone on first frame using actual pixel dimensions
-            if not line_zone_ready:
-                fh, fw = frame.shape[:2]
-                x1_px = int(fw * line_x1)
-                y1_px = max(int(fh * line_y1), 1)
-                x2_px = int(fw * line_x2)
-                y2_px = max(int(fh * line_y2), 1)
-                monitor["_line_pts"] = (x1_px, y1_px, x2_px, y2_px)
-                tracker.line_zone = sv.LineZone(
-                    start=sv.Point(x1_px, y1_px),
-                    end=sv.Point(x2_px, y2_px),
-                    triggering_anchors=[sv.Position.BOTTOM_CENTER],
-                )
-                line_zone_ready = True
-                logger.warning(
-                    f"Bus {bus_id}: Passenger monitor started (model={model_name or settings.yolo_model}, "
-                    f"conf={BUS_CONFIDENCE}, frame={fh}x{fw}, "
-                    f"line=({x1_px},{y1_px})→({x2_px},{y2_px}), anchor=BOTTOM_CENTER)"
-                )
-
-            # Cache raw JPEG every ~30 frames for /monitor/frame endpoint
-            if frame_idx % 30 == 1:
-                _, raw_buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-                monitor["_raw_frame"] = raw_buf.tobytes()
-
-            orig_w = frame.shape[1]
-            scale = 640 / orig_w
-            small = cv2.resize(frame, None, fx=scale, fy=scale)
-            raw_dets = detector.detect(small)
-            for d in raw_dets:
-                d["bbox"] = [v / scale for v in d["bbox"]]
-
-            tracked = tracker.update(raw_dets)
-            now = datetime.now(tz)
-            line_in, line_out = tracker.get_line_counts()
-            passenger_count = max(0, line_in - line_out)
-
-            prev_in = monitor.get("line_in", 0)
-            prev_out = monitor.get("line_out", 0)
-            if line_in != prev_in or line_out != prev_out:
-                logger.info(f"Bus {bus_id}: Crossing — in={line_in} out={line_out} (frame {frame_idx})")
-
-            monitor["frame_count"] = frame_idx
-            monitor["line_in"] = line_in
-            monitor["line_out"] = line_out
-            monitor["passenger_count"] = passenger_count
-            monitor["last_update"] = now.isoformat()
-
-            if (now - last_snapshot).total_seconds() >= SNAPSHOT_INTERVAL:
-                db.add(PassengerSnapshot(
-                    bus_id=bus_id,
-                    passenger_count=passenger_count,
-                    timestamp=now,
-                ))
-                db.commit()
-                last_snapshot = now
-                logger.info(f"Bus {bus_id}: Snapshot saved — onboard={passenger_count}")
-
-            has_viewers = monitor.get("_viewers", 0) > 0
-            if not has_viewers:
-                continue
 
-            _draw_bus_frame(frame, tracked, x1_px, y1_px, x2_px, y2_px,
-                            line_in, line_out, passenger_count, capacity)
-
-            _, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 55])
-            monitor["_annotated_frame"] = buf.tobytes()
-            monitor["_frame_seq"] = monitor.get("_frame_seq", 0) + 1
-            event = monitor.get("_frame_event")
-            if event:
-                event.set()
+            pending = _monitor_pool.submit(counter.process, frame)
+            await asyncio.wrap_future(pending)
 
     except Exception as e:
         logger.error(f"Bus {bus_id}: Error — {e}")
         monitor["status"] = "error"
         monitor["error"] = str(e)
     finally:
-        reader.stop()
-        db.close()
+        # Cancellation doesn't interrupt a running worker call — let it finish
+        # (`pending` reports done only once it has) before stopping the reader /
+        # closing the DB session it is using.
+        if pending is not None and not pending.done():
+            await asyncio.wait([asyncio.wrap_future(pending)])
+        await loop.run_in_executor(_monitor_pool, reader.stop)
+        counter.close()
         if monitor.get("status") == "running":
             monitor["status"] = "stopped"
         logger.info(f"Bus {bus_id}: Passenger monitor stopped")
@@ -332,27 +459,32 @@ async def start_bus_monitor(bus_id: int, capacity: int,
         "line_y1": line_y1,
         "line_x2": line_x2,
         "line_y2": line_y2,
-        "_annotated_frame": None,
+        "_jpeg_bufs": [bytearray(JPEG_BUF_SIZE), bytearray(JPEG_BUF_SIZE)],
+        "_jpeg_slot": None,
         "_raw_frame": None,
         "_line_pts": (0, 0, 0, 0),
         "_frame_event": threading.Event(),
         "_frame_seq": 0,
         "_viewers": 0,
+        "_viewer_heights": [],  # preview height each connected viewer asked for
+        "_viewer_hint_height": PREVIEW_HEIGHT,  # what process() renders: see add_preview_viewer()
     }
     bus_monitors[bus_id] = monitor
 
-    thread = threading.Thread(
-        target=_monitor_loop,
-        args=(bus_id, capacity, stream_origin, stream_url, model_name,
-              line_x1, line_y1, line_x2, line_y2),
-        daemon=True,
-    )
-    thread.start()
-    monitor["_thread"] = thread
+    monitor["_task"] = asyncio.create_task(_monitor_loop(
+        bus_id, capacity, stream_origin, stream_url, model_name,
+        line_x1, line_y1, line_x2, line_y2,
+    ))
 
     return {"bus_id": bus_id, "status": "starting"}
 
 
+def _forget_monitor(bus_id: int, monitor: dict) -> None:
+    # Only drop our own entry — a new monitor may have been started meanwhile
+    if bus_monitors.get(bus_id) is monitor:
+        bus_monitors.pop(bus_id, None)
+
+
 def stop_bus_monitor(bus_id: int) -> dict:
     monitor = bus_monitors.get(bus_id)
     if not monitor:
@@ -360,13 +492,16 @@ def stop_bus_monitor(bus_id: int) -> dict:
 
     monitor["status"] = "stopping"
 
-    def _cleanup():
-        thread = monitor.get("_thread")
-        if thread and thread.is_alive():
-            thread.join(timeout=20)
-        bus_monitors.pop(bus_id, None)
+    task = monitor.get("_task")
+    if task is None or task.done():
+        _forget_monitor(bus_id, monitor)
+    else:
+        def _cancel():
+            task.add_done_callback(lambda _: _forget_monitor(bus_id, monitor))
+            task.cancel()
 
-    threading.Thread(target=_cleanup, daemon=True).start()
+        # Sync endpoints run in FastAPI's threadpool — cancel on the task's own loop
+        task.get_loop().call_soon_threadsafe(_cancel)
     return {"bus_id": bus_id, "status": "stopping"}
 
 
@@ -391,11 +526,8 @@ def stop_all_bus_monitors():
         monitor = bus_monitors.get(bus_id)
         if monitor:
             monitor["status"] = "stopping"
-    for bus_id in list(bus_monitors.keys()):
-        monitor = bus_monitors.get(bus_id)
-        if monitor:
-            thread = monitor.get("_thread")
-            if thread and thread.is_alive():
-                thread.join(timeout=5)
+            task = monitor.get("_task")
+            if task and not task.done():
+                task.get_loop().call_soon_threadsafe(task.cancel)
     bus_monitors.clear()
     logger.info("All bus monitors stopped")
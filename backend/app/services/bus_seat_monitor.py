@@ -3,6 +3,7 @@ Bus seat detection monitor — detects occupied/free seats via an overhead
 interior camera. One polygon per seat (drawn in Seat Editor).
 Keys: bus_id (int) — independent from bus_monitors.
 """
+import asyncio
 import logging
 import threading
 import time
@@ -11,7 +12,9 @@ from datetime import datetime
 import cv2
 import numpy as np
 
-from .slot_classifier import get_slot_classifier, load_slot_classifier
+from ._seat_kernels import HAVE_NUMBA, score_seats
+from ._seat_kernels import warmup as warmup_seat_kernels
+from .slot_classifier import SlotClassifier, get_slot_classifier, load_slot_classifier
 from ..config import settings
 from .live_monitor import (
     FRAME_QUEUE_TIMEOUT,
@@ -19,9 +22,10 @@ from .live_monitor import (
     RECONNECT_DELAY_BASE,
     RECONNECT_DELAY_MAX,
     STREAM_DEAD_TIMEOUT,
+    FrameEncoder,
     FrameReader,
-    _get_stream_url,
     _open_capture,
+    _resolve_url,
 )
 
 logger = logging.getLogger(__name__)
@@ -37,103 +41,227 @@ BG_DIFF_THRESHOLD = 35
 MIN_OCCUPIED_RATIO = 0.15
 TEXTURE_THRESHOLD = 150.0
 DETECT_EVERY_N = 5
-
-
-def _resolve_url(url: str) -> str:
-    if "youtube" in url or "youtu.be" in url:
-        return _get_stream_url(url)
-    return url
-
-
-def _build_polygon_mask(polygon: list[list[float]], shape: tuple[int, int]) -> np.ndarray:
-    mask = np.zeros(shape[:2], dtype=np.uint8)
-    pts = np.array(polygon, dtype=np.int32)
-    cv2.fillPoly(mask, [pts], 255)
-    return mask
+RAW_ENCODE_EVERY_N = 25   # raw snapshot refresh cadence when nobody is waiting on it
+RAW_MJPEG_FPS = 10        # raw encode rate cap while a snapshot request is waiting
+
+# Full-frame filters go through OpenCV's T-API (cv2.UMat) when an OpenCL device
+# is present; per-seat reductions stay on the CPU arrays
+_USE_OCL = cv2.ocl.haveOpenCL() and cv2.ocl.useOpenCL()
+
+
+class _SeatBatch:
+    """
+    All seats of one monitor in structure-of-arrays form instead of a list of
+    dicts. Frame-independent data (ids, labels, contours, label placement) is
+    set up front; build_geometry() adds the frame-clipped bboxes, bbox-sized
+    polygon masks, pixel counts and CNN crop boxes once the frame size is
+    known. `occupied` is filled by detection and read by drawing/export.
+    """
+
+    def __init__(self, seats_data: list[dict]):
+        self.n = len(seats_data)
+        self.seat_ids = [s["seat_id"] for s in seats_data]
+        self.labels = [s["label"] for s in seats_data]
+        self.polygons = [s["polygon"] for s in seats_data]
+
+        # All contours in one vertex array; pts[i] are (k, 1, 2) views for cv2
+        counts = [len(p) for p in self.polygons]
+        self.poly_offsets = np.zeros(self.n + 1, dtype=np.int32)
+        np.cumsum(counts, out=self.poly_offsets[1:])
+        self.polys_flat = np.array(
+            [v for p in self.polygons for v in p], dtype=np.int32,
+        ).reshape(-1, 2)
+        self.pts = [
+            self.polys_flat[a:b].reshape(-1, 1, 2)
+            for a, b in zip(self.poly_offsets[:-1].tolist(), self.poly_offsets[1:].tolist())
+        ]
+
+        self.label_rects: list[tuple] = []
+        self.label_orgs: list[tuple] = []
+        for pts, label in zip(self.pts, self.labels):
+            cx, cy = int(pts[:, 0, 0].mean()), int(pts[:, 0, 1].mean())
+            (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.55, 2)
+            self.label_rects.append(((cx - tw // 2 - 3, cy - th - 5), (cx + tw // 2 + 3, cy + 3)))
+            self.label_orgs.append((cx - tw // 2, cy))
+
+        self.occupied = np.zeros(self.n, dtype=np.bool_)
+
+        self.bboxes: np.ndarray | None = None        # (N, 4) x0, y0, x1, y1, frame-clipped
+        self.crop_boxes: np.ndarray | None = None    # (N, 4) square CNN crops
+        self.pixel_counts: np.ndarray | None = None  # (N,)
+        self.masks_flat: np.ndarray | None = None    # all tile masks, contiguous
+        self.mask_offsets: np.ndarray | None = None  # (N,) start of each seat's mask
+        self.mask_crops: list[np.ndarray] = []       # (h_i, w_i) views into masks_flat
+        self.union_bbox = (0, 0, 0, 0)
+
+    @property
+    def ready(self) -> bool:
+        return self.bboxes is not None
+
+    def build_geometry(self, shape: tuple[int, int]) -> None:
+        """Per-frame-size geometry; the per-frame checks then only touch each
+        seat's own tile instead of full-frame masks."""
+        fh, fw = shape[:2]
+        self.bboxes = np.zeros((self.n, 4), dtype=np.int32)
+        self.crop_boxes = np.zeros((self.n, 4), dtype=np.int32)
+        for i, pts in enumerate(self.pts):
+            x, y, w, h = cv2.boundingRect(pts)
+            x0, y0 = max(x, 0), max(y, 0)
+            x1, y1 = max(min(x + w, fw), x0), max(min(y + h, fh), y0)
+            self.bboxes[i] = (x0, y0, x1, y1)
+            # Square crop around the polygon (+8 px margin) for the CNN
+            cx, cy, half = x + w // 2, y + h // 2, max(w, h) // 2 + 8
+            self.crop_boxes[i] = (max(0, cx - half), max(0, cy - half),
+                                  min(fw, cx + half), min(fh, cy + half))
+
+        # All tile masks packed back to back in one buffer; mask_crops are views
+        tile_h = self.bboxes[:, 3] - self.bboxes[:, 1]
+        tile_w = self.bboxes[:, 2] - self.bboxes[:, 0]
+        sizes = (tile_h * tile_w).astype(np.int64)
+        self.mask_offsets = np.zeros(self.n, dtype=np.int64)
+        if self.n > 1:
+            np.cumsum(sizes[:-1], out=self.mask_offsets[1:])
+        self.masks_flat = np.zeros(int(sizes.sum()), dtype=np.uint8)
+        self.pixel_counts = np.zeros(self.n, dtype=np.int64)
+        self.mask_crops = []
+        for i, pts in enumerate(self.pts):
+            x0, y0 = int(self.bboxes[i, 0]), int(self.bboxes[i, 1])
+            off, size = int(self.mask_offsets[i]), int(sizes[i])
+            mask = self.masks_flat[off:off + size].reshape(int(tile_h[i]), int(tile_w[i]))
+            if size:
+                cv2.fillPoly(mask, [pts], 255, offset=(-x0, -y0))
+                self.pixel_counts[i] = cv2.countNonZero(mask)
+            self.mask_crops.append(mask)
+
+        if self.n:
+            self.union_bbox = (int(self.bboxes[:, 0].min()), int(self.bboxes[:, 1].min()),
+                               int(self.bboxes[:, 2].max()), int(self.bboxes[:, 3].max()))
+
+    def export(self) -> list[dict]:
+        return [
+            {"seat_id": sid, "label": label, "occupied": occ, "polygon": poly}
+            for sid, label, occ, poly in zip(
+                self.seat_ids, self.labels, self.occupied.tolist(), self.polygons,
+            )
+        ]
 
 
 def _check_occupied_bg(frame_gray: np.ndarray, ref_gray: np.ndarray,
-                       mask: np.ndarray) -> bool:
-    diff = cv2.absdiff(frame_gray, ref_gray)
-    diff_masked = cv2.bitwise_and(diff, diff, mask=mask)
-    pixel_count = int(np.sum(mask > 0))
+                       seats: _SeatBatch, i: int) -> bool:
+    pixel_count = seats.pixel_counts[i]
     if pixel_count == 0:
         return False
-    mean_diff = float(np.sum(diff_masked)) / pixel_count
-    hot_pixels = int(np.sum(
-        (diff_masked > BG_DIFF_THRESHOLD // 2).astype(np.uint8) & (mask > 0)
-    ))
+    x0, y0, x1, y1 = seats.bboxes[i]
+    mask = seats.mask_crops[i]
+    diff = cv2.absdiff(frame_gray[y0:y1, x0:x1], ref_gray[y0:y1, x0:x1])
+    # Masked mean + masked hot-pixel count, all in OpenCV's SIMD kernels
+    mean_diff = cv2.mean(diff, mask=mask)[0]
+    hot = cv2.compare(diff, BG_DIFF_THRESHOLD // 2, cv2.CMP_GT)
+    hot_pixels = cv2.countNonZero(cv2.bitwise_and(hot, mask))
     hot_ratio = hot_pixels / pixel_count
     return mean_diff > BG_DIFF_THRESHOLD and hot_ratio > MIN_OCCUPIED_RATIO
 
 
-def _check_occupied_texture(frame_gray: np.ndarray, mask: np.ndarray) -> bool:
-    pixel_count = int(np.sum(mask > 0))
-    if pixel_count == 0:
+def _prepare_gray(frame: np.ndarray) -> np.ndarray:
+    """Gray + light denoise for absdiff/Laplacian — a 5x5 box is cheaper than a
+    5x5 Gaussian and smooths about as much, so the thresholds above still hold.
+    Runs through the OpenCL T-API when a device is available."""
+    if _USE_OCL:
+        gray = cv2.cvtColor(cv2.UMat(frame), cv2.COLOR_BGR2GRAY)
+        return cv2.boxFilter(gray, -1, (5, 5), borderType=cv2.BORDER_REPLICATE).get()
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.boxFilter(gray, -1, (5, 5), borderType=cv2.BORDER_REPLICATE)
+
+
+def _texture_energy(frame_gray: np.ndarray) -> np.ndarray:
+    """
+    Squared Laplacian of the whole frame, computed once per detection tick and
+    shared by every seat. CV_16S holds the default 3x3 aperture's range (±1020)
+    at a quarter of CV_64F's bandwidth.
+    """
+    if _USE_OCL:
+        lap = cv2.Laplacian(cv2.UMat(frame_gray), cv2.CV_16S)
+        return cv2.multiply(lap, lap, dtype=cv2.CV_32F).get()
+    lap = cv2.Laplacian(frame_gray, cv2.CV_16S)
+    return cv2.multiply(lap, lap, dtype=cv2.CV_32F)
+
+
+def _check_occupied_texture(lap_sq: np.ndarray, seats: _SeatBatch, i: int) -> bool:
+    if seats.pixel_counts[i] == 0:
         return False
-    lap = cv2.Laplacian(frame_gray, cv2.CV_64F)
-    lap_sq = lap ** 2
-    variance = float(np.sum(lap_sq[mask > 0])) / pixel_count
+    x0, y0, x1, y1 = seats.bboxes[i]
+    # Mean of the squared Laplacian over the seat polygon
+    variance = cv2.mean(lap_sq[y0:y1, x0:x1], mask=seats.mask_crops[i])[0]
     return variance > TEXTURE_THRESHOLD
 
 
-def _crop_seat(frame: np.ndarray, polygon: list[list[float]]) -> np.ndarray:
-    pts = np.array(polygon, dtype=np.int32)
-    x, y, w, h = cv2.boundingRect(pts)
-    fh, fw = frame.shape[:2]
-    cx = x + w // 2
-    cy = y + h // 2
-    half = max(w, h) // 2 + 8
-    x1 = max(0, cx - half)
-    y1 = max(0, cy - half)
-    x2 = min(fw, cx + half)
-    y2 = min(fh, cy + half)
-    return frame[y1:y2, x1:x2]
-
-
-def _detect_seat(frame: np.ndarray, frame_gray: np.ndarray,
-                 ref_gray: np.ndarray | None, seat: dict) -> bool:
-    mask = seat["_mask"]
-
-    classifier = get_slot_classifier()
-    if classifier is not None:
-        crop = _crop_seat(frame, seat["polygon"])
-        if crop.size > 0:
-            conf = classifier.predict(crop)
-            if conf > CNN_HIGH:
-                return True
-            if conf < CNN_LOW:
-                return False
-
-    if ref_gray is not None and mask is not None:
-        return _check_occupied_bg(frame_gray, ref_gray, mask)
-
-    if mask is not None:
-        return _check_occupied_texture(frame_gray, mask)
-
-    return False
-
-
-def _draw_seats(frame: np.ndarray, seats: list[dict]) -> None:
-    overlay = frame.copy()
-    for seat in seats:
-        pts = np.array(seat["polygon"], dtype=np.int32)
-        color = _COL_OCC if seat["occupied"] else _COL_FREE
-        cv2.fillPoly(overlay, [pts], color)
-    cv2.addWeighted(overlay, 0.35, frame, 0.65, 0, frame)
-
-    for seat in seats:
-        pts = np.array(seat["polygon"], dtype=np.int32)
-        color = _COL_OCC if seat["occupied"] else _COL_FREE
+def _classify_seats(frame: np.ndarray, seats: _SeatBatch,
+                    classifier: SlotClassifier | None) -> np.ndarray | None:
+    """
+    CNN occupancy probability per seat from one batched forward pass.
+    Returns None when no classifier is loaded; NaN marks seats with an empty crop.
+    """
+    if classifier is None:
+        return None
+    confs = np.full(seats.n, np.nan, dtype=np.float32)
+    crops = [frame[y0:y1, x0:x1] for x0, y0, x1, y1 in seats.crop_boxes.tolist()]
+    valid = [i for i, c in enumerate(crops) if c.size > 0]
+    if valid:
+        try:
+            confs[valid] = classifier.submit([crops[i] for i in valid]).result(
+                timeout=classifier.RESULT_TIMEOUT)
+        except TimeoutError:
+            # Stuck batch worker: this tick falls back to background / texture
+            logger.warning("Bus seat monitor: slot classifier timed out, skipping the CNN layer")
+            return None
+    return confs
+
+
+def _fallback_verdicts(frame_gray: np.ndarray, ref_gray: np.ndarray | None,
+                      seats: _SeatBatch, todo: np.ndarray) -> np.ndarray:
+    """
+    Background (with reference) or texture verdict for the seats in `todo`.
+    With numba, one fused parallel kernel scores them all; otherwise per-seat
+    OpenCV checks.
+    """
+    # Texture is only the fallback without a reference frame
+    lap_sq = _texture_energy(frame_gray) if ref_gray is None else None
+
+    if HAVE_NUMBA:
+        mask = np.zeros(seats.n, dtype=np.bool_)
+        mask[todo] = True
+        mean_diff, hot_ratio, texture = score_seats(
+            frame_gray, ref_gray, lap_sq, seats.bboxes, seats.masks_flat,
+            seats.mask_offsets, seats.pixel_counts, BG_DIFF_THRESHOLD // 2, mask,
+        )
+        if ref_gray is not None:
+            occ = (mean_diff > BG_DIFF_THRESHOLD) & (hot_ratio > MIN_OCCUPIED_RATIO)
+        else:
+            occ = texture > TEXTURE_THRESHOLD
+        return occ[todo]
+
+    if ref_gray is not None:
+        return np.array([_check_occupied_bg(frame_gray, ref_gray, seats, i) for i in todo])
+    return np.array([_check_occupied_texture(lap_sq, seats, i) for i in todo])
+
+
+def _draw_seats(frame: np.ndarray, seats: _SeatBatch) -> None:
+    colors = [_COL_OCC if occ else _COL_FREE for occ in seats.occupied.tolist()]
+
+    # Blend the fills only inside the seats' union bbox, not the whole frame
+    x0, y0, x1, y1 = seats.union_bbox
+    roi = frame[y0:y1, x0:x1]
+    if roi.size:
+        overlay = roi.copy()
+        for pts, color in zip(seats.pts, colors):
+            cv2.fillPoly(overlay, [pts], color, offset=(-x0, -y0))
+        cv2.addWeighted(overlay, 0.35, roi, 0.65, 0, roi)
+
+    for pts, color, rect, label, org in zip(seats.pts, colors, seats.label_rects,
+                                            seats.labels, seats.label_orgs):
         cv2.polylines(frame, [pts], True, color, 2)
-        cx = int(np.mean(pts[:, 0]))
-        cy = int(np.mean(pts[:, 1]))
-        label = seat["label"]
-        (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.55, 2)
-        cv2.rectangle(frame, (cx - tw // 2 - 3, cy - th - 5),
-                      (cx + tw // 2 + 3, cy + 3), (0, 0, 0), -1)
-        cv2.putText(frame, label, (cx - tw // 2, cy),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 2)
+        cv2.rectangle(frame, *rect, (0, 0, 0), -1)
+        cv2.putText(frame, label, org, cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 2)
 
 
 def _seat_monitor_loop(bus_id: int, seats_data: list[dict],
@@ -153,6 +281,7 @@ def _seat_monitor_loop(bus_id: int, seats_data: list[dict],
         cap.release()
         return
 
+    warmup_seat_kernels()
     monitor["status"] = "running"
     cnn_active = get_slot_classifier() is not None
     logger.info(
@@ -160,29 +289,27 @@ def _seat_monitor_loop(bus_id: int, seats_data: list[dict],
         f"({'CNN+fallback' if cnn_active else 'background/texture'})"
     )
 
-    seat_states: list[dict] = []
-    for s in seats_data:
-        seat_states.append({
-            "seat_id": s["seat_id"],
-            "label": s["label"],
-            "polygon": s["polygon"],
-            "occupied": False,
-            "_mask": None,
-        })
-    monitor["seats"] = _export_seats(seat_states)
+    seats = _SeatBatch(seats_data)
+    prev_occupied: np.ndarray | None = None
+    monitor["seats"] = seats.export()
 
     reader = FrameReader(cap)
-    last_frame_time = time.time()
+    encoder = FrameEncoder(monitor)
+    last_frame_time = time.monotonic()
     reconnect_attempts = 0
     reference_gray: np.ndarray | None = None
+    src_shape: tuple | None = None
+    target_wh = (0, 0)
+    resize_buf: np.ndarray | None = None
     frame_count = 0
+    last_raw_ts = 0.0
 
     try:
         while monitor.get("status") == "running":
             frame = reader.read(timeout=FRAME_QUEUE_TIMEOUT)
 
             if frame is None:
-                if time.time() - last_frame_time < STREAM_DEAD_TIMEOUT:
+                if time.monotonic() - last_frame_time < STREAM_DEAD_TIMEOUT:
                     continue
                 reader.stop()
                 reconnect_attempts += 1
@@ -193,12 +320,13 @@ def _seat_monitor_loop(bus_id: int, seats_data: list[dict],
 
                 delay = min(RECONNECT_DELAY_BASE * (2 ** (reconnect_attempts - 1)), RECONNECT_DELAY_MAX)
                 logger.warning(f"Seat monitor bus {bus_id}: Reconnect {reconnect_attempts}/{MAX_RECONNECT_ATTEMPTS}, wait {delay}s")
-                time.sleep(delay)
-                if monitor.get("status") != "running":
+                # Backoff ends early when stop_*() sets _stop_event
+                if monitor["_stop_event"].wait(delay) or monitor.get("status") != "running":
                     break
 
                 try:
-                    stream_url = _resolve_url(overhead_url)
+                    # Reuse the cached URL first; re-run yt-dlp only once it has failed twice
+                    stream_url = _resolve_url(overhead_url, reconnect_attempts > 2)
                 except Exception as e:
                     logger.error(f"Seat monitor bus {bus_id}: URL resolve failed: {e}")
                     continue
@@ -206,26 +334,32 @@ def _seat_monitor_loop(bus_id: int, seats_data: list[dict],
                 if not cap.isOpened():
                     continue
                 reader = FrameReader(cap)
-                last_frame_time = time.time()
+                last_frame_time = time.monotonic()
                 reference_gray = None
                 continue
 
-            last_frame_time = time.time()
+            last_frame_time = time.monotonic()
             reconnect_attempts = 0
             frame_count += 1
 
-            h, w = frame.shape[:2]
-            if w > 1280:
-                scale = 1280 / w
-                frame = cv2.resize(frame, None, fx=scale, fy=scale)
-                h, w = frame.shape[:2]
+            if frame.shape != src_shape:
+                # Input size changed (first frame / reconnect) → new target + buffer
+                src_shape = frame.shape
+                h, w = src_shape[:2]
+                if w > 1280:
+                    scale = 1280 / w
+                    target_wh = (1280, int(h * scale))
+                    resize_buf = np.empty((target_wh[1], target_wh[0], 3), dtype=np.uint8)
+                else:
+                    resize_buf = None
+            if resize_buf is not None:
+                cv2.resize(frame, target_wh, dst=resize_buf, interpolation=cv2.INTER_AREA)
+                frame = resize_buf
 
-            frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            frame_gray = cv2.GaussianBlur(frame_gray, (5, 5), 0)
+            frame_gray = _prepare_gray(frame)
 
-            if seat_states[0]["_mask"] is None:
-                for seat in seat_states:
-                    seat["_mask"] = _build_polygon_mask(seat["polygon"], frame.shape)
+            if not seats.ready:
+                seats.build_geometry(frame.shape)
 
             if monitor.get("_capture_reference"):
                 monitor["_capture_reference"] = False
@@ -237,50 +371,64 @@ def _seat_monitor_loop(bus_id: int, seats_data: list[dict],
 
             run_detection = (frame_count % DETECT_EVERY_N == 0)
             if run_detection:
-                has_cnn = get_slot_classifier() is not None
+                classifier = get_slot_classifier()
                 has_ref = reference_gray is not None
-                if has_cnn:
+                if classifier is not None:
                     monitor["detection_mode"] = "cnn+background" if has_ref else "cnn"
                 else:
                     monitor["detection_mode"] = "background" if has_ref else "texture"
 
-                for seat in seat_states:
-                    if seat["_mask"] is None:
-                        continue
-                    seat["occupied"] = _detect_seat(frame, frame_gray, reference_gray, seat)
-
-                occ = sum(1 for s in seat_states if s["occupied"])
-                free = len(seat_states) - occ
-
-                monitor["occupied_count"] = occ
-                monitor["free_count"] = free
-                monitor["total_count"] = len(seat_states)
-                monitor["last_update"] = datetime.now().isoformat()
-                monitor["seats"] = _export_seats(seat_states)
-
-            _, raw_buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-            monitor["_raw_frame"] = raw_buf.tobytes()
+                # CNN verdict first; uncertain or missing → background/texture
+                occupied = seats.occupied
+                confs = _classify_seats(frame, seats, classifier)
+                if confs is None:
+                    todo = np.arange(seats.n)
+                else:
+                    sure_occ = confs > CNN_HIGH
+                    sure_free = confs < CNN_LOW
+                    occupied[sure_occ] = True
+                    occupied[sure_free] = False
+                    todo = np.flatnonzero(~(sure_occ | sure_free))  # NaN lands here
+                if todo.size:
+                    occupied[todo] = _fallback_verdicts(frame_gray, reference_gray, seats, todo)
+
+                # Only restamp/re-export when some seat actually flipped
+                if prev_occupied is None or (occupied != prev_occupied).any():
+                    prev_occupied = occupied.copy()
+                    occ = int(occupied.sum())
+                    monitor["occupied_count"] = occ
+                    monitor["free_count"] = seats.n - occ
+                    monitor["total_count"] = seats.n
+                    monitor["last_update"] = datetime.now().isoformat()
+                    monitor["seats"] = seats.export()
+
+            # Raw JPEG only feeds the Seat Editor snapshot: refresh it at a low
+            # cadence, up to RAW_MJPEG_FPS while a snapshot request is waiting on it
+            want_raw = frame_count % RAW_ENCODE_EVERY_N == 0 or (
+                monitor.get("_raw_viewers", 0) > 0
+                and last_frame_time - last_raw_ts >= 1.0 / RAW_MJPEG_FPS
+            )
+            if want_raw:
+                last_raw_ts = last_frame_time
+            # Copy: frame may alias resize_buf, which the next frame overwrites
+            raw = frame.copy() if want_raw else None
 
             has_viewers = monitor.get("_viewers", 0) > 0
             if not has_viewers:
+                encoder.submit(raw=raw)
                 continue
 
             vis = frame.copy()
-            _draw_seats(vis, seat_states)
+            _draw_seats(vis, seats)
             _occ = monitor["occupied_count"]
             _free = monitor["free_count"]
-            cv2.putText(vis, f"TERISI: {_occ}/{len(seat_states)}  KOSONG: {_free}",
+            cv2.putText(vis, f"TERISI: {_occ}/{seats.n}  KOSONG: {_free}",
                         (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
             if monitor.get("has_reference"):
                 cv2.putText(vis, "REF OK", (10, 60),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
 
-            _, buf = cv2.imencode(".jpg", vis, [cv2.IMWRITE_JPEG_QUALITY, 55])
-            monitor["_annotated_frame"] = buf.tobytes()
-            monitor["_frame_seq"] = monitor.get("_frame_seq", 0) + 1
-            event = monitor.get("_frame_event")
-            if event:
-                event.set()
+            encoder.submit(raw=raw, annotated=vis)
 
     except Exception as e:
         logger.error(f"Seat monitor bus {bus_id}: Error — {e}")
@@ -288,19 +436,12 @@ def _seat_monitor_loop(bus_id: int, seats_data: list[dict],
         monitor["error"] = str(e)
     finally:
         reader.stop()
+        encoder.stop()
         if monitor.get("status") == "running":
             monitor["status"] = "stopped"
         logger.info(f"Seat monitor bus {bus_id}: stopped")
 
 
-def _export_seats(seat_states: list[dict]) -> list[dict]:
-    return [
-        {"seat_id": s["seat_id"], "label": s["label"],
-         "occupied": s["occupied"], "polygon": s["polygon"]}
-        for s in seat_states
-    ]
-
-
 async def start_bus_seat_monitor(bus_id: int, seats_data: list[dict],
                                   overhead_url: str) -> dict:
     if bus_id in bus_seat_monitors and bus_seat_monitors[bus_id]["status"] in ("running", "starting"):
@@ -309,7 +450,8 @@ async def start_bus_seat_monitor(bus_id: int, seats_data: list[dict],
     if get_slot_classifier() is None:
         load_slot_classifier(settings.parking_cnn_model)
 
-    stream_url = _resolve_url(overhead_url)
+    # yt-dlp (on a cold URL) must not block the event loop
+    stream_url = await asyncio.get_running_loop().run_in_executor(None, _resolve_url, overhead_url)
     total = len(seats_data)
 
     monitor = {
@@ -327,8 +469,10 @@ async def start_bus_seat_monitor(bus_id: int, seats_data: list[dict],
         "_annotated_frame": None,
         "_raw_frame": None,
         "_frame_event": threading.Event(),
+        "_stop_event": threading.Event(),  # set by stop_*(): interrupts reconnect backoff
         "_frame_seq": 0,
         "_viewers": 0,
+        "_raw_viewers": 0,
     }
     bus_seat_monitors[bus_id] = monitor
 
@@ -348,6 +492,7 @@ def stop_bus_seat_monitor(bus_id: int) -> dict:
     if not monitor:
         return {"error": "No active seat monitor for this bus"}
     monitor["status"] = "stopping"
+    monitor["_stop_event"].set()
 
     def _cleanup():
         thread = monitor.get("_thread")
@@ -391,6 +536,7 @@ def stop_all_bus_seat_monitors():
         monitor = bus_seat_monitors.get(bus_id)
         if monitor:
             monitor["status"] = "stopping"
+            monitor["_stop_event"].set()
     for bus_id in list(bus_seat_monitors.keys()):
         monitor = bus_seat_monitors.get(bus_id)
         if monitor:
@@ -6,6 +6,7 @@ import logging
 import os
 import threading
 import time
+from queue import Empty, Full, Queue
 
 import cv2
 import supervision as sv
@@ -13,6 +14,7 @@ import supervision as sv
 from ..config import settings
 from .bus_monitor import _draw_bus_frame
 from .detector import PersonDetector
+from .live_monitor import FrameEncoder
 from .tracker import VehicleTracker
 
 logger = logging.getLogger(__name__)
@@ -20,6 +22,8 @@ logger = logging.getLogger(__name__)
 bus_video_tests: dict[str, dict] = {}   # keyed by job_id (UUID)
 
 _AUTO_EXPIRE_SECONDS = 30 * 60  # 30 minutes
+_DETECT_WIDTH = 640
+_READ_AHEAD = 4   # decoded+resized frames buffered ahead of detection
 
 
 def cleanup_old_tests() -> None:
@@ -84,6 +88,7 @@ def start_bus_video_test(job_id: str, bus_id: int, capacity: int, file_path: str
         "_annotated_frame": None,
         "_frame_event": threading.Event(),
         "_frame_seq": 0,
+        "_viewers": 0,
     }
     bus_video_tests[job_id] = test
 
@@ -112,6 +117,33 @@ def _test_loop(job_id: str, bus_id: int, capacity: int, file_path: str,
             test["error"] = str(e)
 
 
+def _read_and_resize(cap: cv2.VideoCapture, out_q: Queue, stop: threading.Event) -> None:
+    """
+    Reader stage: decode + downscale to detection width on its own thread so it
+    overlaps YOLO on the previous frame. Blocking puts (no frame dropping — this
+    is an accuracy test); None marks end of video.
+    """
+    while not stop.is_set():
+        ret, frame = cap.read()
+        if not ret:
+            break
+        scale = _DETECT_WIDTH / frame.shape[1]
+        small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        item = (frame, small, scale)
+        while not stop.is_set():
+            try:
+                out_q.put(item, timeout=0.5)
+                break
+            except Full:
+                continue
+    while not stop.is_set():
+        try:
+            out_q.put(None, timeout=0.5)
+            return
+        except Full:
+            continue
+
+
 def _test_loop_inner(job_id: str, bus_id: int, capacity: int, file_path: str,
                      model_name: str | None,
                      line_x1: float, line_y1: float, line_x2: float, line_y2: float,
@@ -155,24 +187,30 @@ def _test_loop_inner(job_id: str, bus_id: int, capacity: int, file_path: str,
         f"line=({x1_px},{y1_px})→({x2_px},{y2_px}), total_frames={total_frames})"
     )
 
+    encoder = FrameEncoder(test, annotated_quality=60)
+    read_q: Queue = Queue(maxsize=_READ_AHEAD)
+    stop_reader = threading.Event()
+    reader = threading.Thread(target=_read_and_resize, args=(cap, read_q, stop_reader), daemon=True)
+    reader.start()
     frame_idx = 0
     try:
-        while cap.isOpened():
+        while True:
             if test.get("status") == "stopping":
                 break
 
-            ret, frame = cap.read()
-            if not ret:
+            try:
+                item = read_q.get(timeout=1.0)
+            except Empty:
+                if not reader.is_alive():
+                    break   # reader died without an end marker
+                continue
+            if item is None:
                 break   # Video finished
+            frame, small, scale = item
 
             frame_idx += 1
 
-            orig_w = frame.shape[1]
-            scale = 640 / orig_w
-            small = cv2.resize(frame, None, fx=scale, fy=scale)
-            raw_dets = detector.detect(small)
-            for d in raw_dets:
-                d["bbox"] = [v / scale for v in d["bbox"]]
+            raw_dets = detector.detect(small, scale=scale)
 
             tracked = tracker.update(raw_dets)
             line_in, line_out = tracker.get_line_counts()
@@ -187,18 +225,18 @@ def _test_loop_inner(job_id: str, bus_id: int, capacity: int, file_path: str,
             test["passenger_count"] = passenger_count
             test["progress_pct"] = (frame_idx / test["total_frames"]) * 100.0
 
-            # Annotate frame + encode JPEG for MJPEG feed
+            # Annotate frame + encode JPEG for MJPEG feed — only while someone watches
+            if test.get("_viewers", 0) == 0:
+                continue
             _draw_bus_frame(frame, tracked, x1_px, y1_px, x2_px, y2_px,
                             line_in, line_out, passenger_count, capacity)
-            _, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 60])
-            test["_annotated_frame"] = buf.tobytes()
-            test["_frame_seq"] = test.get("_frame_seq", 0) + 1
-            event = test.get("_frame_event")
-            if event:
-                event.set()
+            encoder.submit(annotated=frame)
 
     finally:
+        stop_reader.set()
+        reader.join(timeout=5)
         cap.release()
+        encoder.stop()
 
     if test.get("status") not in ("stopping", "error"):
         test["status"] = "completed"
@@ -1,15 +1,32 @@
 import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from queue import Empty, Queue
+from typing import Literal
 
+import cv2
 import numpy as np
+import torch
+import torch.nn.functional as F
 from ultralytics import YOLO
+from ultralytics.utils import ops
 
 from ..config import settings
+from . import _preprocess_kernels
 
 logger = logging.getLogger(__name__)
 
 # Fallback: COCO class IDs (used when model names can't be parsed)
 VEHICLE_CLASSES = {1: "bicycle", 2: "car", 3: "motorcycle", 5: "bus", 7: "truck"}
 
+# Every vehicle_type the detectors emit, and its slot in fixed-size counters
+VEHICLE_TYPES = ("car", "motorcycle", "bus", "truck", "bicycle")
+VEHICLE_INDEX = {vtype: i for i, vtype in enumerate(VEHICLE_TYPES)}
+
 # Map model class name → our vehicle type label
 # Covers both COCO ("car", "motorcycle") and VisDrone ("van", "motor") naming
 _NAME_TO_VTYPE: dict[str, str] = {
@@ -43,9 +60,10 @@ AVAILABLE_MODELS = [
      "description": "Cepat — vehicle detection, tidak direkomendasikan untuk deteksi orang"},
     {"id": "models/yolo26m.pt", "name": "YOLO26 Medium",
      "description": "Seimbang — vehicle detection, tidak direkomendasikan untuk deteksi orang"},
-    {"id": "models/yolo26l.pt", "name": "YOLO26 Large",
+    # Heavy models run as a calibrated INT8 TensorRT engine on GPU ("precision").
+    {"id": "models/yolo26l.pt", "name": "YOLO26 Large", "precision": "int8",
      "description": "Akurat — vehicle detection, butuh GPU, tidak direkomendasikan untuk deteksi orang"},
-    {"id": "models/yolo26x.pt", "name": "YOLO26 Extra",
+    {"id": "models/yolo26x.pt", "name": "YOLO26 Extra", "precision": "int8",
      "description": "Paling akurat — vehicle detection, butuh GPU, tidak direkomendasikan untuk deteksi orang"},
     # Standard Ultralytics COCO models — recommended for both vehicle and person detection.
     {"id": "yolo11n.pt",  "name": "YOLO11 Nano",
@@ -61,12 +79,358 @@ AVAILABLE_MODELS = [
 ]
 
 
+class _PinnedUploader:
+    """
+    Double-buffered pinned host → GPU frame upload for CUDA inference.
+
+    Frames are copied into page-locked memory and sent to the GPU with a
+    non-blocking copy on a dedicated stream, so the H2D transfer doesn't go
+    through pageable memory every frame. Two buffers alternate (round-robin):
+    the next frame is staged into one while the previous one is still in use.
+    Buffers are padded to the model stride so Ultralytics accepts the tensor
+    without letterboxing; boxes come back in the input frame's pixel coords.
+    """
+
+    STRIDE = 32
+
+    def __init__(self, device: str = "cuda:0"):
+        self.device = torch.device(device)
+        self._shape: tuple[int, int] | None = None
+        self._host: list[torch.Tensor] = []
+        self._gpu: list[torch.Tensor] = []
+        self._streams = [torch.cuda.Stream(self.device) for _ in range(2)]
+        self._idx = 0
+
+    def _allocate(self, h: int, w: int) -> None:
+        ph = -(-h // self.STRIDE) * self.STRIDE
+        pw = -(-w // self.STRIDE) * self.STRIDE
+        # Grey (114) padding, same fill value Ultralytics uses for letterboxing
+        self._host = [torch.full((ph, pw, 3), 114, dtype=torch.uint8).pin_memory()
+                      for _ in range(2)]
+        self._gpu = [torch.empty((ph, pw, 3), dtype=torch.uint8, device=self.device)
+                     for _ in range(2)]
+        self._shape = (h, w)
+
+    def upload(self, frame: np.ndarray) -> torch.Tensor:
+        """Stage a BGR uint8 frame and return a (1, 3, H, W) float RGB tensor on the GPU."""
+        h, w = frame.shape[:2]
+        if self._shape != (h, w):
+            self._allocate(h, w)
+        i = self._idx
+        self._idx ^= 1
+
+        host = self._host[i]
+        np.copyto(host.numpy()[:h, :w], frame)
+        stream = self._streams[i]
+        with torch.cuda.stream(stream):
+            self._gpu[i].copy_(host, non_blocking=True)
+            tensor = self._gpu[i].flip(-1).permute(2, 0, 1).unsqueeze(0).float().div_(255.0)
+        torch.cuda.current_stream(self.device).wait_stream(stream)
+        return tensor
+
+
+def _export_onnx(model: YOLO, model_name: str, imgsz: int = 640) -> str:
+    """Export the weights to ONNX once (next to the .pt) and reuse it on later starts."""
+    onnx_path = os.path.splitext(model_name)[0] + ".onnx"
+    if os.path.exists(onnx_path):
+        return onnx_path
+    logger.warning(f"Exporting {model_name} → ONNX for the OpenCV DNN backend (one-time)")
+    return model.export(format="onnx", imgsz=imgsz, simplify=True)
+
+
+def _export_engine(model: YOLO, model_name: str, imgsz: int = 640, int8: bool = False,
+                   batch: int = 1) -> str:
+    """
+    Export the weights to a TensorRT engine once (next to the .pt) and reuse it.
+    FP16 → <model>.engine; INT8 → <model>.int8.engine, calibrated on coco128.
+    batch > 1 builds a dynamic-batch engine (<model>[.int8].b<N>.engine).
+    """
+    stem = os.path.splitext(model_name)[0]
+    engine_path = stem + (".int8" if int8 else "") + (f".b{batch}" if batch > 1 else "") + ".engine"
+    if os.path.exists(engine_path):
+        return engine_path
+    kwargs = {"dynamic": True, "batch": batch} if batch > 1 else {}
+    if int8:
+        logger.warning(f"Exporting {model_name} → TensorRT INT8 engine with calibration (one-time, may take minutes)")
+        kwargs.update(int8=True, data="coco128.yaml")
+    else:
+        logger.warning(f"Exporting {model_name} → TensorRT FP16 engine (one-time, may take minutes)")
+        kwargs.update(half=True)
+    if engine_path == stem + ".engine":
+        return model.export(format="engine", imgsz=imgsz, device=0, **kwargs)
+
+    # Ultralytics always writes <weights>.engine: export INT8 / batched engines
+    # from a copy of the weights in a temp dir, so the FP16 <model>.engine
+    # (maybe loaded by another detector) is never overwritten
+    with tempfile.TemporaryDirectory() as tmp:
+        weights = os.path.join(tmp, os.path.basename(model_name))
+        shutil.copy2(model_name, weights)
+        exported = YOLO(weights).export(format="engine", imgsz=imgsz, device=0, **kwargs)
+        # Copy next to the target, then rename: engine_path only ever holds a whole engine
+        part_path = engine_path + ".part"
+        shutil.copyfile(exported, part_path)
+    os.replace(part_path, engine_path)
+    return engine_path
+
+
+def _load_tensorrt(model: YOLO, model_name: str, owner: str, int8: bool = False,
+                   batch: int = 1) -> YOLO | None:
+    """
+    Return the TensorRT engine for `model_name` (exported on first use), or None
+    to keep the PyTorch model — needs CUDA and a .pt file.
+    """
+    if not torch.cuda.is_available() or not model_name.endswith(".pt"):
+        logger.warning(f"{owner}: TensorRT backend needs CUDA and a .pt model, using Ultralytics")
+        return None
+    try:
+        return YOLO(_export_engine(model, model_name, int8=int8, batch=batch), task="detect")
+    except Exception as e:
+        logger.warning(f"{owner}: TensorRT export failed ({e}), using Ultralytics")
+        return None
+
+
+def _letterbox_input(frame: np.ndarray, size: int) -> np.ndarray:
+    """(3, size, size) float32 RGB in [0, 1], letterboxed with 114 grey — the same
+    input the live path feeds the model (see VehicleDetector.detect_batch_letterbox)."""
+    h, w = frame.shape[:2]
+    r = min(size / h, size / w)
+    nh, nw = round(h * r), round(w * r)
+    top, left = (size - nh) // 2, (size - nw) // 2
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    canvas[top:top + nh, left:left + nw] = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    return cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB).transpose(2, 0, 1).astype(np.float32) / 255.0
+
+
+def _export_onnx_int8(model: YOLO, model_name: str, imgsz: int = 640,
+                      calib_images: int = 64) -> str:
+    """
+    Export the weights to a dynamic-batch ONNX model and quantise it to INT8
+    (static QDQ, calibrated on coco128) once, next to the .pt. Calibration
+    frames are preprocessed exactly like live ones — calibrating on input
+    normalised differently from training is what collapses INT8 mAP.
+    """
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    from ultralytics.data.utils import check_det_dataset
+
+    stem = os.path.splitext(model_name)[0]
+    fp32_path, int8_path = stem + ".dyn.onnx", stem + ".int8.onnx"
+    if os.path.exists(int8_path):
+        return int8_path
+    logger.warning(f"Exporting {model_name} → INT8 ONNX with calibration (one-time, may take minutes)")
+    exported = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    # Ultralytics always writes <model>.onnx — keep it apart from the static OpenCV DNN export
+    os.replace(exported, fp32_path)
+
+    images_dir = check_det_dataset("coco128.yaml")["val"]
+    images = sorted(
+        os.path.join(images_dir, f) for f in os.listdir(images_dir)
+        if f.lower().endswith((".jpg", ".jpeg", ".png"))
+    )[:calib_images]
+
+    class _Calibration(CalibrationDataReader):
+        def __init__(self):
+            self._paths = iter(images)
+
+        def get_next(self):
+            path = next(self._paths, None)
+            if path is None:
+                return None
+            return {"images": _letterbox_input(cv2.imread(path), imgsz)[None]}
+
+    quantize_static(fp32_path, int8_path, _Calibration(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                    per_channel=True)
+    # Keep the class names / stride metadata Ultralytics reads back on load
+    src, dst = onnx.load(fp32_path), onnx.load(int8_path)
+    onnx.helper.set_model_props(dst, {p.key: p.value for p in src.metadata_props})
+    onnx.save(dst, int8_path)
+    return int8_path
+
+
+def _load_onnxruntime(model: YOLO, model_name: str, owner: str) -> YOLO | None:
+    """
+    Return the INT8 ONNX model for `model_name` (exported on first use), run by
+    Ultralytics through ONNX Runtime's CPU provider, or None to keep the PyTorch
+    model — meant for CPU-only hosts with a .pt file.
+    """
+    if torch.cuda.is_available() or not model_name.endswith(".pt"):
+        logger.warning(f"{owner}: ONNX Runtime backend is for CPU-only hosts with a .pt model, using Ultralytics")
+        return None
+    try:
+        return YOLO(_export_onnx_int8(model, model_name), task="detect")
+    except Exception as e:
+        logger.warning(f"{owner}: ONNX Runtime INT8 export failed ({e}), using Ultralytics")
+        return None
+
+
+def _model_precision(model_name: str) -> str:
+    """Inference precision advertised for a model in AVAILABLE_MODELS (default fp16)."""
+    for m in AVAILABLE_MODELS:
+        if m["id"] == model_name:
+            return m.get("precision", "fp16")
+    return "fp16"
+
+
+def _boxes_to_numpy(boxes) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (xyxy, scores, class_ids) from an Ultralytics Boxes with one device → host
+    transfer: boxes.data rows are x1, y1, x2, y2, [track_id,] conf, cls.
+    """
+    data = boxes.data.cpu().numpy()
+    return data[:, :4], data[:, -2], data[:, -1].astype(np.int32)
+
+
+class _CudaGraphForward:
+    """
+    Raw YOLO forward captured as a CUDA graph for one fixed (batch, 3, S, S)
+    FP16 input: replay() launches the whole network at once instead of ~100
+    kernels one by one, which is what dominates small models like yolo26n.
+    Inputs are copied into a static buffer; the returned output is a view of
+    the graph's static output, valid until the next call.
+    """
+
+    def __init__(self, net: torch.nn.Module, batch: int, size: int):
+        self.static_input = torch.zeros((batch, 3, size, size), dtype=torch.float16, device="cuda:0")
+        # Warm up on a side stream first — capture needs allocations already done
+        stream = torch.cuda.Stream()
+        stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(stream), torch.no_grad():
+            for _ in range(3):
+                net(self.static_input)
+        torch.cuda.current_stream().wait_stream(stream)
+
+        self.graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(self.graph), torch.no_grad():
+            out = net(self.static_input)
+        self.static_output = out[0] if isinstance(out, (tuple, list)) else out
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        self.static_input.copy_(batch)
+        self.graph.replay()
+        return self.static_output
+
+
+class _DnnBackend:
+    """
+    cv2.dnn inference on an ONNX export — skips Ultralytics' per-call Python
+    overhead (result objects, Python-side NMS). Uses the CUDA FP16 target when
+    OpenCV was built with CUDA, otherwise OpenCV's default CPU backend.
+    """
+
+    INPUT_SIZE = 640
+    NMS_IOU = 0.45
+
+    def __init__(self, onnx_path: str):
+        self.net = cv2.dnn.readNetFromONNX(onnx_path)
+        if cv2.cuda.getCudaEnabledDeviceCount() > 0:
+            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA_FP16)
+            logger.warning(f"OpenCV DNN: {onnx_path} on CUDA FP16")
+        else:
+            logger.warning(f"OpenCV DNN: {onnx_path} on CPU (OpenCV built without CUDA)")
+
+    def infer(self, frame: np.ndarray, conf: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (xyxy, scores, class_ids) after NMS, in *frame* pixel coords."""
+        size = self.INPUT_SIZE
+        h, w = frame.shape[:2]
+        blob = cv2.dnn.blobFromImage(frame, 1 / 255.0, (size, size), swapRB=True, crop=False)
+        self.net.setInput(blob)
+        out = self.net.forward()[0]
+
+        if out.shape[-1] == 6:
+            # NMS-free (end-to-end) export: rows of x1, y1, x2, y2, score, class
+            out = out[out[:, 4] >= conf]
+            xyxy, scores, cls = out[:, :4], out[:, 4], out[:, 5].astype(int)
+        else:
+            # YOLOv8/11 head: (4 + num_classes, anchors) of cx, cy, w, h, class scores
+            preds = out.T
+            cls_scores = preds[:, 4:]
+            cls = cls_scores.argmax(axis=1)
+            scores = cls_scores[np.arange(len(cls)), cls]
+            keep = scores >= conf
+            preds, cls, scores = preds[keep], cls[keep], scores[keep]
+            xywh = preds[:, :4].copy()
+            xywh[:, :2] -= xywh[:, 2:] / 2
+            idx = cv2.dnn.NMSBoxesBatched(xywh, scores, cls, conf, self.NMS_IOU)
+            idx = np.asarray(idx, dtype=int).reshape(-1)
+            xywh, scores, cls = xywh[idx], scores[idx], cls[idx]
+            xyxy = np.concatenate([xywh[:, :2], xywh[:, :2] + xywh[:, 2:]], axis=1)
+
+        xyxy = xyxy * np.array([w / size, h / size, w / size, h / size], dtype=np.float32)
+        return xyxy, scores, cls
+
+
+def _get_or_build(cache: dict, loading: dict, lock: threading.Lock, key, build):
+    """
+    cache[key], built by build() on first use. The build (weights load, engine /
+    ONNX export — possibly minutes) runs outside `lock`, so other keys and
+    drops never wait on it; callers for the same key wait on its Future.
+    """
+    with lock:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        future = loading.get(key)
+        owner = future is None
+        if owner:
+            future = loading[key] = Future()
+    if not owner:
+        return future.result()
+    try:
+        cached = build()
+    except BaseException as e:
+        with lock:
+            del loading[key]
+        future.set_exception(e)
+        raise
+    with lock:
+        del loading[key]
+        cache[key] = cached
+    future.set_result(cached)
+    return cached
+
+
+# model_name → (model, OpenCV DNN backend or None, is TensorRT engine, inference lock).
+# Every bus on the same model shares one set of weights / exported backend;
+# confidence, class filter and pinned uploader stay per detector.
+_PERSON_MODEL_CACHE: dict[str, tuple[YOLO, "_DnnBackend | None", bool, threading.Lock]] = {}
+_PERSON_MODEL_LOADING: dict[str, Future] = {}  # model_name → build in progress
+_PERSON_MODEL_CACHE_LOCK = threading.Lock()
+
+
+def _build_person_model(model_name: str) -> tuple[YOLO, "_DnnBackend | None", bool, threading.Lock]:
+    model = YOLO(model_name)
+    dnn = None
+    if settings.detector_backend == "opencv":
+        try:
+            dnn = _DnnBackend(_export_onnx(model, model_name))
+        except Exception as e:
+            logger.warning(f"PersonDetector: OpenCV DNN backend unavailable ({e}), using Ultralytics")
+
+    # TensorRT FP16 engine (GPU only); the engine has a static 640x640 input,
+    # so frames go in as numpy and Ultralytics letterboxes them
+    engine = None
+    if settings.detector_backend == "tensorrt":
+        engine = _load_tensorrt(model, model_name, "PersonDetector")
+    if engine is not None:
+        model = engine
+    return model, dnn, engine is not None, threading.Lock()
+
+
+def _shared_person_model(model_name: str) -> tuple[YOLO, "_DnnBackend | None", bool, threading.Lock]:
+    return _get_or_build(_PERSON_MODEL_CACHE, _PERSON_MODEL_LOADING, _PERSON_MODEL_CACHE_LOCK,
+                         model_name, lambda: _build_person_model(model_name))
+
+
 class PersonDetector:
     """YOLO detector that tracks only the 'person' class — for bus passenger counting."""
 
     def __init__(self, model_name: str | None = None, confidence: float | None = None):
         self.model_name = model_name or settings.yolo_model
-        self.model = YOLO(self.model_name)
+        # Shared across detectors on the same model (Ultralytics / cv2.dnn
+        # inference isn't thread-safe, so calls go through the lock)
+        self.model, self._dnn, self._engine, self._infer_lock = _shared_person_model(self.model_name)
         # Allow per-instance confidence override (bus monitor uses lower threshold
         # than the global setting to maintain tracking through low-visibility zones)
         self.confidence = confidence if confidence is not None else settings.confidence_threshold
@@ -83,28 +447,107 @@ class PersonDetector:
             # Fallback: COCO class 0 is always 'person'
             self._person_ids = {0}
             logger.warning(f"PersonDetector: WARNING — no person class found in {self.model_name}, falling back to class 0 (may be wrong for non-COCO models!)")
+        self._person_id_arr = np.fromiter(self._person_ids, dtype=np.int32)
 
-    def detect(self, frame: np.ndarray) -> list[dict]:
-        results = self.model(frame, conf=self.confidence, verbose=False)[0]
-        detections = []
-        for box in results.boxes:
-            cls_id = int(box.cls[0])
-            if cls_id not in self._person_ids:
-                continue
-            x1, y1, x2, y2 = box.xyxy[0].tolist()
-            detections.append({
-                "bbox": [x1, y1, x2, y2],
-                "confidence": float(box.conf[0]),
+        # CUDA only: per-instance (i.e. per-bus) pinned double buffer for H2D uploads
+        self._uploader = (
+            _PinnedUploader()
+            if self._dnn is None and not self._engine and torch.cuda.is_available() else None
+        )
+        # Plain .pt on GPU: FP16 inference on cuda:0
+        self._predict_kwargs = (
+            {"device": 0, "half": True} if self._uploader is not None else {}
+        )
+
+    def warmup(self, runs: int = 3, shape: tuple[int, int] = (640, 640)) -> None:
+        """Run dummy inferences so model load / CUDA kernel setup / cuDNN autotune
+        happen here instead of on the first live frame."""
+        dummy = np.zeros((*shape, 3), dtype=np.uint8)
+        for _ in range(runs):
+            self.detect(dummy)
+
+    def _to_detections(self, xyxy: np.ndarray, scores: np.ndarray, cls: np.ndarray,
+                       scale: float) -> list[dict]:
+        keep = np.isin(cls, self._person_id_arr)
+        xyxy = xyxy[keep]
+        if scale != 1.0:
+            xyxy *= 1.0 / scale
+        return [
+            {
+                "bbox": bbox,
+                "confidence": score,
                 "class_id": cls_id,
                 "vehicle_type": "person",
-            })
-        return detections
+            }
+            for bbox, score, cls_id in zip(
+                xyxy.tolist(), scores[keep].tolist(), cls[keep].tolist()
+            )
+        ]
+
+    def detect(self, frame: np.ndarray, scale: float = 1.0) -> list[dict]:
+        """Person detections; bboxes are divided by `scale` (the factor `frame`
+        was downscaled by) so they come back in original-frame pixels."""
+        if self._dnn is not None:
+            with self._infer_lock:
+                out = self._dnn.infer(frame, self.confidence)
+            return self._to_detections(*out, scale)
+        source = self._uploader.upload(frame) if self._uploader is not None else frame
+        with self._infer_lock:
+            boxes = self.model(source, conf=self.confidence, verbose=False,
+                               **self._predict_kwargs)[0].boxes
+            out = _boxes_to_numpy(boxes)
+        return self._to_detections(*out, scale)
+
+
+# (model_name, precision, batch) → (model, is TensorRT engine, inference lock).
+# One set of weights / CUDA workspace per model instead of one per camera;
+# Ultralytics predictors aren't thread-safe, so calls go through the lock.
+_MODEL_CACHE: dict[tuple[str, str, int], tuple[YOLO, bool, threading.Lock]] = {}
+_MODEL_LOADING: dict[tuple[str, str, int], Future] = {}  # key → build in progress
+_MODEL_CACHE_LOCK = threading.Lock()
+
+
+def _build_vehicle_model(model_name: str, precision: str, batch: int) -> tuple[YOLO, bool, threading.Lock]:
+    model = YOLO(model_name)
+    engine = None
+    if precision == "int8":
+        engine = _load_tensorrt(model, model_name, "Detector", int8=True, batch=batch)
+    elif precision == "fp16" and settings.detector_backend == "tensorrt":
+        engine = _load_tensorrt(model, model_name, "Detector", batch=batch)
+    if engine is not None:
+        model = engine
+    elif settings.detector_backend == "onnxruntime" and precision != "fp32":
+        model = _load_onnxruntime(model, model_name, "Detector") or model
+    return model, engine is not None, threading.Lock()
+
+
+def _shared_vehicle_model(model_name: str, precision: str, batch: int) -> tuple[YOLO, bool, threading.Lock]:
+    return _get_or_build(_MODEL_CACHE, _MODEL_LOADING, _MODEL_CACHE_LOCK, (model_name, precision, batch),
+                         lambda: _build_vehicle_model(model_name, precision, batch))
+
+
+def _drop_vehicle_model(model_name: str, precision: str, batch: int) -> None:
+    """Forget a cached model so its weights / CUDA memory go once the last user lets go."""
+    with _MODEL_CACHE_LOCK:
+        _MODEL_CACHE.pop((model_name, precision, batch), None)
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
 
 
 class VehicleDetector:
-    def __init__(self, model_name: str | None = None):
+    LETTERBOX_SIZE = 640
+
+    def __init__(self, model_name: str | None = None,
+                 precision: Literal["fp32", "fp16", "int8"] | None = None,
+                 batch: int = 1):
         self.model_name = model_name or settings.yolo_model
-        self.model = YOLO(self.model_name)
+        # fp16: half precision on CUDA (TensorRT engine if DETECTOR_BACKEND=tensorrt)
+        # int8: calibrated TensorRT engine; fp32: plain PyTorch, no half.
+        # DETECTOR_BACKEND=onnxruntime on a CPU-only host: INT8 ONNX for fp16/int8
+        self.precision = precision or _model_precision(self.model_name)
+        # Shared with every other VehicleDetector on the same model/precision/batch
+        self.model, self._engine, self._infer_lock = _shared_vehicle_model(
+            self.model_name, self.precision, batch)
         self.confidence = settings.confidence_threshold
 
         # Auto-detect vehicle class IDs from the model's own class names.
@@ -121,19 +564,349 @@ class VehicleDetector:
             # Fallback to hardcoded COCO IDs
             self._vehicle_ids = dict(VEHICLE_CLASSES)
             logger.warning(f"Detector: could not parse vehicle classes from {self.model_name}, using COCO defaults")
+        # Class-id lookup tables: one gather filters and names a whole result
+        n_classes = max(max(self.model.names, default=0), max(self._vehicle_ids)) + 1
+        self._vehicle_mask = np.zeros(n_classes, dtype=bool)
+        self._vehicle_mask[list(self._vehicle_ids)] = True
+        self._vehicle_names = np.full(n_classes, "", dtype=object)
+        for cls_id, vtype in self._vehicle_ids.items():
+            self._vehicle_names[cls_id] = vtype
 
-    def detect(self, frame: np.ndarray) -> list[dict]:
-        results = self.model(frame, conf=self.confidence, verbose=False)[0]
-        detections = []
-        for box in results.boxes:
-            cls_id = int(box.cls[0])
-            if cls_id not in self._vehicle_ids:
-                continue
-            x1, y1, x2, y2 = box.xyxy[0].tolist()
-            detections.append({
-                "bbox": [x1, y1, x2, y2],
-                "confidence": float(box.conf[0]),
+        if self._engine:
+            self._predict_kwargs = {"imgsz": 640}
+        elif torch.cuda.is_available() and self.precision != "fp32":
+            self._predict_kwargs = {"imgsz": 640, "device": 0, "half": True}
+        else:
+            self._predict_kwargs = {}
+        # On GPU, detect_batch_gpu() letterboxes full-size frames on the device;
+        # on CPU with numba, detect_batch_letterbox() does it in one fused pass
+        self.gpu_preprocess = bool(self._predict_kwargs)
+        self.cpu_letterbox = not self.gpu_preprocess and _preprocess_kernels.HAVE_NUMBA
+        self._host_batch: np.ndarray | None = None  # detect_batch_letterbox input buffer
+        # batch size → captured forward (enable_cuda_graphs(); PyTorch FP16 only)
+        self._graph_net: torch.nn.Module | None = None
+        self._graphs: dict[int, _CudaGraphForward] = {}
+        self._pinned: list[torch.Tensor | None] = []  # detect_batch_gpu staging, per batch slot
+
+    def enable_cuda_graphs(self) -> bool:
+        """
+        Run detect_batch_gpu() through CUDA graphs captured per batch size
+        (lazily, on first use) instead of Ultralytics' predictor. Only for the
+        plain PyTorch FP16 path — TensorRT engines already fuse the network.
+        """
+        if not self.gpu_preprocess or self._engine:
+            logger.warning(f"Detector: CUDA graphs need the PyTorch FP16 CUDA path, "
+                           f"keeping the predictor for {self.model_name}")
+            return False
+        self._graph_net = self.model.model.fuse(verbose=False).half().to("cuda:0").eval()
+        logger.info(f"Detector: CUDA graph forward enabled for {self.model_name}")
+        return True
+
+    def _graph_predict(self, batch: torch.Tensor) -> list[np.ndarray]:
+        """(N, 6) x1, y1, x2, y2, conf, cls host arrays per image, via the captured graph."""
+        n = batch.shape[0]
+        graph = self._graphs.get(n)
+        if graph is None:
+            logger.info(f"Detector: capturing CUDA graph for batch {n}")
+            graph = self._graphs[n] = _CudaGraphForward(self._graph_net, n, self.LETTERBOX_SIZE)
+        preds = graph(batch)
+        if preds.shape[-1] == 6:
+            # NMS-free (end-to-end) head: rows of x1, y1, x2, y2, score, class
+            return [p[p[:, 4] >= self.confidence].float().cpu().numpy() for p in preds]
+        return [p.float().cpu().numpy() for p in ops.non_max_suppression(
+            preds, self.confidence, 0.45, classes=list(self._vehicle_ids))]
+
+    def warmup(self, runs: int = 3, shape: tuple[int, int] = (384, 640)) -> None:
+        """Run dummy inferences so CUDA kernel setup / cuDNN autotune / engine
+        workspace allocation happen here instead of on the first live frame."""
+        dummy = np.zeros((*shape, 3), dtype=np.uint8)
+        if self.gpu_preprocess:
+            run = self.detect_batch_gpu
+        elif self.cpu_letterbox:
+            _preprocess_kernels.warmup()
+            run = self.detect_batch_letterbox
+        else:
+            run = self.detect_batch
+        for _ in range(runs):
+            run([dummy], [1.0])
+
+    def detect(self, frame: np.ndarray, scale: float = 1.0) -> list[dict]:
+        """Vehicle detections; bboxes are divided by `scale` (the factor `frame`
+        was downscaled by) so they come back in original-frame pixels."""
+        return self.detect_batch([frame], [scale])[0]
+
+    def detect_batch(self, frames: list[np.ndarray], scales: list[float],
+                     arrays: bool = False) -> list:
+        """detect() for several frames in one forward pass (one result list per frame).
+        arrays=True gives (xyxy, scores, class_ids) per frame instead of dicts."""
+        with self._infer_lock:
+            results = self.model(frames, conf=self.confidence, verbose=False,
+                                 **self._predict_kwargs)
+        return [self._to_detections(*_boxes_to_numpy(r.boxes), scale, arrays=arrays)
+                for r, scale in zip(results, scales)]
+
+    def _pinned_slot(self, i: int, shape: tuple[int, ...]) -> torch.Tensor:
+        """Pinned host staging buffer for batch slot i (reallocated if the frame shape changes).
+        Reusing it next batch is safe: results are read back before detect returns,
+        which orders every earlier copy on the stream."""
+        if i >= len(self._pinned):
+            self._pinned.append(None)
+        buf = self._pinned[i]
+        if buf is None or tuple(buf.shape) != tuple(shape):
+            buf = self._pinned[i] = torch.empty(tuple(shape), dtype=torch.uint8).pin_memory()
+        return buf
+
+    def _letterbox_geometry(self, h: int, w: int) -> tuple[float, int, int, int, int]:
+        """(ratio, new_h, new_w, top, left) for fitting an h x w frame into the square input."""
+        size = self.LETTERBOX_SIZE
+        r = min(size / h, size / w)
+        nh, nw = round(h * r), round(w * r)
+        return r, nh, nw, (size - nh) // 2, (size - nw) // 2
+
+    def detect_batch_letterbox(self, frames: list[np.ndarray], scales: list[float],
+                               arrays: bool = False) -> list:
+        """
+        detect_batch() for full-size frames on CPU: the numba kernel resizes,
+        swaps to RGB, normalises and transposes each frame straight into one
+        (B, 3, 640, 640) float32 buffer, which goes to the model as a tensor —
+        no cv2.resize and no predictor preprocessing. Needs cpu_letterbox.
+        """
+        size = self.LETTERBOX_SIZE
+        if self._host_batch is None or self._host_batch.shape[0] < len(frames):
+            self._host_batch = np.empty((max(len(frames), 1), 3, size, size), dtype=np.float32)
+        batch = self._host_batch[:len(frames)]
+        batch.fill(114 / 255.0)
+        letterbox = []
+        for i, frame in enumerate(frames):
+            r, nh, nw, top, left = self._letterbox_geometry(*frame.shape[:2])
+            _preprocess_kernels.letterbox_chw(frame, batch[i], nh, nw, top, left)
+            letterbox.append((r, left, top))
+
+        with self._infer_lock:
+            results = self.model(torch.from_numpy(batch), conf=self.confidence, verbose=False,
+                                 **self._predict_kwargs)
+        return [
+            self._to_detections(*_boxes_to_numpy(res.boxes), scale * r, (left, top), arrays)
+            for res, scale, (r, left, top) in zip(results, scales, letterbox)
+        ]
+
+    def detect_batch_gpu(self, frames: list[np.ndarray], scales: list[float],
+                         arrays: bool = False) -> list:
+        """
+        detect_batch() with preprocessing on the GPU: each frame is uploaded as
+        is, resized with F.interpolate and letterboxed into one (B, 3, 640, 640)
+        tensor, so the CPU never runs cv2.resize. Needs gpu_preprocess.
+
+        Only the float cast and the resize touch full-resolution data; the
+        BGR → RGB swap lands in the letterbox copy and the /255 runs once over
+        the whole batch.
+        """
+        size = self.LETTERBOX_SIZE
+        batch = torch.full((len(frames), 3, size, size), 114.0, device="cuda:0")
+        letterbox = []
+        for i, frame in enumerate(frames):
+            r, nh, nw, top, left = self._letterbox_geometry(*frame.shape[:2])
+            # Stage through page-locked memory so the H2D copy is a real async DMA
+            host = self._pinned_slot(i, frame.shape)
+            np.copyto(host.numpy(), frame)
+            t = host.to("cuda:0", non_blocking=True)
+            # HWC BGR uint8 → 1CHW float (permute is a view, resized before the swap)
+            t = t.permute(2, 0, 1).unsqueeze(0).float()
+            batch[i, :, top:top + nh, left:left + nw] = F.interpolate(
+                t, size=(nh, nw), mode="bilinear", align_corners=False)[0].flip(0)
+            letterbox.append((r, left, top))
+        batch.mul_(1 / 255.0)
+
+        if self._graph_net is not None:
+            with self._infer_lock:
+                per_image = self._graph_predict(batch)
+            return [
+                self._to_detections(rows[:, :4], rows[:, 4], rows[:, 5].astype(np.int32),
+                                    scale * r, (left, top), arrays)
+                for rows, scale, (r, left, top) in zip(per_image, scales, letterbox)
+            ]
+        with self._infer_lock:
+            results = self.model(batch, conf=self.confidence, verbose=False, **self._predict_kwargs)
+        return [
+            self._to_detections(*_boxes_to_numpy(res.boxes), scale * r, (left, top), arrays)
+            for res, scale, (r, left, top) in zip(results, scales, letterbox)
+        ]
+
+    def _filter(self, xyxy: np.ndarray, scores: np.ndarray, cls: np.ndarray,
+                scale: float, pad: tuple[int, int] = (0, 0)) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Vehicle rows only, boxes mapped back to original-frame pixels."""
+        keep = self._vehicle_mask[cls]
+        xyxy = xyxy[keep]
+        if pad != (0, 0):
+            xyxy -= np.array([pad[0], pad[1], pad[0], pad[1]], dtype=xyxy.dtype)
+        if scale != 1.0:
+            xyxy *= 1.0 / scale
+        return xyxy, scores[keep], cls[keep]
+
+    def _to_detections(self, xyxy: np.ndarray, scores: np.ndarray, cls: np.ndarray,
+                       scale: float, pad: tuple[int, int] = (0, 0),
+                       arrays: bool = False) -> list[dict] | tuple[np.ndarray, np.ndarray, np.ndarray]:
+        xyxy, scores, cls = self._filter(xyxy, scores, cls, scale, pad)
+        if arrays:
+            return xyxy, scores, cls
+        return [
+            {
+                "bbox": bbox,
+                "confidence": score,
                 "class_id": cls_id,
-                "vehicle_type": self._vehicle_ids[cls_id],
-            })
-        return detections
+                "vehicle_type": vtype,
+            }
+            for bbox, score, cls_id, vtype in zip(
+                xyxy.tolist(),
+                scores.tolist(),
+                cls.tolist(),
+                self._vehicle_names[cls].tolist(),
+            )
+        ]
+
+
+class BatchedDetectorService:
+    """
+    One VehicleDetector shared by every live camera using the same model.
+
+    Monitor loops submit (frame, scale) and get a Future for the frame's
+    (xyxy, scores, class_ids) vehicle arrays — ready for
+    VehicleTracker.update_arrays() with vehicle_names. A single
+    inference thread drains the queue — waiting up to DETECTOR_BATCH_WAIT_MS
+    for more frames once the first arrives — and runs them through the model
+    in one call, so N cameras (traffic and parking) cost one batched forward
+    pass instead of N.
+    Monitors take a handle with BatchedDetectorService.acquire(model_name) and
+    hand it back with release() when they stop; the last release shuts the
+    worker down and frees the model.
+    """
+
+    DETECT_WIDTH = 640  # CPU path: frames are downscaled to this width before submit
+
+    _instances: dict[str, "BatchedDetectorService"] = {}
+    _loading: dict[str, Future] = {}  # model name → instance still being built
+    _refs: dict[str, int] = {}  # model name → monitors holding (or waiting for) the instance
+    _instances_lock = threading.Lock()
+
+    def __init__(self, model_name: str | None = None, max_batch: int | None = None):
+        self.max_batch = max(1, max_batch or settings.detector_batch_size)
+        self.batch_wait = settings.detector_batch_wait_ms / 1000.0
+        self.detector = VehicleDetector(model_name, batch=self.max_batch)
+        self.model_name = self.detector.model_name
+        self.gpu_preprocess = self.detector.gpu_preprocess
+        self.cpu_letterbox = self.detector.cpu_letterbox
+        self.vehicle_names = self.detector._vehicle_names  # class_id → vehicle_type
+        if settings.detector_cuda_graph:
+            self.detector.enable_cuda_graphs()
+        self.detector.warmup()
+        self._queue: Queue = Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name=f"detector-batch:{self.model_name}")
+        self._thread.start()
+
+    @classmethod
+    def acquire(cls, model_name: str | None = None) -> "BatchedDetectorService":
+        """Shared service for the model, created (loaded + warmed up) on first use.
+        Pair every acquire() with a release()."""
+        key = model_name or settings.yolo_model
+        with cls._instances_lock:
+            cls._refs[key] = cls._refs.get(key, 0) + 1
+            service = cls._instances.get(key)
+            if service is not None:
+                return service
+            loading = cls._loading.get(key)
+            build = loading is None
+            if build:
+                loading = cls._loading[key] = Future()
+
+        # Load / warmup / engine export can take minutes: build outside the
+        # class lock so other models' acquire() and release() don't wait on it;
+        # callers for the same model wait on its Future instead.
+        try:
+            if not build:
+                return loading.result()
+            try:
+                service = cls(key)
+            except BaseException as e:
+                with cls._instances_lock:
+                    del cls._loading[key]
+                loading.set_exception(e)
+                raise
+            with cls._instances_lock:
+                del cls._loading[key]
+                cls._instances[key] = service
+            loading.set_result(service)
+            return service
+        except BaseException:
+            with cls._instances_lock:
+                cls._refs[key] -= 1
+                if cls._refs[key] == 0:
+                    del cls._refs[key]
+            raise
+
+    def release(self) -> None:
+        """Drop one reference; the last one stops the worker and frees the model."""
+        cls = type(self)
+        key = self.model_name
+        with cls._instances_lock:
+            cls._refs[key] -= 1
+            if cls._refs[key] > 0:
+                return
+            del cls._refs[key]
+            del cls._instances[key]
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        _drop_vehicle_model(self.model_name, self.detector.precision, self.max_batch)
+        logger.info(f"BatchedDetectorService ({self.model_name}): released, model unloaded")
+
+    def submit(self, frame: np.ndarray, scale: float = 1.0) -> Future:
+        """Queue a frame for the next batch; the Future resolves to (xyxy, scores, class_ids)."""
+        future: Future = Future()
+        self._queue.put((frame, scale, future))
+        return future
+
+    def submit_frame(self, frame: np.ndarray) -> Future:
+        """submit() a full-size frame: letterboxed on the GPU or by the numba
+        kernel when available, otherwise downscaled to DETECT_WIDTH here on the
+        caller's thread."""
+        if self.gpu_preprocess or self.cpu_letterbox:
+            return self.submit(frame)
+        scale = self.DETECT_WIDTH / frame.shape[1]
+        return self.submit(cv2.resize(frame, None, fx=scale, fy=scale), scale=scale)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:  # release() sentinel
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except Empty:
+                    break
+                if item is None:
+                    stopping = True  # finish this batch, then exit
+                    break
+                batch.append(item)
+
+            frames, scales, futures = zip(*batch)
+            try:
+                if self.gpu_preprocess:
+                    results = self.detector.detect_batch_gpu(list(frames), list(scales), arrays=True)
+                elif self.cpu_letterbox:
+                    results = self.detector.detect_batch_letterbox(list(frames), list(scales), arrays=True)
+                else:
+                    results = self.detector.detect_batch(list(frames), list(scales), arrays=True)
+            except Exception as e:
+                logger.error(f"BatchedDetectorService ({self.model_name}): batch of {len(batch)} failed: {e}")
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, dets in zip(futures, results):
+                future.set_result(dets)
@@ -5,22 +5,41 @@ import logging
 import time
 from collections import defaultdict
 from datetime import datetime
-from pathlib import Path
+from functools import partial
 from queue import Queue, Empty, Full
 from zoneinfo import ZoneInfo
 
 import cv2
 import numpy as np
+import torch
+from sqlalchemy import insert, text
 
 from ..config import settings
 from ..database import SessionLocal
 from ..models.detection import DetectionEvent
 from ..models.traffic_count import TrafficCount
-from .detector import VehicleDetector, VEHICLE_CLASSES
+from ._overlay_kernels import HAVE_NUMBA, blit_sprites, draw_rects
+from ._overlay_kernels import warmup as warmup_overlay_kernels
+from .stream_pool import resolve_url
+from .detector import BatchedDetectorService, VEHICLE_CLASSES, VEHICLE_INDEX, VEHICLE_TYPES
 from .tracker import VehicleTracker
 
 logger = logging.getLogger(__name__)
 
+# Optional libjpeg-turbo SIMD encoder (pip install PyTurboJPEG); cv2 fallback
+try:
+    from turbojpeg import TJPF_BGR, TJSAMP_420, TurboJPEG
+    _tj = TurboJPEG()
+except Exception:
+    _tj = None
+
+# Optional GPU JPEG encode (nvJPEG via torchvision >= 0.19, NVJPEG_ENCODE=true)
+try:
+    from torchvision.io import encode_jpeg as _tv_encode_jpeg
+except Exception:
+    _tv_encode_jpeg = None
+_nvjpeg = settings.nvjpeg_encode and _tv_encode_jpeg is not None and torch.cuda.is_available()
+
 # Active monitors: camera_id -> monitor info
 active_monitors: dict[int, dict] = {}
 
@@ -42,158 +61,483 @@ RECONNECT_DELAY_BASE = 3  # seconds (doubles each attempt: 3, 6, 12, 24, ...)
 RECONNECT_DELAY_MAX = 60  # cap at 60 seconds
 FRAME_QUEUE_TIMEOUT = 1  # seconds to wait for a frame (short to avoid display freeze)
 STREAM_DEAD_TIMEOUT = 10  # seconds of no frames before attempting reconnect
-
-
-def _draw_detections(frame: np.ndarray, tracked: list[dict], line_y: int) -> None:
-    """Draw bounding boxes, labels, and counting line on frame (in-place)."""
+DETECT_TIMEOUT = 30  # seconds to wait on the shared detector; a stuck worker errors the monitor
+LAST_UPDATE_INTERVAL = 0.1  # seconds; refresh of monitor["last_update"] on frames without detections
+PREVIEW_MAX_HEIGHT = 720  # annotated MJPEG is downscaled to this before encoding
+WS_PUSH_INTERVAL = 0.25  # seconds; at most one WS message per camera per interval, latest wins
+IDLE_MOTION_THRESHOLD = 2.0  # mean abs diff (0-255) of 32x32 gray thumbnails counted as motion
+IDLE_AFTER = 2.0  # seconds without motion or viewers before throttling detection
+IDLE_DETECT_EVERY = 5  # while idle, detect on every Nth frame only
+ENCODE_MAX_AGE = 1.0  # seconds; a static scene still gets a fresh JPEG this often
+
+
+# vehicle_type → row of _COLOR_LUT; the last row is the grey fallback (index -1)
+_COLOR_INDEX = {vtype: i for i, vtype in enumerate(BBOX_COLORS)}
+_COLOR_LUT = np.array([*BBOX_COLORS.values(), (128, 128, 128)], dtype=np.uint8)
+
+_LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+LINE_COLOR = (0, 255, 255)
+
+# Pre-rendered overlay pieces: (vtype, conf %) → filled BGR tag,
+# (text, scale, thickness) → (boolean glyph mask, ascent), (width, line_y) → counting-line band
+_label_sprites: dict[tuple[str, int], np.ndarray] = {}
+_text_masks: dict[tuple[str, float, int], tuple[np.ndarray, int]] = {}
+_line_bands: dict[tuple[int, int], tuple[int, np.ndarray]] = {}
+
+# numba path: every label sprite packed back to back in one flat atlas,
+# (vtype, conf %) → (offset, h, w), so one blit_sprites call places all labels.
+# At most 5 types x 101 percentages, a few MB.
+_label_atlas = np.empty(0, dtype=np.uint8)
+_label_slots: dict[tuple[str, int], tuple[int, int, int]] = {}
+_label_lock = threading.Lock()  # appends only; the atlas is replaced, never changed in place
+
+
+def _label_sprite(vtype: str, pct: int) -> np.ndarray:
+    sprite = _label_sprites.get((vtype, pct))
+    if sprite is None:
+        label = f"{vtype} {pct}%"
+        (tw, th), _ = cv2.getTextSize(label, _LABEL_FONT, 0.5, 1)
+        sprite = np.empty((th + 8, tw + 4, 3), dtype=np.uint8)
+        sprite[:] = BBOX_COLORS.get(vtype, (128, 128, 128))
+        cv2.putText(sprite, label, (2, th + 4), _LABEL_FONT, 0.5, (255, 255, 255), 1)
+        _label_sprites[(vtype, pct)] = sprite
+    return sprite
+
+
+def _label_slot(vtype: str, pct: int) -> tuple[int, int, int]:
+    """(atlas offset, h, w) of the label sprite, appending it to the atlas on first use.
+    The atlas is published before the slot, so any slot a reader sees is inside
+    the atlas it reads afterwards."""
+    global _label_atlas
+    slot = _label_slots.get((vtype, pct))
+    if slot is None:
+        with _label_lock:
+            slot = _label_slots.get((vtype, pct))
+            if slot is None:
+                sprite = _label_sprite(vtype, pct)
+                slot = (_label_atlas.size, sprite.shape[0], sprite.shape[1])
+                _label_atlas = np.concatenate([_label_atlas, sprite.ravel()])
+                _label_slots[(vtype, pct)] = slot
+    return slot
+
+
+def _text_mask(text: str, scale: float, thickness: int) -> tuple[np.ndarray, int]:
+    """Boolean mask of `text` rendered once, and the row of its baseline."""
+    key = (text, scale, thickness)
+    cached = _text_masks.get(key)
+    if cached is None:
+        (tw, th), baseline = cv2.getTextSize(text, _LABEL_FONT, scale, thickness)
+        ascent = th + thickness
+        canvas = np.zeros((ascent + baseline + thickness, tw + thickness), dtype=np.uint8)
+        cv2.putText(canvas, text, (0, ascent), _LABEL_FONT, scale, 255, thickness)
+        cached = _text_masks[key] = (canvas > 0, ascent)
+    return cached
+
+
+def _clip_roi(frame: np.ndarray, x: int, y: int, sh: int, sw: int):
+    """(frame slice, sprite slice) for an sh x sw sprite placed at (x, y), clipped to the frame."""
     h, w = frame.shape[:2]
-    cv2.line(frame, (0, line_y), (w, line_y), (0, 255, 255), 2)
-    cv2.putText(frame, "Counting Line", (10, line_y - 10),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + sw, w), min(y + sh, h)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return (slice(y0, y1), slice(x0, x1)), (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+
+
+def _fill_mask(frame: np.ndarray, mask: np.ndarray, x: int, y: int, color) -> None:
+    roi = _clip_roi(frame, x, y, *mask.shape)
+    if roi is not None:
+        frame[roi[0]][mask[roi[1]]] = color
+
+
+def _draw_text(frame: np.ndarray, pieces: list[str], x: int, y: int, color,
+               scale: float = 0.5, thickness: int = 1) -> None:
+    """putText replacement: blit cached masks of `pieces` side by side, baseline at y.
+    Split changing parts (digits) into their own pieces so the cache stays small."""
+    for piece in pieces:
+        mask, ascent = _text_mask(piece, scale, thickness)
+        _fill_mask(frame, mask, x, y - ascent, color)
+        x += mask.shape[1] - thickness
+
+
+def _draw_counting_line(frame: np.ndarray, line_y: int) -> None:
+    """Counting line + label, pre-rendered once per (width, line_y) as a mask band."""
+    w = frame.shape[1]
+    band = _line_bands.get((w, line_y))
+    if band is None:
+        mask, ascent = _text_mask("Counting Line", 0.6, 2)
+        # Text baseline 10 px above the line, as cv2.putText placed it
+        top = line_y - 10 - ascent
+        mh, mw = mask.shape
+        canvas = np.zeros((max(line_y + 2 - top, mh), w), dtype=np.uint8)
+        cv2.line(canvas, (0, line_y - top), (w, line_y - top), 255, 2)
+        mw = min(mw, max(0, w - 10))
+        canvas[:mh, 10:10 + mw][mask[:, :mw]] = 255
+        band = _line_bands[(w, line_y)] = (top, canvas > 0)
+    top, mask = band
+    _fill_mask(frame, mask, 0, top, LINE_COLOR)
+
+
+def _draw_legend(frame: np.ndarray, counts: dict[str, int]) -> None:
+    """Per-type running totals in the top-left corner."""
+    y = 30
+    for vtype, cnt in counts.items():
+        _draw_text(frame, [f"{vtype}: ", *str(cnt)], 10, y,
+                   BBOX_COLORS.get(vtype, (128, 128, 128)), scale=0.6, thickness=2)
+        y += 25
+
+
+def _draw_overlay(frame: np.ndarray, tracked: list[dict], line_y: int,
+                  counts: dict[str, int], boxes: np.ndarray | None = None) -> None:
+    """Full live-monitor overlay: detections, counting line and legend."""
+    _draw_detections(frame, tracked, line_y, boxes)
+    _draw_legend(frame, counts)
+
+
+def _draw_detections(frame: np.ndarray, tracked: list[dict], line_y: int,
+                     boxes: np.ndarray | None = None) -> None:
+    """Draw bounding boxes, labels, and counting line on frame (in-place).
+    `boxes` is the (N, 4) xyxy array matching `tracked` (VehicleTracker.last_xyxy)
+    when the caller has it; otherwise it is rebuilt from the dicts.
+
+    Boxes go out in one numba pass (or one cv2.polylines call per vehicle type
+    without numba); labels and the counting line are cached renders copied
+    into the frame, not cv2.putText."""
+    _draw_counting_line(frame, line_y)
+    if not tracked:
+        return
 
-    for det in tracked:
-        x1, y1, x2, y2 = [int(v) for v in det["bbox"]]
+    if boxes is None:
+        boxes = np.asarray([d["bbox"] for d in tracked], dtype=np.float32)
+    boxes = boxes.astype(np.int32)
+    x1, y1, x2, y2 = boxes.T
+    if HAVE_NUMBA:
+        colors = _COLOR_LUT[[_COLOR_INDEX.get(d["vehicle_type"], -1) for d in tracked]]
+        draw_rects(frame, boxes, colors, 2)
+    else:
+        rects = np.stack([
+            np.stack([x1, y1], axis=1), np.stack([x2, y1], axis=1),
+            np.stack([x2, y2], axis=1), np.stack([x1, y2], axis=1),
+        ], axis=1)
+        by_type: dict[str, list[int]] = defaultdict(list)
+        for i, det in enumerate(tracked):
+            by_type[det["vehicle_type"]].append(i)
+        for vtype, idx in by_type.items():
+            cv2.polylines(frame, list(rects[idx]), True, BBOX_COLORS.get(vtype, (128, 128, 128)), 2)
+
+    if HAVE_NUMBA:
+        # Label tags (background + text, pre-rendered) placed in one kernel call
+        slots = np.array([_label_slot(d["vehicle_type"], int(round(d["confidence"] * 100)))
+                          for d in tracked], dtype=np.int64)
+        pos = np.stack([x1, y1 - slots[:, 1]], axis=1).astype(np.int64)
+        blit_sprites(frame, _label_atlas, slots[:, 0], slots[:, 1:], pos)
+
+    for i, det in enumerate(tracked):
         vtype = det["vehicle_type"]
-        conf = det["confidence"]
-        color = BBOX_COLORS.get(vtype, (128, 128, 128))
-
-        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-
-        label = f"{vtype} {conf:.0%}"
-        (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-        cv2.rectangle(frame, (x1, y1 - th - 8), (x1 + tw + 4, y1), color, -1)
-        cv2.putText(frame, label, (x1 + 2, y1 - 4),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        if not HAVE_NUMBA:
+            sprite = _label_sprite(vtype, int(round(det["confidence"] * 100)))
+            sh, sw = sprite.shape[:2]
+            roi = _clip_roi(frame, int(x1[i]), int(y1[i]) - sh, sh, sw)
+            if roi is not None:
+                frame[roi[0]] = sprite[roi[1]]
 
         tid = det.get("tracker_id", -1)
         if tid >= 0:
-            cv2.putText(frame, f"#{tid}", (x1, y2 + 16),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
-
-
-def _get_stream_url(youtube_url: str) -> str:
-    cmd = ["yt-dlp", "-g", "-f", "bv[height<=720]/bv/b"]
-    if settings.ytdlp_cookies_file:
-        # Resolve absolute path relative to this file's directory (backend/)
-        cookies_path = Path(settings.ytdlp_cookies_file)
-        if not cookies_path.is_absolute():
-            cookies_path = Path(__file__).resolve().parent.parent.parent / cookies_path
-        if cookies_path.exists():
-            cmd.extend(["--cookies", str(cookies_path)])
-            logger.info(f"yt-dlp using cookies: {cookies_path}")
-        else:
-            logger.warning(f"Cookies file not found: {cookies_path}, trying without cookies")
-    elif settings.ytdlp_cookies_browser:
-        cmd.extend(["--cookies-from-browser", settings.ytdlp_cookies_browser])
-    cmd.append(youtube_url)
-    logger.debug(f"yt-dlp cmd: {' '.join(cmd)}")
-    result = subprocess.run(
-        cmd, capture_output=True, text=True, timeout=30,
-    )
-    if result.returncode != 0:
-        raise RuntimeError(f"yt-dlp error: {result.stderr.strip()}")
-    return result.stdout.strip().split("\n")[0]
+            _draw_text(frame, ["#", *str(tid)], int(x1[i]), int(y2[i]) + 16,
+                       BBOX_COLORS.get(vtype, (128, 128, 128)))
+
+
+def _resolve_url(url: str, force: bool = False) -> str:
+    """Use yt-dlp for YouTube URLs only (through the shared stream_pool cache;
+    force=True re-resolves); return RTSP/HTTP direct streams unchanged."""
+    return resolve_url(url, force)
 
 
-def _resolve_url(url: str) -> str:
-    """Use yt-dlp for YouTube URLs only; return RTSP/HTTP direct streams unchanged."""
-    if "youtube" in url or "youtu.be" in url:
-        return _get_stream_url(url)
-    return url
+# Let the FFmpeg backend pick a hardware decoder (NVDEC / VAAPI / D3D11 / ...)
+# when one is available; it silently stays on software decode otherwise.
+_HW_DECODE_PARAMS = [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
 
 
-def _open_capture(stream_url: str) -> cv2.VideoCapture:
-    """Open VideoCapture with optimized settings for live streams."""
+def _open_capture(stream_url: str, cap: cv2.VideoCapture | None = None) -> cv2.VideoCapture:
+    """Open VideoCapture with optimized settings for live streams.
+    Pass `cap` to reopen an existing (released) capture object in place."""
     import os
     os.environ["OPENCV_FFMPEG_LOGLEVEL"] = "error"
 
+    def _open():
+        if cap is None:
+            return cv2.VideoCapture(stream_url, cv2.CAP_FFMPEG, _HW_DECODE_PARAMS)
+        cap.open(stream_url, cv2.CAP_FFMPEG, _HW_DECODE_PARAMS)
+        return cap
+
     if stream_url.startswith("rtsp://"):
         # Force TCP transport for internet RTSP cameras (prevents UDP packet loss on WAN).
         # OPENCV_FFMPEG_CAPTURE_OPTIONS is a global env var — protect with a lock so
         # concurrent monitor starts don't clobber each other's setting.
         with _rtsp_cap_lock:
             os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp"
-            cap = cv2.VideoCapture(stream_url, cv2.CAP_FFMPEG)
+            opened = _open()
             os.environ.pop("OPENCV_FFMPEG_CAPTURE_OPTIONS", None)
-        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-    else:
-        cap = cv2.VideoCapture(stream_url, cv2.CAP_FFMPEG)
-    return cap
+        opened.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return opened
+    return _open()
 
 
 class FrameReader:
-    """Dedicated frame reader thread - prevents cv2.read() from blocking the main loop."""
+    """Dedicated frame reader thread - prevents cv2.read() from blocking the main loop.
+
+    The thread only grab()s (advances the stream) at source FPS; read() then
+    retrieve()s the most recent grabbed frame on demand. Frames the monitor is
+    too slow for are skipped without the BGR conversion + copy cv2.read() does
+    for every one of them. The capture isn't thread-safe, so grab and retrieve
+    share a lock.
+
+    After the stream ends the thread parks instead of exiting; reopen() swaps a
+    new stream into the same VideoCapture and wakes it, so a reconnect costs
+    no new thread."""
 
     def __init__(self, cap: cv2.VideoCapture):
         self._cap = cap
+        self._set_frame_interval()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()  # set while a grabbed frame (or end of stream) is pending
+        self._ended = False
+        self._stopped = threading.Event()
+        self._reopened = threading.Event()  # set by reopen() (and stop()) to wake a parked thread
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _set_frame_interval(self):
         # Throttle to source FPS so buffered HLS/YouTube streams aren't read faster
         # than real-time. cap.get(FPS) may return 0 for some streams → default 25.
-        raw_fps = cap.get(cv2.CAP_PROP_FPS)
+        raw_fps = self._cap.get(cv2.CAP_PROP_FPS)
         fps = raw_fps if 1 <= raw_fps <= 120 else 25.0
         self._frame_interval = 1.0 / fps
-        self._queue: Queue = Queue(maxsize=8)  # Buffer for stream stalls
-        self._stopped = threading.Event()
-        self._thread = threading.Thread(target=self._run, daemon=True)
-        self._thread.start()
 
     def _run(self):
+        while not self._stopped.is_set():
+            self._grab_loop()
+            # Stream ended: park until reopen() (or stop())
+            self._reopened.wait()
+            self._reopened.clear()
+        # stop() skips the release while a stalled grab holds the lock
+        with self._lock:
+            self._cap.release()
+
+    def _grab_loop(self):
         consecutive_failures = 0
         frames_read = 0
-        last_read = time.time()
+        last_read = time.monotonic()
         while not self._stopped.is_set():
             # Throttle: wait until next frame slot to avoid reading buffered
             # HLS segments faster than the original stream's real-time FPS.
-            now = time.time()
+            now = time.monotonic()
             wait = self._frame_interval - (now - last_read)
-            if wait > 0:
-                time.sleep(wait)
+            if wait > 0 and self._stopped.wait(wait):
+                break
 
             try:
-                ret, frame = self._cap.read()
-                last_read = time.time()
+                with self._lock:
+                    ret = self._cap.grab()
+                    if ret:
+                        self._ready.set()
+                last_read = time.monotonic()
                 if not ret:
                     if frames_read == 0 and consecutive_failures == 0:
-                        logger.warning(f"FrameReader: first cap.read() returned False (stream may not support direct read)")
+                        logger.warning(f"FrameReader: first cap.grab() returned False (stream may not support direct read)")
                     consecutive_failures += 1
                     if consecutive_failures > 30:
                         # Stream truly dead after many failures
-                        try:
-                            self._queue.put(None, timeout=1)
-                        except Full:
-                            pass
-                        break
-                    time.sleep(0.05)
+                        self._end()
+                        return
+                    self._stopped.wait(0.05)
                     continue
                 consecutive_failures = 0
                 frames_read += 1
                 if frames_read == 1:
                     logger.info(f"FrameReader: first frame OK (fps={1/self._frame_interval:.0f})")
-                # Drop old frames if queue is full (keep latest)
-                if self._queue.full():
-                    try:
-                        self._queue.get_nowait()
-                    except Empty:
-                        pass
-                self._queue.put(frame, timeout=1)
             except Exception as e:
-                logger.error(f"FrameReader: cap.read() exception after {frames_read} frames: {e}")
+                logger.error(f"FrameReader: cap.grab() exception after {frames_read} frames: {e}")
+                self._end()
+                return
+
+    def _end(self):
+        self._ended = True
+        self._ready.set()
+
+    def read(self, timeout: float = FRAME_QUEUE_TIMEOUT):
+        """Read a frame with timeout. Returns frame or None on failure/timeout."""
+        if not self._ready.wait(timeout):
+            return None  # Timeout
+        if self._ended:
+            return None  # Stream failed
+        # A grab() stalled on the network holds the lock — don't wait past timeout
+        if not self._lock.acquire(timeout=timeout):
+            return None
+        try:
+            self._ready.clear()
+            ret, frame = self._cap.retrieve()
+        finally:
+            self._lock.release()
+        return frame if ret else None
+
+    def reopen(self, stream_url: str) -> bool:
+        """Release the current stream and open `stream_url` on the same
+        VideoCapture; the reader thread resumes grabbing from it. Returns
+        False if the new stream didn't open (call again to retry)."""
+        with self._lock:
+            self._cap.release()
+            _open_capture(stream_url, self._cap)
+            opened = self._cap.isOpened()
+            if opened:
+                self._set_frame_interval()
+                self._ended = False
+                self._ready.clear()
+        if opened:
+            self._reopened.set()
+        return opened
+
+    def stop(self, timeout: float = 5.0):
+        """Stop grabbing and release the capture. The capture isn't
+        thread-safe: release only under the lock, i.e. never while a read()
+        or grab() is inside it; if the lock stays busy past `timeout`, the
+        reader thread releases it on its way out instead."""
+        self._stopped.set()
+        self._reopened.set()
+        if self._lock.acquire(timeout=timeout):
+            try:
+                self._cap.release()
+            finally:
+                self._lock.release()
+
+
+def _encode_jpeg(bgr: np.ndarray, quality: int) -> bytes:
+    global _nvjpeg
+    if _nvjpeg:
+        try:
+            rgb = torch.from_numpy(bgr).to("cuda:0").flip(-1).permute(2, 0, 1).contiguous()
+            return _tv_encode_jpeg(rgb, quality=quality).cpu().numpy().tobytes()
+        except Exception as e:
+            logger.warning(f"nvJPEG encode failed ({e}), falling back to CPU JPEG")
+            _nvjpeg = False
+    if _tj is not None:
+        return _tj.encode(bgr, quality=quality, pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420)
+    _, buf = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, quality,
+                                        cv2.IMWRITE_JPEG_SAMPLING_FACTOR, cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420])
+    return buf.tobytes()
+
+
+class FrameEncoder:
+    """
+    Dedicated JPEG encode thread - keeps cv2.imencode off the detection loop so
+    encoding frame N overlaps detection on frame N+1. Writes state["_raw_frame"]
+    / state["_annotated_frame"], bumps _raw_seq / _frame_seq respectively and
+    sets _frame_event for the MJPEG viewers.
+
+    An optional overlay callable is applied to the annotated frame on this
+    thread, after the raw frame has been encoded - so raw and annotated may be
+    the same array and the caller needs neither a copy nor the draw cost.
+    With max_height set, annotated frames taller than that are downscaled
+    before encoding (the raw frame stays native for snapshots).
+    """
+
+    def __init__(self, state: dict, raw_quality: int = 70, annotated_quality: int = 55,
+                 max_height: int = 0):
+        self._state = state
+        self._raw_quality = raw_quality
+        self._annotated_quality = annotated_quality
+        self._max_height = max_height
+        self._queue: Queue = Queue(maxsize=2)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, raw: np.ndarray | None = None, annotated: np.ndarray | None = None,
+               overlay=None):
+        """Queue frames for encoding. The caller must not modify them afterwards."""
+        if raw is None and annotated is None:
+            return
+        item = (raw, annotated, overlay)
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except Full:
+                # Back-pressure: drop the oldest pending frame, keep latest
                 try:
-                    self._queue.put(None, timeout=1)
-                except Full:
+                    self._queue.get_nowait()
+                except Empty:
                     pass
+
+    def _run(self):
+        state = self._state
+        while True:
+            item = self._queue.get()
+            if item is None:
                 break
+            raw, annotated, overlay = item
+            try:
+                if raw is not None:
+                    state["_raw_frame"] = _encode_jpeg(raw, self._raw_quality)
+                    state["_raw_seq"] = state.get("_raw_seq", 0) + 1
+                if annotated is not None:
+                    if overlay is not None:
+                        overlay(annotated)
+                    h = annotated.shape[0]
+                    if self._max_height and h > self._max_height:
+                        s = self._max_height / h
+                        annotated = cv2.resize(annotated, None, fx=s, fy=s, interpolation=cv2.INTER_AREA)
+                    state["_annotated_frame"] = _encode_jpeg(annotated, self._annotated_quality)
+                    state["_frame_seq"] = state.get("_frame_seq", 0) + 1
+                event = state.get("_frame_event")
+                if event:
+                    event.set()
+            except Exception as e:
+                logger.error(f"FrameEncoder: encode failed: {e}")
 
-    def read(self, timeout: float = FRAME_QUEUE_TIMEOUT):
-        """Read a frame with timeout. Returns frame or None on failure/timeout."""
+    def stop(self, timeout: float = 5.0):
+        """Finish the frames already queued, then end the thread."""
         try:
-            frame = self._queue.get(timeout=timeout)
-            return frame  # None means stream failed
-        except Empty:
-            return None  # Timeout
+            self._queue.put(None, timeout=timeout)
+        except Full:
+            pass
+        self._thread.join(timeout=timeout)
 
-    def stop(self):
-        self._stopped.set()
-        self._cap.release()
+
+class EventWriter:
+    """
+    DB writer thread for a monitor loop. The loop hands over a batch of rows
+    (DetectionEvent by default, OccupancySnapshot from the parking monitor);
+    the bulk INSERT and commit run here, so the loop never waits on the database.
+    """
+
+    def __init__(self, db):
+        self._db = db
+        self._queue: Queue = Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, rows: list[dict], model=DetectionEvent):
+        """Queue rows of *model* for insertion. The writer owns the list afterwards."""
+        if rows:
+            self._queue.put((rows, model))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            rows, model = item
+            try:
+                _flush_events(self._db, rows, model)
+                self._db.commit()
+            except Exception as e:
+                self._db.rollback()
+                logger.error(f"EventWriter: insert of {len(rows)} {model.__tablename__} rows failed: {e}")
+
+    def stop(self, timeout: float = 10.0):
+        """Write the batches already queued, then end the thread."""
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
 
 
 def _ffprobe_stream(stream_url: str) -> tuple[int, int, float]:
@@ -226,56 +570,115 @@ class FFmpegReader:
     connection after reading the initial buffer). ffmpeg handles reconnect internally.
 
     Same interface as FrameReader: .read(timeout) / .stop()
+
+    Frames are read straight from the pipe into a fixed ring of preallocated
+    buffers (page-locked when CUDA is available, so a later GPU upload can be
+    asynchronous) — no per-frame allocation. A returned frame is only valid
+    until the next read(); its slot is then recycled.
     """
 
+    QUEUE_SIZE = 8
+    # Queued frames + the one the consumer holds + the one being filled
+    RING_SLOTS = QUEUE_SIZE + 2
+
     def __init__(self, stream_url: str, width: int, height: int, fps: float = 25.0):
         self._url = stream_url
         self.width = width
         self.height = height
         self.fps = fps if 1 <= fps <= 120 else 25.0
-        self._frame_size = width * height * 3  # BGR24
-        self._queue: Queue = Queue(maxsize=8)
+        self._ring = [_alloc_frame_buffer(height, width) for _ in range(self.RING_SLOTS)]
+        self._free: Queue = Queue()
+        for i in range(self.RING_SLOTS):
+            self._free.put(i)
+        self._held: int | None = None
+        self._queue: Queue = Queue(maxsize=self.QUEUE_SIZE)
         self._stopped = threading.Event()
         self._proc: subprocess.Popen | None = None
         self._thread = threading.Thread(target=self._run, daemon=True)
         self._thread.start()
 
-    def _run(self):
+    def _acquire_slot(self) -> int | None:
+        """A free ring slot; when the queue is full the oldest queued frame is dropped and its slot reused."""
+        while not self._stopped.is_set():
+            if self._queue.full():
+                try:
+                    idx = self._queue.get_nowait()
+                    if idx is not None:
+                        return idx
+                except Empty:
+                    pass
+            try:
+                return self._free.get(timeout=0.1)
+            except Empty:
+                continue
+        return None
+
+    def _command(self, nvdec: bool) -> list[str]:
         # -re: read input at native frame rate (real-time) to avoid burning CPU
         # on buffered HLS/CDN content faster than playback speed.
-        cmd = [
+        if not nvdec:
+            return [
+                "ffmpeg", "-loglevel", "error",
+                "-re",
+                "-i", self._url,
+                "-f", "rawvideo", "-pix_fmt", "bgr24",
+                "pipe:1",
+            ]
+        # NVDEC: decode + scale on the GPU, download NV12 (half the pipe bytes of
+        # BGR24); the NV12 → BGR conversion is done here with OpenCV.
+        return [
             "ffmpeg", "-loglevel", "error",
             "-re",
+            "-hwaccel", "cuda", "-hwaccel_output_format", "cuda",
             "-i", self._url,
-            "-f", "rawvideo", "-pix_fmt", "bgr24",
+            "-vf", f"scale_cuda={self.width}:{self.height}:format=nv12,hwdownload,format=nv12",
+            "-f", "rawvideo", "-pix_fmt", "nv12",
             "pipe:1",
         ]
+
+    def _run(self):
+        # NV12 needs even dimensions; odd-sized streams stay on CPU decode
+        nvdec = settings.ffmpeg_nvdec and self.width % 2 == 0 and self.height % 2 == 0
+        while True:
+            frames_read = self._pump(nvdec)
+            if not (nvdec and frames_read == 0 and not self._stopped.is_set()):
+                break
+            logger.warning("FFmpegReader: NVDEC decode produced no frames, falling back to CPU decode")
+            nvdec = False
+
+    def _pump(self, nvdec: bool) -> int:
+        """Run one ffmpeg process and feed its frames into the ring; returns frames read."""
         frames_read = 0
+        nv12 = np.empty((self.height * 3 // 2, self.width), dtype=np.uint8) if nvdec else None
         try:
             self._proc = subprocess.Popen(
-                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                self._command(nvdec), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
             )
             while not self._stopped.is_set():
-                raw = self._proc.stdout.read(self._frame_size)
-                if len(raw) < self._frame_size:
+                idx = self._acquire_slot()
+                if idx is None:
+                    break
+                target = nv12 if nvdec else self._ring[idx]
+                if not _read_exact(self._proc.stdout, memoryview(target).cast("B")):
+                    self._free.put(idx)
+                    if nvdec and frames_read == 0:
+                        # Let _run retry on the CPU before signalling end of stream
+                        return 0
                     logger.warning(f"FFmpegReader: stream ended after {frames_read} frames")
                     try:
                         self._queue.put(None, timeout=1)
                     except Full:
                         pass
                     break
-                frame = np.frombuffer(raw, dtype=np.uint8).reshape(
-                    (self.height, self.width, 3)
-                ).copy()
+                if nvdec:
+                    cv2.cvtColor(nv12, cv2.COLOR_YUV2BGR_NV12, dst=self._ring[idx])
                 frames_read += 1
                 if frames_read == 1:
-                    logger.warning(f"FFmpegReader: first frame OK ({self.width}x{self.height} @ {self.fps:.0f}fps)")
-                if self._queue.full():
-                    try:
-                        self._queue.get_nowait()
-                    except Empty:
-                        pass
-                self._queue.put(frame, timeout=1)
+                    logger.warning(
+                        f"FFmpegReader: first frame OK ({self.width}x{self.height} @ {self.fps:.0f}fps"
+                        f"{', NVDEC' if nvdec else ''})"
+                    )
+                self._queue.put(idx, timeout=1)
         except Exception as e:
             logger.error(f"FFmpegReader: exception after {frames_read} frames: {e}")
             try:
@@ -285,12 +688,21 @@ class FFmpegReader:
         finally:
             if self._proc and self._proc.poll() is None:
                 self._proc.terminate()
+        return frames_read
 
     def read(self, timeout: float = FRAME_QUEUE_TIMEOUT):
+        # The caller is done with the previous frame — hand its slot back
+        if self._held is not None:
+            self._free.put(self._held)
+            self._held = None
         try:
-            return self._queue.get(timeout=timeout)
+            idx = self._queue.get(timeout=timeout)
         except Empty:
             return None
+        if idx is None:
+            return None
+        self._held = idx
+        return self._ring[idx]
 
     def stop(self):
         self._stopped.set()
@@ -298,6 +710,38 @@ class FFmpegReader:
             self._proc.terminate()
 
 
+def _alloc_frame_buffer(height: int, width: int) -> np.ndarray:
+    """(H, W, 3) uint8 frame buffer, in pinned host memory when CUDA is available."""
+    if torch.cuda.is_available():
+        # The numpy view keeps the pinned tensor alive
+        return torch.empty((height, width, 3), dtype=torch.uint8).pin_memory().numpy()
+    return np.empty((height, width, 3), dtype=np.uint8)
+
+
+def _read_exact(stream, view: memoryview) -> bool:
+    """Fill `view` from `stream`; False if the stream ends first."""
+    filled = 0
+    total = len(view)
+    while filled < total:
+        n = stream.readinto(view[filled:])
+        if not n:
+            return False
+        filled += n
+    return True
+
+
+def _flush_events(db, pending: list[dict], model=DetectionEvent) -> None:
+    """Bulk-insert queued rows of *model* (Core executemany, no ORM objects).
+
+    The transaction commits without waiting for the WAL flush (Postgres
+    synchronous_commit off, this transaction only): a crash can lose the last
+    few hundred ms of events, but the loop thread never stalls on fsync."""
+    if pending:
+        db.execute(text("SET LOCAL synchronous_commit TO OFF"))
+        db.execute(insert(model), pending)
+        pending.clear()
+
+
 def _monitor_loop(camera_id: int, stream_origin: str, stream_url: str, ws_callback,
                    model_name: str | None = None):
     """Single-loop design: read frame → YOLO detect → draw → publish.
@@ -315,21 +759,51 @@ def _monitor_loop(camera_id: int, stream_origin: str, stream_url: str, ws_callba
 
     frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
-    detector = VehicleDetector(model_name)
+    # Shared per model; the first acquire() loads and warms it up before "running"
+    try:
+        detector = BatchedDetectorService.acquire(model_name)
+    except Exception as e:
+        cap.release()
+        monitor["status"] = "error"
+        monitor["error"] = f"Detector load failed: {e}"
+        logger.error(f"Camera {camera_id}: Detector load failed: {e}")
+        return
+
+    # A first load / export can take minutes — the camera may have been stopped meanwhile
+    if monitor.get("status") == "stopping":
+        detector.release()
+        cap.release()
+        return
     tracker = VehicleTracker(frame_height)
 
     monitor["status"] = "running"
     monitor["_line_y"] = frame_height // 2
     logger.info(f"Camera {camera_id}: Live monitoring started (model={model_name or settings.yolo_model})")
 
+    warmup_overlay_kernels()
     reader = FrameReader(cap)
+    encoder = FrameEncoder(monitor, raw_quality=50, annotated_quality=55,
+                           max_height=PREVIEW_MAX_HEIGHT)
     frame_idx = 0
     last_frame_time = time.time()
     reconnect_attempts = 0
     db = SessionLocal()
+    writer = EventWriter(db)
     tz = ZoneInfo(settings.timezone)
-    batch_counts: dict[str, int] = defaultdict(int)
-    last_save = datetime.now(tz)
+    # Per-type tally in VEHICLE_TYPES order; `totals` is its dict form, rebuilt
+    # only on frames that add detections and shared (never mutated) after that
+    batch_counts = np.zeros(len(VEHICLE_TYPES), dtype=np.int64)
+    totals: dict[str, int] = {}
+    pending_events: list[dict] = []
+    last_save = time.time()
+    last_stamp = 0.0
+    last_sig: bytes | None = None
+    last_enc_key: tuple | None = None
+    last_enc = 0.0
+    prev_gray: np.ndarray | None = None
+    last_motion = time.monotonic()
+    idle_frames = 0
+    last_ws = 0.0
 
     try:
         while monitor.get("status") == "running":
@@ -355,13 +829,13 @@ def _monitor_loop(camera_id: int, stream_origin: str, stream_url: str, ws_callba
                     f"({reconnect_attempts}/{MAX_RECONNECT_ATTEMPTS}), "
                     f"waiting {delay}s..."
                 )
-                time.sleep(delay)
-
-                if monitor.get("status") != "running":
+                # Backoff ends early when stop_*() sets _stop_event
+                if monitor["_stop_event"].wait(delay) or monitor.get("status") != "running":
                     break
 
                 try:
-                    stream_url = _resolve_url(stream_origin)
+                    # Reuse the cached URL first; re-run yt-dlp only once it has failed twice
+                    stream_url = _resolve_url(stream_origin, reconnect_attempts > 2)
                 except Exception as e:
                     logger.error(f"Camera {camera_id}: URL resolve failed: {e}")
                     continue
@@ -376,44 +850,75 @@ def _monitor_loop(camera_id: int, stream_origin: str, stream_url: str, ws_callba
 
             last_frame_time = time.time()
             reconnect_attempts = 0
+
+            # HLS replays the same frame after a buffer stall — an 8x8 thumbnail
+            # is enough to spot the repeat and skip detect/track/count for it
+            thumb = cv2.resize(frame, (32, 32), interpolation=cv2.INTER_AREA)
+            small = cv2.resize(thumb, (8, 8), interpolation=cv2.INTER_AREA)
+            sig = small.tobytes()
+            if sig == last_sig:
+                continue
+            last_sig = sig
+
+            # Idle throttle: nobody watching and no motion for IDLE_AFTER seconds
+            # → detect only every IDLE_DETECT_EVERY-th frame until motion returns
+            gray = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+            tick = time.monotonic()
+            if (prev_gray is None or monitor.get("_viewers", 0) > 0
+                    or cv2.norm(gray, prev_gray, cv2.NORM_L1) / gray.size >= IDLE_MOTION_THRESHOLD):
+                last_motion = tick
+            prev_gray = gray
+            if tick - last_motion > IDLE_AFTER:
+                idle_frames += 1
+                if idle_frames % IDLE_DETECT_EVERY:
+                    continue
+            else:
+                idle_frames = 0
             frame_idx += 1
 
             # === EVERY FRAME: detect → track → count ===
-            orig_w = frame.shape[1]
-            scale = 640 / orig_w
-            small = cv2.resize(frame, None, fx=scale, fy=scale)
-            raw_dets = detector.detect(small)
-            for d in raw_dets:
-                d["bbox"] = [v / scale for v in d["bbox"]]
-
-            tracked = tracker.update(raw_dets)
-            now = datetime.now(tz)
-
-            # Save detections to DB
+            # Detector columns go straight into ByteTrack — no per-detection dicts
+            dets = detector.submit_frame(frame).result(timeout=DETECT_TIMEOUT)
+            tracked = tracker.update_arrays(*dets, detector.vehicle_names)
+            now_ts = time.time()
+            # Timezone-aware datetime + ISO string only when detection rows or the
+            # WS message need them, or the status stamp is LAST_UPDATE_INTERVAL old
+            if tracked or now_ts - last_stamp >= LAST_UPDATE_INTERVAL:
+                now = datetime.fromtimestamp(now_ts, tz)
+                now_iso = now.isoformat()
+                monitor["last_update"] = now_iso
+                last_stamp = now_ts
+
+            # Queue detection rows; flushed as one bulk INSERT every 10 seconds
             for det in tracked:
-                db.add(DetectionEvent(
-                    camera_id=camera_id,
-                    vehicle_type=det["vehicle_type"],
-                    confidence=det["confidence"],
-                    timestamp=now,
-                ))
-                batch_counts[det["vehicle_type"]] += 1
+                pending_events.append({
+                    "camera_id": camera_id,
+                    "vehicle_type": det["vehicle_type"],
+                    "confidence": det["confidence"],
+                    "timestamp": now,
+                })
+            if tracked:
+                batch_counts += np.bincount(
+                    [VEHICLE_INDEX[d["vehicle_type"]] for d in tracked], minlength=len(VEHICLE_TYPES))
+                totals = {vtype: int(n) for vtype, n in zip(VEHICLE_TYPES, batch_counts) if n}
+                monitor["detections_total"] = int(batch_counts.sum())
+                monitor["vehicle_counts"] = totals
 
             # Update live stats
             in_count, out_count = tracker.get_line_counts()
             monitor["frame_count"] = frame_idx
-            monitor["detections_total"] = sum(batch_counts.values())
-            monitor["vehicle_counts"] = dict(batch_counts)
             monitor["line_in"] = in_count
             monitor["line_out"] = out_count
-            monitor["last_update"] = now.isoformat()
 
-            # WebSocket message
-            if tracked:
-                ws_data = {
+            # WebSocket message: one slot, overwritten at most every WS_PUSH_INTERVAL
+            # (the sender pops it), so a lagging consumer costs neither memory
+            # nor a payload build per frame
+            if tracked and now_ts - last_ws >= WS_PUSH_INTERVAL:
+                last_ws = now_ts
+                monitor["_ws_latest"] = {
                     "type": "live_detection",
                     "camera_id": camera_id,
-                    "timestamp": now.isoformat(),
+                    "timestamp": now_iso,
                     "detections": [
                         {
                             "vehicle_type": d["vehicle_type"],
@@ -421,42 +926,48 @@ def _monitor_loop(camera_id: int, stream_origin: str, stream_url: str, ws_callba
                         }
                         for d in tracked
                     ],
-                    "totals": dict(batch_counts),
+                    "totals": totals,
                     "line_in": in_count,
                     "line_out": out_count,
                 }
-                monitor["_ws_queue"].append(ws_data)
 
-            # Save to DB every 10 seconds
-            if (now - last_save).total_seconds() >= 10:
-                db.commit()
-                last_save = now
-
-            # === DISPLAY: only when someone is watching ===
-            has_viewers = monitor.get("_viewers", 0) > 0
-            if not has_viewers:
+            # Hand the batch to the writer thread every 10 seconds
+            if now_ts - last_save >= 10:
+                writer.submit(pending_events)
+                pending_events = []
+                last_save = now_ts
+
+            # === DISPLAY: only what someone is watching ===
+            raw_viewers = monitor.get("_raw_viewers", 0) > 0
+            annotated_viewers = monitor.get("_annotated_viewers", 0) > 0
+
+            # Static scene: same 64x36 thumbnail (fine enough to see people,
+            # light changes and untracked objects), same tracks and same legend
+            # → the published JPEGs are still valid, so skip draw + encode,
+            # but never for longer than ENCODE_MAX_AGE
+            enc_key = (
+                cv2.resize(frame, (64, 36), interpolation=cv2.INTER_AREA).tobytes(),
+                tuple((d["tracker_id"], round(d["confidence"], 2)) for d in tracked),
+                batch_counts.tobytes(),
+                monitor["_line_y"], raw_viewers, annotated_viewers,
+            )
+            tick = time.monotonic()
+            if enc_key == last_enc_key and tick - last_enc < ENCODE_MAX_AGE:
                 continue
+            last_enc_key, last_enc = enc_key, tick
 
-            if monitor.get("_raw_requested"):
-                _, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 50])
-                monitor["_raw_frame"] = buf.tobytes()
-
-            _draw_detections(frame, tracked, monitor["_line_y"])
-
-            y_offset = 30
-            for vtype, cnt in batch_counts.items():
-                color = BBOX_COLORS.get(vtype, (128, 128, 128))
-                cv2.putText(frame, f"{vtype}: {cnt}", (10, y_offset),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-                y_offset += 25
-
-            _, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 55])
-            monitor["_annotated_frame"] = buf.tobytes()
+            if not annotated_viewers:
+                if raw_viewers:
+                    encoder.submit(raw=frame)
+                continue
 
-            monitor["_frame_seq"] = monitor.get("_frame_seq", 0) + 1
-            frame_event = monitor.get("_frame_event")
-            if frame_event:
-                frame_event.set()
+            # Overlay is drawn on the encode thread, after the raw encode, so
+            # the same array serves both feeds without a copy
+            encoder.submit(
+                raw=frame if raw_viewers else None, annotated=frame,
+                overlay=partial(_draw_overlay, tracked=tracked, line_y=monitor["_line_y"],
+                                counts=totals, boxes=tracker.last_xyxy),
+            )
 
     except Exception as e:
         logger.error(f"Camera {camera_id}: Error - {e}")
@@ -464,14 +975,16 @@ def _monitor_loop(camera_id: int, stream_origin: str, stream_url: str, ws_callba
         monitor["error"] = str(e)
     finally:
         reader.stop()
+        encoder.stop()
+        detector.release()
+        writer.submit(pending_events)
+        writer.stop()
         now = datetime.now(tz)
-        for vtype, count in batch_counts.items():
-            db.add(TrafficCount(
-                camera_id=camera_id,
-                vehicle_type=vtype,
-                count=count,
-                timestamp=now,
-            ))
+        if totals:
+            db.execute(insert(TrafficCount), [
+                {"camera_id": camera_id, "vehicle_type": vtype, "count": count, "timestamp": now}
+                for vtype, count in totals.items()
+            ])
         db.commit()
         db.close()
 
@@ -501,14 +1014,17 @@ async def start_monitor(camera_id: int, stream_url: str, model_name: str | None
         "line_in": 0,
         "line_out": 0,
         "last_update": None,
-        "_ws_queue": [],
+        "_ws_latest": None,
         "_annotated_frame": None,
         "_raw_frame": None,
         "_line_y": 0,
         "_frame_event": threading.Event(),
+        "_stop_event": threading.Event(),  # set by stop_*(): interrupts reconnect backoff
         "_frame_seq": 0,
-        "_raw_requested": False,
+        "_raw_seq": 0,
         "_viewers": 0,
+        "_raw_viewers": 0,
+        "_annotated_viewers": 0,
     }
     active_monitors[camera_id] = monitor
 
@@ -530,6 +1046,7 @@ def stop_monitor(camera_id: int) -> dict:
 
     # Signal the monitor loop to stop (non-blocking)
     monitor["status"] = "stopping"
+    monitor["_stop_event"].set()
 
     # Clean up in background to avoid blocking API
     def _cleanup():
@@ -550,6 +1067,7 @@ def stop_all_monitors():
         monitor = active_monitors.get(camera_id)
         if monitor:
             monitor["status"] = "stopping"
+            monitor["_stop_event"].set()
             logger.info(f"Stopping monitor for camera {camera_id}")
 
     for camera_id in list(active_monitors.keys()):
@@ -4,6 +4,7 @@ Keys: lot_id (int), not camera_id.
 Does NOT save DetectionEvent / TrafficCount.
 Saves OccupancySnapshot every SNAPSHOT_INTERVAL seconds.
 """
+import asyncio
 import logging
 import threading
 import time
@@ -15,17 +16,21 @@ import cv2
 from ..config import settings
 from ..database import SessionLocal
 from ..models.parking import OccupancySnapshot
-from .detector import VehicleDetector
+from .detector import BatchedDetectorService
 from .live_monitor import (
+    DETECT_TIMEOUT,
     FRAME_QUEUE_TIMEOUT,
+    LAST_UPDATE_INTERVAL,
     MAX_RECONNECT_ATTEMPTS,
     RECONNECT_DELAY_BASE,
     RECONNECT_DELAY_MAX,
     STREAM_DEAD_TIMEOUT,
+    EventWriter,
     FrameReader,
     _draw_detections,
-    _get_stream_url,
+    _encode_jpeg,
     _open_capture,
+    _resolve_url,
 )
 from .tracker import VehicleTracker
 
@@ -51,12 +56,23 @@ def _monitor_loop(lot_id: int, initial_occupied: int, total_spaces: int,
         return
 
     frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    detector = VehicleDetector(model_name)
+    # Shared with live cameras on the same model; the first acquire() loads and
+    # warms it up before "running"
+    try:
+        detector = BatchedDetectorService.acquire(model_name)
+    except Exception as e:
+        cap.release()
+        monitor["status"] = "error"
+        monitor["error"] = f"Detector load failed: {e}"
+        logger.error(f"Parking lot {lot_id}: Detector load failed: {e}")
+        return
     tracker = VehicleTracker(frame_height)
 
     # Guard: stop may have been requested while model was loading
     if monitor.get("status") == "stopping":
         logger.info(f"Parking lot {lot_id}: Stop requested before monitor started")
+        detector.release()
+        cap.release()
         return
     monitor["status"] = "running"
     monitor["_line_y"] = frame_height // 2
@@ -68,7 +84,9 @@ def _monitor_loop(lot_id: int, initial_occupied: int, total_spaces: int,
     reconnect_attempts = 0
     tz = ZoneInfo(settings.timezone)
     db = SessionLocal()
-    last_snapshot = datetime.now(tz)
+    writer = EventWriter(db)
+    next_snapshot = time.monotonic() + SNAPSHOT_INTERVAL
+    last_stamp = 0.0
 
     try:
         while monitor.get("status") == "running":
@@ -87,13 +105,13 @@ def _monitor_loop(lot_id: int, initial_occupied: int, total_spaces: int,
 
                 delay = min(RECONNECT_DELAY_BASE * (2 ** (reconnect_attempts - 1)), RECONNECT_DELAY_MAX)
                 logger.warning(f"Parking lot {lot_id}: Reconnecting ({reconnect_attempts}/{MAX_RECONNECT_ATTEMPTS}), waiting {delay}s...")
-                time.sleep(delay)
-
-                if monitor.get("status") != "running":
+                # Backoff ends early when stop_*() sets _stop_event
+                if monitor["_stop_event"].wait(delay) or monitor.get("status") != "running":
                     break
 
                 try:
-                    stream_url = _get_stream_url(youtube_url)
+                    # Reuse the cached URL first; re-run yt-dlp only once it has failed twice
+                    stream_url = _resolve_url(youtube_url, reconnect_attempts > 2)
                 except Exception as e:
                     logger.error(f"Parking lot {lot_id}: yt-dlp failed: {e}")
                     continue
@@ -110,15 +128,9 @@ def _monitor_loop(lot_id: int, initial_occupied: int, total_spaces: int,
             frame_idx += 1
 
             # Detect + track
-            orig_w = frame.shape[1]
-            scale = 640 / orig_w
-            small = cv2.resize(frame, None, fx=scale, fy=scale)
-            raw_dets = detector.detect(small)
-            for d in raw_dets:
-                d["bbox"] = [v / scale for v in d["bbox"]]
-
-            tracked = tracker.update(raw_dets)
-            now = datetime.now(tz)
+            dets = detector.submit_frame(frame).result(timeout=DETECT_TIMEOUT)
+            tracked = tracker.update_arrays(*dets, detector.vehicle_names)
+            now_ts = time.time()
 
             line_in, line_out = tracker.get_line_counts()
             occupied = max(0, min(total_spaces, initial_occupied + line_in - line_out))
@@ -127,32 +139,34 @@ def _monitor_loop(lot_id: int, initial_occupied: int, total_spaces: int,
             monitor["line_in"] = line_in
             monitor["line_out"] = line_out
             monitor["occupied_spaces"] = occupied
-            monitor["last_update"] = now.isoformat()
-
-            # Save OccupancySnapshot periodically
-            if (now - last_snapshot).total_seconds() >= SNAPSHOT_INTERVAL:
-                db.add(OccupancySnapshot(
-                    parking_lot_id=lot_id,
-                    occupied_spaces=occupied,
-                    timestamp=now,
-                ))
-                db.commit()
-                last_snapshot = now
-                logger.info(f"Parking lot {lot_id}: Snapshot saved — occupied={occupied}")
+            # ISO stamp at most every LAST_UPDATE_INTERVAL, not per frame
+            if now_ts - last_stamp >= LAST_UPDATE_INTERVAL:
+                monitor["last_update"] = datetime.fromtimestamp(now_ts, tz).isoformat()
+                last_stamp = now_ts
+
+            # Save OccupancySnapshot periodically (written by the EventWriter thread)
+            mono = time.monotonic()
+            if mono >= next_snapshot:
+                writer.submit([{
+                    "parking_lot_id": lot_id,
+                    "occupied_spaces": occupied,
+                    "timestamp": datetime.fromtimestamp(now_ts, tz),
+                }], OccupancySnapshot)
+                next_snapshot = mono + SNAPSHOT_INTERVAL
+                logger.info(f"Parking lot {lot_id}: Snapshot queued — occupied={occupied}")
 
             # Render annotated frame for MJPEG feed
             has_viewers = monitor.get("_viewers", 0) > 0
             if not has_viewers:
                 continue
 
-            _draw_detections(frame, tracked, monitor["_line_y"])
+            _draw_detections(frame, tracked, monitor["_line_y"], tracker.last_xyxy)
 
             # Overlay occupancy info
             cv2.putText(frame, f"IN: {line_in}  OUT: {line_out}  OCC: {occupied}/{total_spaces}",
                         (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 200), 2)
 
-            _, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 55])
-            monitor["_annotated_frame"] = buf.tobytes()
+            monitor["_annotated_frame"] = _encode_jpeg(frame, 55)
             monitor["_frame_seq"] = monitor.get("_frame_seq", 0) + 1
             event = monitor.get("_frame_event")
             if event:
@@ -164,6 +178,8 @@ def _monitor_loop(lot_id: int, initial_occupied: int, total_spaces: int,
         monitor["error"] = str(e)
     finally:
         reader.stop()
+        detector.release()
+        writer.stop()
         db.close()
         if monitor.get("status") == "running":
             monitor["status"] = "stopped"
@@ -175,7 +191,8 @@ async def start_parking_monitor(lot_id: int, initial_occupied: int, total_spaces
     if lot_id in parking_monitors and parking_monitors[lot_id]["status"] == "running":
         return {"error": "Already monitoring this parking lot"}
 
-    stream_url = _get_stream_url(youtube_url)
+    # yt-dlp (on a cold URL) must not block the event loop
+    stream_url = await asyncio.get_running_loop().run_in_executor(None, _resolve_url, youtube_url)
 
     monitor = {
         "lot_id": lot_id,
@@ -191,6 +208,7 @@ async def start_parking_monitor(lot_id: int, initial_occupied: int, total_spaces
         "_annotated_frame": None,
         "_line_y": 0,
         "_frame_event": threading.Event(),
+        "_stop_event": threading.Event(),  # set by stop_*(): interrupts reconnect backoff
         "_frame_seq": 0,
         "_viewers": 0,
     }
@@ -213,6 +231,7 @@ def stop_parking_monitor(lot_id: int) -> dict:
         return {"error": "No active monitor for this parking lot"}
 
     monitor["status"] = "stopping"
+    monitor["_stop_event"].set()
 
     def _cleanup():
         thread = monitor.get("_thread")
@@ -247,6 +266,7 @@ def stop_all_parking_monitors():
         monitor = parking_monitors.get(lot_id)
         if monitor:
             monitor["status"] = "stopping"
+            monitor["_stop_event"].set()
     for lot_id in list(parking_monitors.keys()):
         monitor = parking_monitors.get(lot_id)
         if monitor:
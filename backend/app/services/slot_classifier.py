@@ -4,28 +4,73 @@ CNN-based parking slot classifier using MobileNetV3-Small.
 Loaded once as a module-level singleton via load_slot_classifier().
 Gracefully degrades (returns None) if the model file is missing or
 PyTorch is unavailable, so the rest of the system keeps working.
+
+Space and bus seat monitors submit() their crops to one batch worker, so
+concurrent lots / buses share a forward pass instead of queueing on the lock.
+
+With SLOT_CNN_BACKEND=onnxruntime the weights are exported once to ONNX,
+dynamically quantised to INT8 and run on ONNX Runtime's CPU provider
+(int8 dot products via VNNI where the CPU has it); PyTorch stays the
+fallback if onnxruntime is missing or the export fails.
 """
 import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from queue import Empty, Queue
 from typing import Optional
 
+import cv2
 import numpy as np
 
+from ..config import settings
+
+try:
+    import torch
+    from torchvision.models import mobilenet_v3_small
+    HAVE_TORCH = True
+except ImportError:
+    HAVE_TORCH = False
+
 logger = logging.getLogger(__name__)
 
 _slot_classifier: Optional["SlotClassifier"] = None
 
 
+def _export_int8_onnx(model, model_path: str) -> str:
+    """Export *model* to ONNX and quantise it to INT8 next to the .pt, once;
+    reused on later starts unless the .pt is newer."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    stem = os.path.splitext(model_path)[0]
+    onnx_path, int8_path = stem + ".onnx", stem + ".int8.onnx"
+    if os.path.exists(int8_path) and os.path.getmtime(int8_path) >= os.path.getmtime(model_path):
+        return int8_path
+    logger.warning(f"SlotClassifier: exporting {model_path} → INT8 ONNX (one-time)")
+    size = SlotClassifier.INPUT_SIZE
+    torch.onnx.export(
+        model, torch.zeros(1, 3, size, size), onnx_path, opset_version=17,
+        input_names=["input"], output_names=["output"],
+        dynamic_axes={"input": {0: "batch"}, "output": {0: "batch"}},
+    )
+    quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+
 class SlotClassifier:
     """
     MobileNetV3-Small binary classifier: index 0 = free, index 1 = occupied.
     predict() returns float 0.0 (definitely free) → 1.0 (definitely occupied).
     """
 
-    def __init__(self, model_path: str):
-        import torch
-        import torchvision.transforms as T
-        from torchvision.models import mobilenet_v3_small
+    INPUT_SIZE = 224
+    BATCH_WAIT = 0.01        # seconds the worker waits for other monitors' crops
+    MAX_BATCH_CROPS = 256    # crops per merged forward pass
+    RESULT_TIMEOUT = 10.0    # seconds a monitor waits on submit(); then it skips the CNN layer
 
+    def __init__(self, model_path: str):
         self.device = torch.device("cpu")
 
         model = mobilenet_v3_small(weights=None)
@@ -33,28 +78,182 @@ class SlotClassifier:
         in_features = model.classifier[-1].in_features
         model.classifier[-1] = torch.nn.Linear(in_features, 2)
         model.load_state_dict(torch.load(model_path, map_location="cpu"))
-        model.eval()
+        model.eval().requires_grad_(False)
         self._model = model
+        self._session = None  # ONNX Runtime INT8 session (SLOT_CNN_BACKEND=onnxruntime)
+        if settings.slot_cnn_backend == "onnxruntime":
+            try:
+                import onnxruntime as ort
+                options = ort.SessionOptions()
+                options.intra_op_num_threads = 2
+                self._session = ort.InferenceSession(
+                    _export_int8_onnx(model, model_path), options,
+                    providers=["CPUExecutionProvider"])
+            except Exception as e:
+                logger.warning(f"SlotClassifier: ONNX Runtime backend unavailable ({e}), using PyTorch")
 
-        self._transform = T.Compose([
-            T.ToPILImage(),
-            T.Resize((224, 224)),
-            T.ToTensor(),
-            T.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
-        ])
-        logger.info(f"SlotClassifier loaded: {model_path}")
+        # ImageNet normalisation, shaped for (N, 3, H, W) batches
+        self._mean = torch.tensor([0.485, 0.456, 0.406]).view(1, 3, 1, 1)
+        self._std = torch.tensor([0.229, 0.224, 0.225]).view(1, 3, 1, 1)
+        # Reused across calls, grown to the largest batch seen: resized RGB crops
+        # (uint8 HWC) and the normalised model input (float CHW)
+        self._stage = np.empty((0, self.INPUT_SIZE, self.INPUT_SIZE, 3), dtype=np.uint8)
+        self._buf = torch.empty(0, 3, self.INPUT_SIZE, self.INPUT_SIZE)
+        # Perceptual key → (probability, time cached); LRU-bounded, entries expire
+        # after SLOT_CACHE_TTL so a slowly changing scene is re-scored eventually
+        self._cache: OrderedDict[bytes, tuple[float, float]] = OrderedDict()
+        # Shared by the space and bus seat monitors: guards the buffers and the cache
+        self._lock = threading.Lock()
+        # First forward pass (allocator, ORT graph setup) happens here, not on a live frame
+        with self._lock:
+            self._infer([np.zeros((self.INPUT_SIZE, self.INPUT_SIZE, 3), dtype=np.uint8)])
+        self._queue: Queue = Queue()
+        self._closed = False
+        self._submit_lock = threading.Lock()  # no submit() can queue behind close()'s sentinel
+        self._thread = threading.Thread(target=self._run, daemon=True, name="slot-classifier-batch")
+        self._thread.start()
+        backend = "onnxruntime int8" if self._session is not None else "torch"
+        logger.info(f"SlotClassifier loaded: {model_path} ({backend})")
 
     def predict(self, crop_bgr: np.ndarray) -> float:
         """Return occupancy probability: 0.0 = free, 1.0 = occupied."""
-        import torch
-        import cv2
+        return float(self.predict_batch([crop_bgr])[0])
+
+    @staticmethod
+    def _crop_key(crop_bgr: np.ndarray) -> bytes:
+        """Crop shape + 8x8 grey thumbnail quantised to 16 levels: stable under
+        sensor noise, changes when something enters or leaves the slot."""
+        gray = cv2.cvtColor(cv2.resize(crop_bgr, (8, 8), interpolation=cv2.INTER_AREA),
+                            cv2.COLOR_BGR2GRAY)
+        return np.array(crop_bgr.shape[:2], dtype=np.int32).tobytes() + (gray >> 4).tobytes()
+
+    def predict_batch(self, crops_bgr: list[np.ndarray]) -> np.ndarray:
+        """
+        Occupancy probabilities for many crops. Crops whose perceptual key is
+        cached (and younger than SLOT_CACHE_TTL) reuse the stored probability;
+        the rest go through one forward pass.
+        """
+        n = len(crops_bgr)
+        if not n:
+            return np.empty(0, dtype=np.float32)
+        keys = [self._crop_key(c) for c in crops_bgr]
+        probs = np.empty(n, dtype=np.float32)
+        now = time.monotonic()
+        with self._lock:
+            misses = []
+            for i, key in enumerate(keys):
+                hit = self._cache.get(key)
+                if hit is not None and now - hit[1] < settings.slot_cache_ttl:
+                    self._cache.move_to_end(key)
+                    probs[i] = hit[0]
+                else:
+                    misses.append(i)
+            if misses:
+                probs[misses] = self._infer([crops_bgr[i] for i in misses])
+                for i in misses:
+                    self._cache[keys[i]] = (float(probs[i]), now)
+                    self._cache.move_to_end(keys[i])
+                while len(self._cache) > settings.slot_cache_size:
+                    self._cache.popitem(last=False)
+        return probs
+
+    def submit(self, crops_bgr: list[np.ndarray]) -> Future:
+        """
+        Queue crops for the shared batch worker; the Future resolves to their
+        predict_batch() probabilities. Requests from every monitor that arrive
+        within BATCH_WAIT go through one predict_batch() call.
+        """
+        future: Future = Future()
+        with self._submit_lock:
+            queued = not self._closed and bool(crops_bgr)
+            if queued:
+                self._queue.put((crops_bgr, future))
+        if not queued:
+            # Replaced by a reload (or nothing to do): answer on the caller's thread
+            future.set_result(self.predict_batch(crops_bgr))
+        return future
 
-        crop_rgb = cv2.cvtColor(crop_bgr, cv2.COLOR_BGR2RGB)
-        tensor = self._transform(crop_rgb).unsqueeze(0)   # (1, 3, 224, 224)
-        with torch.no_grad():
-            logits = self._model(tensor)                  # (1, 2)
-            probs = torch.softmax(logits, dim=1)          # [free_prob, occ_prob]
-            return float(probs[0, 1].item())              # occupied probability
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the batch worker once the requests already queued are answered;
+        whatever it leaves behind (it died or is stuck) is answered inline."""
+        with self._submit_lock:
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except Empty:
+                break
+            if item is None:
+                continue
+            crops, future = item
+            try:
+                future.set_result(self.predict_batch(crops))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:  # close() sentinel
+                break
+            batch = [item]
+            n = len(item[0])
+            deadline = time.monotonic() + self.BATCH_WAIT
+            while n < self.MAX_BATCH_CROPS:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except Empty:
+                    break
+                if item is None:
+                    stopping = True  # finish this batch, then exit
+                    break
+                batch.append(item)
+                n += len(item[0])
+
+            try:
+                probs = self.predict_batch([c for crops, _ in batch for c in crops])
+            except Exception as e:
+                logger.error(f"SlotClassifier: batch of {n} crops failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for crops, future in batch:
+                future.set_result(probs[start:start + len(crops)])
+                start += len(crops)
+
+    def _infer(self, crops_bgr: list[np.ndarray]) -> np.ndarray:
+        """
+        One forward pass over every crop. Each crop is resized and converted to
+        RGB by cv2 straight into a reused staging array; the (N, 3, 224, 224)
+        input is then filled and normalised in place in a preallocated tensor.
+        Caller holds _lock.
+        """
+        n = len(crops_bgr)
+        size = self.INPUT_SIZE
+        if n > len(self._stage):
+            self._stage = np.empty((n, size, size, 3), dtype=np.uint8)
+            self._buf = torch.empty(n, 3, size, size)
+        stage = self._stage[:n]
+        for crop, out in zip(crops_bgr, stage):
+            resized = cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=out)
+        tensor = self._buf[:n]
+        tensor.copy_(torch.from_numpy(stage).permute(0, 3, 1, 2))  # uint8 HWC → float CHW
+        tensor.div_(255.0).sub_(self._mean).div_(self._std)
+        if self._session is not None:
+            logits = self._session.run(None, {"input": tensor.numpy()})[0]
+            # Softmax occupied probability of [free, occupied] = sigmoid(occ - free)
+            return (1.0 / (1.0 + np.exp(logits[:, 0] - logits[:, 1]))).astype(np.float32)
+        with torch.inference_mode():
+            probs = torch.softmax(self._model(tensor), dim=1)  # [free_prob, occ_prob]
+        return probs[:, 1].numpy()
 
 
 def load_slot_classifier(path: str) -> bool:
@@ -64,9 +263,15 @@ def load_slot_classifier(path: str) -> bool:
     Result stored in module-level singleton; thread-safe for read-only inference.
     """
     global _slot_classifier
+    if _slot_classifier is not None:
+        # In-flight submit()s still get answered; later ones run inline
+        _slot_classifier.close()
     if not path:
         logger.info("SlotClassifier: no model path configured — CNN layer disabled")
         return False
+    if not HAVE_TORCH:
+        logger.warning("SlotClassifier: torch/torchvision not installed — CNN layer disabled")
+        return False
     try:
         _slot_classifier = SlotClassifier(path)
         return True
@@ -81,5 +286,5 @@ def load_slot_classifier(path: str) -> bool:
 
 
 def get_slot_classifier() -> Optional[SlotClassifier]:
-    """Return the loaded singleton, or None if not available."""
+    """Return the loaded (already warmed-up) singleton, or None if not available."""
     return _slot_classifier
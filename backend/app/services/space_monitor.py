@@ -6,16 +6,20 @@ A space is "occupied" when its pixel difference from the reference
 
 Keys: lot_id (int) — independent from gate monitor and traffic monitor.
 """
+import asyncio
 import logging
 import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 
 import cv2
 import numpy as np
 
 from ..config import settings
-from .slot_classifier import get_slot_classifier, load_slot_classifier
+from ._seat_kernels import HAVE_NUMBA, score_seats
+from ._seat_kernels import warmup as warmup_seat_kernels
+from .slot_classifier import SlotClassifier, get_slot_classifier, load_slot_classifier
 from .live_monitor import (
     FRAME_QUEUE_TIMEOUT,
     MAX_RECONNECT_ATTEMPTS,
@@ -23,8 +27,9 @@ from .live_monitor import (
     RECONNECT_DELAY_MAX,
     STREAM_DEAD_TIMEOUT,
     FrameReader,
-    _get_stream_url,
+    _encode_jpeg,
     _open_capture,
+    _resolve_url,
 )
 
 logger = logging.getLogger(__name__)
@@ -43,6 +48,11 @@ CNN_LOW  = 0.25   # conf < CNN_LOW   → free (confident)
 # ── Background subtraction (requires empty reference frame) ──────────────────
 BG_DIFF_THRESHOLD = 35    # mean absolute pixel difference
 MIN_OCCUPIED_RATIO = 0.15  # at least 15% of slot pixels must differ
+# The reference is the mean of the first REFERENCE_FRAMES frames after a capture
+# request (one frame is too noisy), then follows lighting drift as a slow EMA
+# on detection passes that find every slot free.
+REFERENCE_FRAMES = 15
+REFERENCE_DRIFT_ALPHA = 0.02
 
 # ── Texture analysis (Laplacian variance — no reference needed) ───────────────
 # Cars have high edge complexity; empty slots are uniform concrete/asphalt.
@@ -55,170 +65,464 @@ TEXTURE_THRESHOLD = 150.0
 # Raise DETECT_EVERY_N on slow hardware; lower it on fast hardware.
 DETECT_EVERY_N = 5
 
+# ── Motion gate: between arrivals/departures the overhead view is static ──────
+# A detection pass is skipped (slot states kept) while the frame barely differs
+# from the one the last pass ran on, but never for longer than STATIC_REDETECT_AFTER.
+STATIC_MOTION_THRESHOLD = 2.0  # mean abs diff (0-255) of 64x36 gray thumbnails
+STATIC_REDETECT_AFTER = 30.0   # seconds
 
-def _resolve_url(url: str) -> str:
-    """Use yt-dlp for YouTube URLs; return RTSP/HTTP URLs as-is."""
-    if "youtube" in url or "youtu.be" in url:
-        return _get_stream_url(url)
-    return url
+# Clean snapshot for SpaceEditor doesn't need source FPS — cap its encode rate
+RAW_MJPEG_FPS = 10
 
+# Monitors run as asyncio tasks on the server loop (as bus monitors do); frame
+# reads, the per-frame detect/render pass and reconnects go through this pool,
+# so a lot waiting out a reconnect backoff holds no OS thread. Each running lot
+# keeps one worker busy, so MONITOR_WORKERS caps the lots served without queueing.
+_monitor_pool = ThreadPoolExecutor(max_workers=settings.monitor_workers, thread_name_prefix="space-monitor")
 
-def _build_polygon_mask(polygon: list[list[float]], shape: tuple[int, int]) -> np.ndarray:
-    """Binary mask (uint8) for the given polygon on a frame of given (h, w)."""
-    mask = np.zeros(shape[:2], dtype=np.uint8)
-    pts = np.array(polygon, dtype=np.int32)
-    cv2.fillPoly(mask, [pts], 255)
-    return mask
 
+def _polygon_pts(polygon: list[list[float]], scale: float = 1.0) -> np.ndarray:
+    """Polygon vertices as int32 pixel coords, scaled to the detection frame."""
+    if scale == 1.0:
+        return np.array(polygon, dtype=np.int32)
+    return (np.array(polygon, dtype=np.float64) * scale).astype(np.int32)
 
-def _check_occupied_bg(frame_gray: np.ndarray,
-                       ref_gray: np.ndarray,
-                       mask: np.ndarray) -> bool:
+
+def _build_tiles(spaces: list[dict], shape: tuple[int, int], scale: float = 1.0) -> tuple:
+    """
+    (bboxes, masks_flat, mask_offsets, pixel_counts) for score_seats():
+    frame-clipped (x0, y0, x1, y1) per slot and every slot's bbox-sized
+    polygon mask packed back to back, slot i starting at mask_offsets[i].
+    Each slot dict also gets its own `_bbox`, `_mask_crop` (a view into
+    masks_flat) and `_pixel_count` for the per-slot OpenCV checks.
+    """
+    fh, fw = shape[:2]
+    n = len(spaces)
+    polys = [_polygon_pts(sp["polygon"], scale) for sp in spaces]
+    bboxes = np.zeros((n, 4), dtype=np.int32)
+    for i, pts in enumerate(polys):
+        x, y, w, h = cv2.boundingRect(pts)
+        x0, y0 = max(x, 0), max(y, 0)
+        bboxes[i] = (x0, y0, max(min(x + w, fw), x0), max(min(y + h, fh), y0))
+
+    tile_h = bboxes[:, 3] - bboxes[:, 1]
+    tile_w = bboxes[:, 2] - bboxes[:, 0]
+    sizes = (tile_h * tile_w).astype(np.int64)
+    mask_offsets = np.zeros(n, dtype=np.int64)
+    if n > 1:
+        np.cumsum(sizes[:-1], out=mask_offsets[1:])
+    masks_flat = np.zeros(int(sizes.sum()), dtype=np.uint8)
+    pixel_counts = np.zeros(n, dtype=np.int64)
+    for i, (sp, pts) in enumerate(zip(spaces, polys)):
+        off, size = int(mask_offsets[i]), int(sizes[i])
+        mask = masks_flat[off:off + size].reshape(int(tile_h[i]), int(tile_w[i]))
+        if size:
+            cv2.fillPoly(mask, [pts], 255, offset=(-int(bboxes[i, 0]), -int(bboxes[i, 1])))
+            pixel_counts[i] = cv2.countNonZero(mask)
+        sp["_bbox"] = tuple(bboxes[i].tolist())
+        sp["_mask_crop"] = mask
+        sp["_pixel_count"] = int(pixel_counts[i])
+    return bboxes, masks_flat, mask_offsets, pixel_counts
+
+
+def _check_occupied_bg(diff: np.ndarray, hot: np.ndarray,
+                       origin: tuple[int, int], sp: dict) -> bool:
     """
     Background subtraction: compare current frame to empty-lot reference.
     More accurate but requires a reference frame captured when lot is empty.
+    `diff` / `hot` are the pass's shared absdiff and hot-pixel images, whose
+    top-left corner is `origin` in frame coords; only the slot's bbox is read.
     """
-    diff = cv2.absdiff(frame_gray, ref_gray)
-    diff_masked = cv2.bitwise_and(diff, diff, mask=mask)
-
-    pixel_count = int(np.sum(mask > 0))
+    pixel_count = sp["_pixel_count"]
     if pixel_count == 0:
         return False
 
-    mean_diff = float(np.sum(diff_masked)) / pixel_count
-    hot_pixels = int(np.sum(
-        (diff_masked > BG_DIFF_THRESHOLD // 2).astype(np.uint8) & (mask > 0)
-    ))
+    x0, y0, x1, y1 = sp["_bbox"]
+    ox, oy = origin
+    mask = sp["_mask_crop"]
+    # Masked mean + masked hot-pixel count, all in OpenCV's SIMD uint8 kernels
+    mean_diff = cv2.mean(diff[y0 - oy:y1 - oy, x0 - ox:x1 - ox], mask=mask)[0]
+    hot_pixels = cv2.countNonZero(cv2.bitwise_and(hot[y0 - oy:y1 - oy, x0 - ox:x1 - ox], mask))
     hot_ratio = hot_pixels / pixel_count
     return mean_diff > BG_DIFF_THRESHOLD and hot_ratio > MIN_OCCUPIED_RATIO
 
 
-def _check_occupied_texture(frame_gray: np.ndarray, mask: np.ndarray) -> bool:
+def _laplacian_energy(frame_gray: np.ndarray) -> np.ndarray:
+    """Squared Laplacian of the whole frame, computed once per detection pass
+    and shared by every slot that reaches the texture layer."""
+    # Laplacian = second derivative → high value = lots of edges/texture
+    lap = cv2.Laplacian(frame_gray, cv2.CV_32F)
+    return cv2.multiply(lap, lap)
+
+
+def _check_occupied_texture(lap_sq: np.ndarray, sp: dict) -> bool:
     """
     Texture / Laplacian variance method — no reference frame needed.
     Cars have high edge complexity; empty asphalt/concrete is uniform.
     Works well for overhead parking videos (YouTube, RTSP, etc.).
+    `lap_sq` comes from _laplacian_energy().
     """
-    pixel_count = int(np.sum(mask > 0))
+    pixel_count = sp["_pixel_count"]
     if pixel_count == 0:
         return False
 
-    # Laplacian = second derivative → high value = lots of edges/texture
-    lap = cv2.Laplacian(frame_gray, cv2.CV_64F)
-    lap_sq = lap ** 2
-    # Only within the slot polygon
-    variance = float(np.sum(lap_sq[mask > 0])) / pixel_count
+    # Mean of the squared Laplacian over the slot polygon
+    x0, y0, x1, y1 = sp["_bbox"]
+    variance = cv2.mean(lap_sq[y0:y1, x0:x1], mask=sp["_mask_crop"])[0]
     return variance > TEXTURE_THRESHOLD
 
 
-def _crop_slot(frame: np.ndarray, polygon: list[list[float]]) -> np.ndarray:
+def _build_crop_boxes(spaces: list[dict], shape: tuple[int, int]) -> None:
+    """
+    Square CNN crop per slot, centered on the polygon's bounding rect and
+    sized by its longer side, so the CNN always receives a near-square input
+    regardless of how narrow/tall the drawn polygon is. Computed once per
+    frame size into `_crop_box` (x0, y0, x1, y1) instead of every pass.
+    """
+    fh, fw = shape[:2]
+    for sp in spaces:
+        x, y, w, h = cv2.boundingRect(np.array(sp["polygon"], dtype=np.int32))
+        cx, cy = x + w // 2, y + h // 2
+        half = max(w, h) // 2 + 8   # +8 px context padding
+        sp["_crop_box"] = (max(0, cx - half), max(0, cy - half),
+                           min(fw, cx + half), min(fh, cy + half))
+
+
+def _classify_slots(frame: np.ndarray, spaces: list[dict],
+                    classifier: SlotClassifier | None) -> list[float | None]:
+    """CNN occupancy probability per slot from one batched forward pass
+    (None for every slot without a classifier, and for empty crops)."""
+    confs: list[float | None] = [None] * len(spaces)
+    if classifier is None:
+        return confs
+    crops = [frame[y0:y1, x0:x1] for x0, y0, x1, y1 in (sp["_crop_box"] for sp in spaces)]
+    valid = [i for i, c in enumerate(crops) if c.size > 0]
+    if valid:
+        try:
+            probs = classifier.submit([crops[i] for i in valid]).result(timeout=classifier.RESULT_TIMEOUT)
+        except TimeoutError:
+            # Stuck batch worker: this pass falls back to background / texture
+            logger.warning("Space monitor: slot classifier timed out, skipping the CNN layer")
+            return confs
+        for i, conf in zip(valid, probs.tolist()):
+            confs[i] = conf
+    return confs
+
+
+def _fallback_verdicts(frame_gray: np.ndarray, ref_gray: np.ndarray | None,
+                      spaces: list[dict], tiles: tuple, todo: list[int]) -> list[bool]:
     """
-    Square crop centered on the slot polygon centroid.
-    Uses the longer side of the bounding rect as the square size,
-    so the CNN always receives a near-square input regardless of
-    how narrow/tall the drawn polygon is.
+    Layers 2/3 for the slots the CNN left undecided (indices in `todo`):
+    background subtraction when an empty-lot reference was captured,
+    otherwise texture. With numba, one parallel kernel scores every slot's
+    tile (see _build_tiles); otherwise per-slot OpenCV checks.
     """
-    pts = np.array(polygon, dtype=np.int32)
-    x, y, w, h = cv2.boundingRect(pts)
+    # Texture is only the fallback without a reference frame; one Laplacian
+    # per pass, shared by every slot
+    lap_sq = _laplacian_energy(frame_gray) if ref_gray is None else None
+
+    if HAVE_NUMBA:
+        # absdiff, hot-pixel threshold and both masked sums in one sweep over
+        # each slot's tile — no full-frame diff / bitwise_and / sum passes
+        mask = np.zeros(len(spaces), dtype=np.bool_)
+        mask[todo] = True
+        mean_diff, hot_ratio, texture = score_seats(
+            frame_gray, ref_gray, lap_sq, *tiles, BG_DIFF_THRESHOLD // 2, mask,
+        )
+        if ref_gray is not None:
+            occ = (mean_diff > BG_DIFF_THRESHOLD) & (hot_ratio > MIN_OCCUPIED_RATIO)
+        else:
+            occ = texture > TEXTURE_THRESHOLD
+        return occ[todo].tolist()
+
+    if ref_gray is not None:
+        # One absdiff + threshold over the undecided slots' union bbox, sliced per slot
+        boxes = tiles[0][todo]
+        ox, oy = int(boxes[:, 0].min()), int(boxes[:, 1].min())
+        x1, y1 = int(boxes[:, 2].max()), int(boxes[:, 3].max())
+        diff = cv2.absdiff(frame_gray[oy:y1, ox:x1], ref_gray[oy:y1, ox:x1])
+        hot = cv2.compare(diff, BG_DIFF_THRESHOLD // 2, cv2.CMP_GT)
+        return [_check_occupied_bg(diff, hot, (ox, oy), spaces[i]) for i in todo]
+    return [_check_occupied_texture(lap_sq, spaces[i]) for i in todo]
+
+
+def _prepare_draw(spaces: list[dict]) -> tuple[int, int, int, int]:
+    """
+    Frame-independent overlay geometry, once per monitor: each slot gets its
+    int32 contour (`_pts`) and label box / text origin (`_label_rect`,
+    `_label_org`). Returns the union bbox (x0, y0, x1, y1) of all slots.
+    """
+    for sp in spaces:
+        pts = np.array(sp["polygon"], dtype=np.int32).reshape(-1, 1, 2)
+        cx, cy = int(pts[:, 0, 0].mean()), int(pts[:, 0, 1].mean())
+        (tw, th), _ = cv2.getTextSize(sp["label"], cv2.FONT_HERSHEY_SIMPLEX, 0.55, 2)
+        sp["_pts"] = pts
+        sp["_label_rect"] = ((cx - tw // 2 - 3, cy - th - 5), (cx + tw // 2 + 3, cy + 3))
+        sp["_label_org"] = (cx - tw // 2, cy)
+    if not spaces:
+        return 0, 0, 0, 0
+    all_pts = np.concatenate([sp["_pts"] for sp in spaces])[:, 0]
+    return (int(all_pts[:, 0].min()), int(all_pts[:, 1].min()),
+            int(all_pts[:, 0].max()) + 1, int(all_pts[:, 1].max()) + 1)
+
+
+def _draw_spaces(frame: np.ndarray, spaces: list[dict],
+                 union_bbox: tuple[int, int, int, int]) -> None:
+    """Semi-transparent polygon overlays + labels (in-place); geometry from _prepare_draw()."""
+    colors = [_COL_OCC if sp["occupied"] else _COL_FREE for sp in spaces]
+
+    # Blend the fills only inside the slots' union bbox, not the whole frame
     fh, fw = frame.shape[:2]
-
-    cx = x + w // 2
-    cy = y + h // 2
-    half = max(w, h) // 2 + 8   # +8 px context padding
-
-    x1 = max(0, cx - half)
-    y1 = max(0, cy - half)
-    x2 = min(fw, cx + half)
-    y2 = min(fh, cy + half)
-    return frame[y1:y2, x1:x2]
+    x0, y0 = max(union_bbox[0], 0), max(union_bbox[1], 0)
+    x1, y1 = min(union_bbox[2], fw), min(union_bbox[3], fh)
+    roi = frame[y0:y1, x0:x1]
+    if roi.size:
+        overlay = roi.copy()
+        for sp, color in zip(spaces, colors):
+            cv2.fillPoly(overlay, [sp["_pts"]], color, offset=(-x0, -y0))
+        cv2.addWeighted(overlay, 0.35, roi, 0.65, 0, roi)
+
+    for sp, color in zip(spaces, colors):
+        cv2.polylines(frame, [sp["_pts"]], True, color, 2)
+        cv2.rectangle(frame, *sp["_label_rect"], (0, 0, 0), -1)
+        cv2.putText(frame, sp["label"], sp["_label_org"],
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 2)
 
 
-def _detect_slot(
-    frame: np.ndarray,
-    frame_gray: np.ndarray,
-    ref_gray: np.ndarray | None,
-    sp: dict,
-) -> bool:
+class _SpaceCounter:
     """
-    Hybrid 3-layer detection for a single slot.
-
-    Layer 1 — CNN (MobileNetV3-Small):
-        conf > CNN_HIGH  → occupied
-        conf < CNN_LOW   → free
-        uncertain        → fall through
-
-    Layer 2 — Background subtraction (if reference available):
-        Uses pixel diff against empty-lot reference frame.
-
-    Layer 3 — Texture / Laplacian variance (always available):
-        Last resort; no reference needed.
+    Per-lot detection state. process() handles one frame (preprocess →
+    reference → detect → render) and is blocking, so the monitor task runs it
+    on _monitor_pool rather than on the event loop.
     """
-    mask = sp["_mask"]
-
-    # Layer 1: CNN classifier
-    classifier = get_slot_classifier()
-    if classifier is not None:
-        crop = _crop_slot(frame, sp["polygon"])
-        if crop.size > 0:
-            conf = classifier.predict(crop)
-            if conf > CNN_HIGH:
-                return True
-            if conf < CNN_LOW:
-                return False
-            # uncertain → fall through to next layer
-
-    # Layer 2: Background subtraction
-    if ref_gray is not None and mask is not None:
-        return _check_occupied_bg(frame_gray, ref_gray, mask)
-
-    # Layer 3: Texture analysis
-    if mask is not None:
-        return _check_occupied_texture(frame_gray, mask)
-
-    return False
-
-
-def _draw_spaces(frame: np.ndarray, spaces: list[dict]) -> None:
-    """Semi-transparent polygon overlays + labels (in-place)."""
-    overlay = frame.copy()
-    for sp in spaces:
-        pts = np.array(sp["polygon"], dtype=np.int32)
-        color = _COL_OCC if sp["occupied"] else _COL_FREE
-        cv2.fillPoly(overlay, [pts], color)
-    cv2.addWeighted(overlay, 0.35, frame, 0.65, 0, frame)
-
-    for sp in spaces:
-        pts = np.array(sp["polygon"], dtype=np.int32)
-        color = _COL_OCC if sp["occupied"] else _COL_FREE
-        cv2.polylines(frame, [pts], True, color, 2)
-
-        cx = int(np.mean(pts[:, 0]))
-        cy = int(np.mean(pts[:, 1]))
-        label = sp["label"]
-        (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.55, 2)
-        cv2.rectangle(frame, (cx - tw // 2 - 3, cy - th - 5),
-                      (cx + tw // 2 + 3, cy + 3), (0, 0, 0), -1)
-        cv2.putText(frame, label, (cx - tw // 2, cy),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 2)
 
+    def __init__(self, lot_id: int, spaces_data: list[dict], monitor: dict):
+        self.lot_id = lot_id
+        self.monitor = monitor
+
+        warmup_seat_kernels()
+        # Mutable space state; polygon masks are added on the first frame
+        self.space_states: list[dict] = [
+            {"space_id": sp["space_id"], "label": sp["label"],
+             "polygon": sp["polygon"], "occupied": False}
+            for sp in spaces_data
+        ]
+        self.draw_bbox = _prepare_draw(self.space_states)
+        # Built once; detection only flips each entry's "occupied" in place
+        self.exported_spaces = monitor["spaces"] = _export_spaces(self.space_states)
+
+        self.reference_gray: np.ndarray | None = None
+        self.ref_acc: np.ndarray | None = None   # float32 running mean behind reference_gray
+        self.ref_frames = 0                       # frames averaged so far (< REFERENCE_FRAMES = settling)
+        self.tiles: tuple | None = None           # slot tiles, built on first frame
+        self.det_buf = self.gray_buf = self.blur_buf = None
+        self.prev_occupied: tuple | None = None
+        self.detect_thumb: np.ndarray | None = None  # gray thumbnail the last detection pass saw
+        self.last_detect = 0.0
+        self.frame_count = 0
+        self.last_raw_ts = 0.0
+        self.last_encode = 0.0
+
+    def reset_reference(self) -> None:
+        """Re-capture the reference (and re-detect) after a reconnect."""
+        self.reference_gray = self.ref_acc = None
+        self.ref_frames = 0
+        self.detect_thumb = None
+
+    def _preprocess(self, frame: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Resize to standard width for consistent processing
+        h, w = frame.shape[:2]
+        if w > 1280:
+            scale = 1280 / w
+            frame = cv2.resize(frame, None, fx=scale, fy=scale)
+            h, w = frame.shape[:2]
 
-def _space_monitor_loop(lot_id: int, spaces_data: list[dict],
-                        overhead_url: str, stream_url: str):
+        # Background / texture layers run at SPACE_DETECT_WIDTH; the CNN
+        # crops and the MJPEG overlay keep the full frame
+        det_scale = min(1.0, settings.space_detect_width / w)
+        det_h, det_w = (round(h * det_scale), round(w * det_scale)) if det_scale < 1.0 else (h, w)
+        if self.gray_buf is None or self.gray_buf.shape != (det_h, det_w):
+            if self.gray_buf is not None:
+                self.reset_reference()   # reference is in the old size's pixels too
+            # Reused every frame (cv2 dst=) instead of fresh full-frame temporaries
+            self.det_buf = np.empty((det_h, det_w, 3), dtype=np.uint8) if det_scale < 1.0 else None
+            self.gray_buf = np.empty((det_h, det_w), dtype=np.uint8)
+            self.blur_buf = np.empty((det_h, det_w), dtype=np.uint8)
+            # New frame size (e.g. a reconnect resolved another resolution):
+            # slot tiles and crop boxes are in the old size's pixels
+            self.tiles = None
+        det = frame
+        if self.det_buf is not None:
+            det = cv2.resize(frame, (det_w, det_h), dst=self.det_buf, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(det, cv2.COLOR_BGR2GRAY, dst=self.gray_buf)
+        # Light denoise for absdiff/Laplacian — a 5x5 box (as in the bus seat
+        # monitor) is cheaper than the 5x5 Gaussian it replaces and smooths
+        # noise about as much, so the thresholds keep their calibration
+        frame_gray = cv2.boxFilter(self.gray_buf, -1, (5, 5), dst=self.blur_buf,
+                                   borderType=cv2.BORDER_REPLICATE)
+
+        # Build polygon masks and CNN crop boxes on first usable frame
+        if self.tiles is None:
+            self.tiles = _build_tiles(self.space_states, det.shape, det_scale)
+            _build_crop_boxes(self.space_states, frame.shape)
+        return frame, frame_gray
+
+    def _update_reference(self, frame_gray: np.ndarray) -> bool:
+        """Advance reference capture; True while it is settling (skip detection)."""
+        monitor = self.monitor
+        # Capture reference only when user explicitly requests it
+        if monitor.get("_capture_reference"):
+            monitor["_capture_reference"] = False
+            self.ref_acc = frame_gray.astype(np.float32)
+            self.ref_frames = 1
+            return True
+        if self.ref_acc is None or self.ref_frames >= REFERENCE_FRAMES:
+            return False
+        # Exact running mean: weight 1/n for the n-th frame
+        self.ref_frames += 1
+        cv2.accumulateWeighted(frame_gray, self.ref_acc, 1.0 / self.ref_frames)
+        if self.ref_frames < REFERENCE_FRAMES:
+            return True
+        self.reference_gray = cv2.convertScaleAbs(self.ref_acc)
+        monitor["has_reference"] = True
+        monitor["reference_captured_at"] = datetime.now().isoformat()
+        self.detect_thumb = None     # new reference → re-detect on the next pass
+        logger.info(f"Space monitor lot {self.lot_id}: reference frame captured "
+                    f"(mean of {REFERENCE_FRAMES} frames)")
+        return True
+
+    def _detect(self, frame: np.ndarray, frame_gray: np.ndarray) -> None:
+        monitor = self.monitor
+        space_states = self.space_states
+        # Motion gate: ~1 ms thumbnail diff instead of a CNN / fallback pass
+        thumb = cv2.resize(frame_gray, (64, 36), interpolation=cv2.INTER_AREA)
+        tick = time.monotonic()
+        if (self.detect_thumb is not None and tick - self.last_detect < STATIC_REDETECT_AFTER
+                and cv2.norm(thumb, self.detect_thumb, cv2.NORM_L1) / thumb.size < STATIC_MOTION_THRESHOLD):
+            return
+        self.detect_thumb, self.last_detect = thumb, tick
+
+        classifier = get_slot_classifier()
+        has_ref = self.reference_gray is not None
+        if classifier is not None:
+            monitor["detection_mode"] = "cnn+background" if has_ref else "cnn"
+        else:
+            monitor["detection_mode"] = "background" if has_ref else "texture"
+        # Layer 1: CNN (MobileNetV3-Small), every slot in one batch.
+        # Confident verdicts stand; the rest (no classifier, empty crop,
+        # CNN_LOW ≤ conf ≤ CNN_HIGH) go to background / texture.
+        confs = _classify_slots(frame, space_states, classifier)
+        todo = []
+        for i, (sp, conf) in enumerate(zip(space_states, confs)):
+            if conf is not None and conf > CNN_HIGH:
+                sp["occupied"] = True
+            elif conf is not None and conf < CNN_LOW:
+                sp["occupied"] = False
+            else:
+                todo.append(i)
+        if todo:
+            verdicts = _fallback_verdicts(frame_gray, self.reference_gray, space_states, self.tiles, todo)
+            for i, occ in zip(todo, verdicts):
+                space_states[i]["occupied"] = bool(occ)
+
+        # Counts, timestamp and the exported flags only change with a slot
+        occupied = tuple(sp["occupied"] for sp in space_states)
+        if occupied != self.prev_occupied:
+            self.prev_occupied = occupied
+            occ = sum(occupied)
+            monitor["occupied_count"] = occ
+            monitor["free_count"] = len(space_states) - occ
+            monitor["total_count"] = len(space_states)
+            monitor["last_update"] = datetime.now().isoformat()
+            for exported, occ_i in zip(self.exported_spaces, occupied):
+                exported["occupied"] = occ_i
+        if has_ref and not any(occupied):
+            # Empty lot: let the reference follow slow lighting drift
+            cv2.accumulateWeighted(frame_gray, self.ref_acc, REFERENCE_DRIFT_ALPHA)
+            cv2.convertScaleAbs(self.ref_acc, dst=self.reference_gray)
+
+    def _render(self, frame: np.ndarray) -> None:
+        monitor = self.monitor
+        # Viewers render a handful of fps — no need to draw + encode every source frame
+        tick = time.monotonic()
+        if tick - self.last_encode < 1.0 / settings.mjpeg_target_fps:
+            return
+        self.last_encode = tick
+
+        # `frame` is not read after this point: annotate it in place
+        vis = frame
+        _draw_spaces(vis, self.space_states, self.draw_bbox)
+        _occ = monitor["occupied_count"]
+        _free = monitor["free_count"]
+        cv2.putText(vis, f"OCC: {_occ}/{len(self.space_states)}  FREE: {_free}",
+                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        if monitor.get("has_reference"):
+            cv2.putText(vis, "REF OK", (10, 60),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+
+        monitor["_annotated_frame"] = _encode_jpeg(vis, 55)
+        monitor["_frame_seq"] = monitor.get("_frame_seq", 0) + 1
+        event = monitor.get("_frame_event")
+        if event:
+            event.set()
+
+    def process(self, frame: np.ndarray) -> None:
+        self.frame_count += 1
+        frame, frame_gray = self._preprocess(frame)
+
+        if self._update_reference(frame_gray):
+            return  # skip detection and rendering on reference frames
+
+        # --- Detection (throttled to every DETECT_EVERY_N frames) ---
+        if self.frame_count % DETECT_EVERY_N == 0:
+            self._detect(frame, frame_gray)
+
+        # Keep a clean (un-annotated) frame for SpaceEditor snapshotting,
+        # refreshed at RAW_MJPEG_FPS rather than every frame
+        now = time.time()
+        if now - self.last_raw_ts >= 1.0 / RAW_MJPEG_FPS:
+            self.last_raw_ts = now
+            self.monitor["_raw_frame"] = _encode_jpeg(frame, 70)
+
+        # --- Render MJPEG only if viewers connected ---
+        if self.monitor.get("_viewers", 0) > 0:
+            self._render(frame)
+
+
+async def _space_monitor_loop(lot_id: int, spaces_data: list[dict],
+                              overhead_url: str, stream_url: str):
     monitor = space_monitors.get(lot_id)
     if not monitor:
         return
+    try:
+        await _space_monitor_loop_inner(lot_id, spaces_data, overhead_url, stream_url, monitor)
+    except asyncio.CancelledError:
+        logger.info(f"Space monitor lot {lot_id}: task cancelled")
+    except Exception as e:
+        logger.error(f"Space monitor lot {lot_id}: UNHANDLED ERROR in monitor loop: {e}", exc_info=True)
+        monitor["status"] = "error"
+        monitor["error"] = str(e)
 
-    cap = _open_capture(stream_url)
+
+async def _space_monitor_loop_inner(lot_id: int, spaces_data: list[dict],
+                                    overhead_url: str, stream_url: str, monitor: dict):
+    loop = asyncio.get_running_loop()
+    cap = await loop.run_in_executor(_monitor_pool, _open_capture, stream_url)
     if not cap.isOpened():
         monitor["status"] = "error"
         monitor["error"] = "Cannot open overhead stream"
         logger.error(f"Space monitor lot {lot_id}: Cannot open stream")
         return
 
+    try:
+        counter = await loop.run_in_executor(_monitor_pool, _SpaceCounter, lot_id, spaces_data, monitor)
+    except BaseException:
+        cap.release()
+        raise
+
     if monitor.get("status") == "stopping":
         cap.release()
         return
-
     monitor["status"] = "running"
     cnn_active = get_slot_classifier() is not None
     logger.info(
@@ -226,32 +530,22 @@ def _space_monitor_loop(lot_id: int, spaces_data: list[dict],
         f"({'CNN+fallback' if cnn_active else 'background/texture'})"
     )
 
-    # Build mutable space state with polygon masks
-    space_states: list[dict] = []
-    for sp in spaces_data:
-        space_states.append({
-            "space_id": sp["space_id"],
-            "label": sp["label"],
-            "polygon": sp["polygon"],
-            "occupied": False,
-            "_mask": None,        # built on first frame
-        })
-    monitor["spaces"] = _export_spaces(space_states)
-
     reader = FrameReader(cap)
     last_frame_time = time.time()
     reconnect_attempts = 0
-    reference_gray: np.ndarray | None = None
-    frame_count = 0
+    # The pool's own Future, not the asyncio wrapper: cancelling the task
+    # cancels the wrapper at once, but the worker call keeps running
+    pending: Future | None = None
 
     try:
         while monitor.get("status") == "running":
-            frame = reader.read(timeout=FRAME_QUEUE_TIMEOUT)
+            # Tracked in `pending` too: stop() must not release the capture under a read
+            pending = _monitor_pool.submit(reader.read, FRAME_QUEUE_TIMEOUT)
+            frame = await asyncio.wrap_future(pending)
 
             if frame is None:
                 if time.time() - last_frame_time < STREAM_DEAD_TIMEOUT:
                     continue
-                reader.stop()
                 reconnect_attempts += 1
                 if reconnect_attempts > MAX_RECONNECT_ATTEMPTS:
                     monitor["status"] = "error"
@@ -260,106 +554,43 @@ def _space_monitor_loop(lot_id: int, spaces_data: list[dict],
 
                 delay = min(RECONNECT_DELAY_BASE * (2 ** (reconnect_attempts - 1)), RECONNECT_DELAY_MAX)
                 logger.warning(f"Space monitor lot {lot_id}: Reconnect {reconnect_attempts}/{MAX_RECONNECT_ATTEMPTS}, wait {delay}s")
-                time.sleep(delay)
+                # Backoff holds no thread; stop_space_monitor cancels the task mid-sleep
+                await asyncio.sleep(delay)
                 if monitor.get("status") != "running":
                     break
 
                 try:
-                    stream_url = _resolve_url(overhead_url)
+                    # Reuse the cached URL first; re-run yt-dlp only once it has failed twice
+                    stream_url = await loop.run_in_executor(
+                        _monitor_pool, _resolve_url, overhead_url, reconnect_attempts > 2,
+                    )
                 except Exception as e:
                     logger.error(f"Space monitor lot {lot_id}: URL resolve failed: {e}")
                     continue
-                cap = _open_capture(stream_url)
-                if not cap.isOpened():
+                # Same VideoCapture and reader thread, new stream
+                pending = _monitor_pool.submit(reader.reopen, stream_url)
+                if not await asyncio.wrap_future(pending):
                     continue
-                reader = FrameReader(cap)
                 last_frame_time = time.time()
-                reference_gray = None   # re-capture after reconnect
+                counter.reset_reference()
                 continue
 
             last_frame_time = time.time()
             reconnect_attempts = 0
-            frame_count += 1
 
-            # Resize to standard width for consistent processing
-            h, w = frame.shape[:2]
-            if w > 1280:
-                scale = 1280 / w
-                frame = cv2.resize(frame, None, fx=scale, fy=scale)
-                h, w = frame.shape[:2]
-
-            frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            frame_gray = cv2.GaussianBlur(frame_gray, (5, 5), 0)
-
-            # Build polygon masks on first usable frame
-            if space_states[0]["_mask"] is None:
-                for sp in space_states:
-                    sp["_mask"] = _build_polygon_mask(sp["polygon"], frame.shape)
-
-            # Capture reference only when user explicitly requests it
-            if monitor.get("_capture_reference"):
-                monitor["_capture_reference"] = False
-                reference_gray = frame_gray.copy()
-                monitor["has_reference"] = True
-                monitor["reference_captured_at"] = datetime.now().isoformat()
-                logger.info(f"Space monitor lot {lot_id}: reference frame captured")
-                continue  # skip detection on capture frame
-
-            # --- Detection (throttled to every DETECT_EVERY_N frames) ---
-            run_detection = (frame_count % DETECT_EVERY_N == 0)
-            if run_detection:
-                has_cnn = get_slot_classifier() is not None
-                has_ref = reference_gray is not None
-                if has_cnn:
-                    monitor["detection_mode"] = "cnn+background" if has_ref else "cnn"
-                else:
-                    monitor["detection_mode"] = "background" if has_ref else "texture"
-                for sp in space_states:
-                    if sp["_mask"] is None:
-                        continue
-                    sp["occupied"] = _detect_slot(frame, frame_gray, reference_gray, sp)
-
-                occ = sum(1 for sp in space_states if sp["occupied"])
-                free = len(space_states) - occ
-
-                monitor["occupied_count"] = occ
-                monitor["free_count"] = free
-                monitor["total_count"] = len(space_states)
-                monitor["last_update"] = datetime.now().isoformat()
-                monitor["spaces"] = _export_spaces(space_states)
-
-            # Always save a clean (un-annotated) frame for SpaceEditor snapshotting
-            _, raw_buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-            monitor["_raw_frame"] = raw_buf.tobytes()
-
-            # --- Render MJPEG only if viewers connected ---
-            has_viewers = monitor.get("_viewers", 0) > 0
-            if not has_viewers:
-                continue
-
-            vis = frame.copy()
-            _draw_spaces(vis, space_states)
-            _occ = monitor["occupied_count"]
-            _free = monitor["free_count"]
-            cv2.putText(vis, f"OCC: {_occ}/{len(space_states)}  FREE: {_free}",
-                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-            if monitor.get("has_reference"):
-                cv2.putText(vis, "REF OK", (10, 60),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-
-            _, buf = cv2.imencode(".jpg", vis, [cv2.IMWRITE_JPEG_QUALITY, 55])
-            monitor["_annotated_frame"] = buf.tobytes()
-            monitor["_frame_seq"] = monitor.get("_frame_seq", 0) + 1
-            event = monitor.get("_frame_event")
-            if event:
-                event.set()
+            pending = _monitor_pool.submit(counter.process, frame)
+            await asyncio.wrap_future(pending)
 
     except Exception as e:
         logger.error(f"Space monitor lot {lot_id}: Error — {e}")
         monitor["status"] = "error"
         monitor["error"] = str(e)
     finally:
-        reader.stop()
+        # Cancellation doesn't interrupt a running worker call — let it finish
+        # before stopping the reader it may be using.
+        if pending is not None and not pending.done():
+            await asyncio.wait([asyncio.wrap_future(pending)])
+        await loop.run_in_executor(_monitor_pool, reader.stop)
         if monitor.get("status") == "running":
             monitor["status"] = "stopped"
         logger.info(f"Space monitor lot {lot_id}: stopped")
@@ -382,7 +613,8 @@ async def start_space_monitor(lot_id: int, spaces_data: list[dict],
     if get_slot_classifier() is None:
         load_slot_classifier(settings.parking_cnn_model)
 
-    stream_url = _resolve_url(overhead_url)
+    # yt-dlp (on a cold URL) must not block the event loop
+    stream_url = await asyncio.get_running_loop().run_in_executor(None, _resolve_url, overhead_url)
     total = len(spaces_data)
 
     monitor = {
@@ -404,30 +636,35 @@ async def start_space_monitor(lot_id: int, spaces_data: list[dict],
     }
     space_monitors[lot_id] = monitor
 
-    thread = threading.Thread(
-        target=_space_monitor_loop,
-        args=(lot_id, spaces_data, overhead_url, stream_url),
-        daemon=True,
-    )
-    thread.start()
-    monitor["_thread"] = thread
+    monitor["_task"] = asyncio.create_task(_space_monitor_loop(
+        lot_id, spaces_data, overhead_url, stream_url,
+    ))
 
     return {"lot_id": lot_id, "status": "starting"}
 
 
+def _forget_monitor(lot_id: int, monitor: dict) -> None:
+    # Only drop our own entry — a new monitor may have been started meanwhile
+    if space_monitors.get(lot_id) is monitor:
+        space_monitors.pop(lot_id, None)
+
+
 def stop_space_monitor(lot_id: int) -> dict:
     monitor = space_monitors.get(lot_id)
     if not monitor:
         return {"error": "No active space monitor for this parking lot"}
     monitor["status"] = "stopping"
 
-    def _cleanup():
-        thread = monitor.get("_thread")
-        if thread and thread.is_alive():
-            thread.join(timeout=20)
-        space_monitors.pop(lot_id, None)
+    task = monitor.get("_task")
+    if task is None or task.done():
+        _forget_monitor(lot_id, monitor)
+    else:
+        def _cancel():
+            task.add_done_callback(lambda _: _forget_monitor(lot_id, monitor))
+            task.cancel()
 
-    threading.Thread(target=_cleanup, daemon=True).start()
+        # Sync endpoints run in FastAPI's threadpool — cancel on the task's own loop
+        task.get_loop().call_soon_threadsafe(_cancel)
     return {"lot_id": lot_id, "status": "stopping"}
 
 
@@ -464,11 +701,8 @@ def stop_all_space_monitors():
         monitor = space_monitors.get(lot_id)
         if monitor:
             monitor["status"] = "stopping"
-    for lot_id in list(space_monitors.keys()):
-        monitor = space_monitors.get(lot_id)
-        if monitor:
-            thread = monitor.get("_thread")
-            if thread and thread.is_alive():
-                thread.join(timeout=5)
+            task = monitor.get("_task")
+            if task and not task.done():
+                task.get_loop().call_soon_threadsafe(task.cancel)
     space_monitors.clear()
     logger.info("All space monitors stopped")
@@ -0,0 +1,121 @@
+"""
+Process-wide cache of resolved YouTube stream URLs.
+
+yt-dlp takes seconds per URL, and every monitor start, reconnect and editor
+snapshot used to run it again. resolve_url() keeps each result until shortly
+before the signed googlevideo URL expires (its expire= parameter, capped at
+URL_TTL); a daemon thread re-resolves entries still in use REFRESH_MARGIN
+ahead of that, so starts and reconnects on a warm URL return immediately.
+"""
+import logging
+import re
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+URL_TTL = 4 * 3600  # upper bound on how long a resolved URL is reused
+REFRESH_MARGIN = 5 * 60  # treat a URL as stale this long before it expires
+REFRESH_POLL = 60  # seconds between refresher passes
+IDLE_DROP = URL_TTL  # entries nobody asked for in this long are dropped, not refreshed
+
+_EXPIRE_RE = re.compile(r"[?&/]expire[=/](\d+)")
+
+# youtube url → [stream_url, stale_at, last_used] (monotonic seconds)
+_cache: dict[str, list] = {}
+_lock = threading.Lock()
+_refresher: threading.Thread | None = None
+
+
+def _get_stream_url(youtube_url: str) -> str:
+    cmd = ["yt-dlp", "-g", "-f", "bv[height<=720]/bv/b"]
+    if settings.ytdlp_cookies_file:
+        # Resolve absolute path relative to this file's directory (backend/)
+        cookies_path = Path(settings.ytdlp_cookies_file)
+        if not cookies_path.is_absolute():
+            cookies_path = Path(__file__).resolve().parent.parent.parent / cookies_path
+        if cookies_path.exists():
+            cmd.extend(["--cookies", str(cookies_path)])
+            logger.info(f"yt-dlp using cookies: {cookies_path}")
+        else:
+            logger.warning(f"Cookies file not found: {cookies_path}, trying without cookies")
+    elif settings.ytdlp_cookies_browser:
+        cmd.extend(["--cookies-from-browser", settings.ytdlp_cookies_browser])
+    cmd.append(youtube_url)
+    logger.debug(f"yt-dlp cmd: {' '.join(cmd)}")
+    result = subprocess.run(
+        cmd, capture_output=True, text=True, timeout=30,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"yt-dlp error: {result.stderr.strip()}")
+    return result.stdout.strip().split("\n")[0]
+
+
+def _is_youtube(url: str) -> bool:
+    return "youtube" in url or "youtu.be" in url
+
+
+def _lifetime(stream_url: str) -> float:
+    """Seconds the resolved URL may be reused: until REFRESH_MARGIN before its
+    expire= timestamp, never longer than URL_TTL."""
+    m = _EXPIRE_RE.search(stream_url)
+    ttl = min(int(m.group(1)) - time.time(), URL_TTL) if m else URL_TTL
+    return max(ttl - REFRESH_MARGIN, 0.0)
+
+
+def _refresh(url: str) -> str:
+    stream_url = _get_stream_url(url)
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(url)
+        last_used = entry[2] if entry else now
+        _cache[url] = [stream_url, now + _lifetime(stream_url), last_used]
+    _ensure_refresher()
+    return stream_url
+
+
+def resolve_url(url: str, force: bool = False) -> str:
+    """
+    Use yt-dlp for YouTube URLs (cached, see module doc); return RTSP/HTTP
+    URLs as-is. force=True skips the cache, e.g. when the cached URL has
+    stopped working.
+    """
+    if not _is_youtube(url):
+        return url
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(url)
+        if entry is not None:
+            entry[2] = now
+            if not force and now < entry[1]:
+                return entry[0]
+    return _refresh(url)
+
+
+def _ensure_refresher() -> None:
+    global _refresher
+    with _lock:
+        if _refresher is None:
+            _refresher = threading.Thread(target=_refresh_loop, daemon=True, name="stream-url-refresh")
+            _refresher.start()
+
+
+def _refresh_loop() -> None:
+    while True:
+        time.sleep(REFRESH_POLL)
+        now = time.monotonic()
+        with _lock:
+            for url in [u for u, e in _cache.items() if now - e[2] > IDLE_DROP]:
+                del _cache[url]
+            # Due before the next pass (plus the time a yt-dlp run takes)
+            due = [u for u, e in _cache.items() if e[1] - now < 2 * REFRESH_POLL]
+        for url in due:
+            try:
+                _refresh(url)
+                logger.info(f"stream_pool: refreshed {url}")
+            except Exception as e:
+                logger.warning(f"stream_pool: refresh failed for {url}: {e}")
@@ -1,6 +1,8 @@
 import numpy as np
 import supervision as sv
 
+MAX_TRACKS = 256  # initial size of the per-frame scratch buffers (grown on demand)
+
 
 class VehicleTracker:
     def __init__(self, frame_height: int,
@@ -24,37 +26,82 @@ class VehicleTracker:
         )
         self.counts: dict[str, int] = {}
 
+        # Scratch buffers reused every frame instead of rebuilding arrays from lists
+        self._xyxy = np.empty((MAX_TRACKS, 4), dtype=np.float32)
+        self._conf = np.empty(MAX_TRACKS, dtype=np.float32)
+        self._cls = np.empty(MAX_TRACKS, dtype=int)
+        # class_id → vehicle_type, learned from incoming detections
+        self._vtypes: dict[int, str] = {}
+        # (N, 4) boxes of the last update, row i = returned dict i — lets the
+        # overlay take the array as is instead of rebuilding it from the dicts
+        self.last_xyxy = np.empty((0, 4), dtype=np.float32)
+
+    def _grow(self, n: int) -> None:
+        size = max(n, 2 * len(self._conf))
+        self._xyxy = np.empty((size, 4), dtype=np.float32)
+        self._conf = np.empty(size, dtype=np.float32)
+        self._cls = np.empty(size, dtype=int)
+
     def update(self, detections_raw: list[dict]) -> list[dict]:
         if not detections_raw:
+            self.last_xyxy = np.empty((0, 4), dtype=np.float32)
             return []
 
-        bboxes = np.array([d["bbox"] for d in detections_raw], dtype=np.float32)
-        confidences = np.array([d["confidence"] for d in detections_raw], dtype=np.float32)
-        class_ids = np.array([d["class_id"] for d in detections_raw], dtype=int)
+        n = len(detections_raw)
+        if n > len(self._conf):
+            self._grow(n)
+        xyxy, conf, cls = self._xyxy[:n], self._conf[:n], self._cls[:n]
+        vtypes = self._vtypes
+        for i, d in enumerate(detections_raw):
+            xyxy[i] = d["bbox"]
+            conf[i] = d["confidence"]
+            cls[i] = d["class_id"]
+            if d["class_id"] not in vtypes:
+                vtypes[d["class_id"]] = d["vehicle_type"]
 
-        sv_detections = sv.Detections(
-            xyxy=bboxes,
-            confidence=confidences,
-            class_id=class_ids,
-        )
+        # sv.Detections / ByteTrack copy what they keep, so views are safe here
+        tracked = self._track(xyxy, conf, cls)
+        fallback = detections_raw[0]["vehicle_type"]
+        return self._to_dicts(tracked, [vtypes.get(c, fallback) for c in tracked.class_id.tolist()])
+
+    def update_arrays(self, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray,
+                      vtype_names: np.ndarray) -> list[dict]:
+        """
+        update() for detections already in column form (as BatchedDetectorService
+        returns them) — no per-detection dicts on the way in.
+        vtype_names maps class_id → vehicle_type.
+        """
+        if len(conf) == 0:
+            self.last_xyxy = np.empty((0, 4), dtype=np.float32)
+            return []
+        tracked = self._track(xyxy, conf, cls)
+        return self._to_dicts(tracked, vtype_names[tracked.class_id].tolist())
+
+    def _track(self, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray) -> sv.Detections:
+        sv_detections = sv.Detections(xyxy=xyxy, confidence=conf, class_id=cls)
         tracked = self.byte_tracker.update_with_detections(sv_detections)
         self.line_zone.trigger(tracked)
+        self.last_xyxy = tracked.xyxy
+        return tracked
 
-        results = []
-        for i in range(len(tracked)):
-            vtype = detections_raw[0]["vehicle_type"]
-            for d in detections_raw:
-                if d["class_id"] == tracked.class_id[i]:
-                    vtype = d["vehicle_type"]
-                    break
-            results.append({
-                "tracker_id": int(tracked.tracker_id[i]) if tracked.tracker_id is not None else -1,
-                "bbox": tracked.xyxy[i].tolist(),
-                "confidence": float(tracked.confidence[i]) if tracked.confidence is not None else 0.0,
-                "class_id": int(tracked.class_id[i]),
-                "vehicle_type": vtype,
-            })
-        return results
+    @staticmethod
+    def _to_dicts(tracked: sv.Detections, vtypes: list[str]) -> list[dict]:
+        # Convert each column once rather than per element
+        m = len(tracked)
+        boxes = tracked.xyxy.tolist()
+        class_ids = tracked.class_id.tolist()
+        tids = tracked.tracker_id.tolist() if tracked.tracker_id is not None else [-1] * m
+        confs = tracked.confidence.tolist() if tracked.confidence is not None else [0.0] * m
+        return [
+            {
+                "tracker_id": tids[i],
+                "bbox": boxes[i],
+                "confidence": confs[i],
+                "class_id": class_ids[i],
+                "vehicle_type": vtypes[i],
+            }
+            for i in range(m)
+        ]
 
     def get_line_counts(self) -> tuple[int, int]:
         return self.line_zone.in_count, self.line_zone.out_count
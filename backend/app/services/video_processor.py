@@ -5,6 +5,7 @@ from datetime import datetime
 from zoneinfo import ZoneInfo
 
 import cv2
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from ..config import settings
@@ -39,6 +40,7 @@ def _process_video(job_id: str, video_path: str, camera_id: int):
         # Process every Nth frame for speed
         process_every = max(1, int(fps // 5))
         vehicle_counts: dict[str, int] = defaultdict(int)
+        events: list[dict] = []  # DetectionEvent rows, bulk-inserted at the end
 
         while True:
             ret, frame = cap.read()
@@ -51,12 +53,12 @@ def _process_video(job_id: str, video_path: str, camera_id: int):
 
                 now = datetime.now(ZoneInfo(settings.timezone))
                 for det in tracked:
-                    db.add(DetectionEvent(
-                        camera_id=camera_id,
-                        vehicle_type=det["vehicle_type"],
-                        confidence=det["confidence"],
-                        timestamp=now,
-                    ))
+                    events.append({
+                        "camera_id": camera_id,
+                        "vehicle_type": det["vehicle_type"],
+                        "confidence": det["confidence"],
+                        "timestamp": now,
+                    })
                     vehicle_counts[det["vehicle_type"]] += 1
 
                 jobs[job_id]["frames_processed"] = frame_idx
@@ -66,6 +68,8 @@ def _process_video(job_id: str, video_path: str, camera_id: int):
 
         cap.release()
 
+        if events:
+            db.execute(insert(DetectionEvent), events)
         now = datetime.now(ZoneInfo(settings.timezone))
         for vtype, count in vehicle_counts.items():
             db.add(TrafficCount(